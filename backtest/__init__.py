@@ -2,5 +2,9 @@
 backtest - 回测框架模块
 """
 from .engine import BacktestEngine, Portfolio, Order
+from .factor_analysis import evaluate_factor, forward_returns, information_coefficient, quantile_returns
 
-__all__ = ['BacktestEngine', 'Portfolio', 'Order']
+__all__ = [
+    'BacktestEngine', 'Portfolio', 'Order',
+    'evaluate_factor', 'forward_returns', 'information_coefficient', 'quantile_returns',
+]
@@ -144,7 +144,7 @@ class BacktestEngine:
         运行回测
         
         参数:
-            data: 包含 OHLCV 的 DataFrame
+            data: 包含 OHLCV 的 DataFrame (价格可以是 float32，资金与持仓按 float64 计算)
             signals: 交易信号 (1=买入，-1=卖出，0=持有)
             symbol: 标的代码
         
@@ -156,6 +156,8 @@ class BacktestEngine:
         for i in range(len(data)):
             timestamp = data.index[i]
             row = data.iloc[i]
+            # float32 价格先转为 Python float，避免资金计算被降为 float32
+            close = float(row['close'])
             signal = signals.iloc[i] if i < len(signals) else 0
             
             current_position = self.portfolio.get_position(symbol)
@@ -163,13 +165,13 @@ class BacktestEngine:
             # 生成订单
             if signal == 1 and current_position == 0:
                 # 买入
-                quantity = int(self.portfolio.cash * 0.95 / row['close'])
+                quantity = int(self.portfolio.cash * 0.95 / close)
                 if quantity > 0:
                     order = Order(
                         symbol=symbol,
                         side=OrderSide.BUY,
                         quantity=quantity,
-                        price=row['close'] * (1 + self.slippage),
+                        price=close * (1 + self.slippage),
                         timestamp=timestamp
                     )
                     self.portfolio.execute_order(order, self.commission_rate)
@@ -180,13 +182,13 @@ class BacktestEngine:
                     symbol=symbol,
                     side=OrderSide.SELL,
                     quantity=current_position,
-                    price=row['close'] * (1 - self.slippage),
+                    price=close * (1 - self.slippage),
                     timestamp=timestamp
                 )
                 self.portfolio.execute_order(order, self.commission_rate)
             
             # 记录快照
-            self.portfolio.record_snapshot(timestamp, {symbol: row['close']})
+            self.portfolio.record_snapshot(timestamp, {symbol: close})
         
         self.results = self.portfolio.to_dataframe()
         return self.results
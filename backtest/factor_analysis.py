@@ -0,0 +1,218 @@
+"""
+factor_analysis.py - 因子检验 (Factor IC / Quantile Returns)
+
+不做逐只股票回测，直接检验因子对未来收益的预测能力。因子和收盘价都是
+(股票数, 交易日数) 面板，一次处理全部交易日:
+
+- IC: 每个交易日因子与未来收益的截面相关系数
+  - rank IC (Spearman): 两者截面排名的相关系数，排名在二维数组上用 argsort 一次完成
+  - IC (Pearson): 原始值的相关系数
+- IC 衰减: 同一因子在 1 / 5 / 10 / 20 日等多个持有期上的 IC，因子只排序一次，各持有期复用
+- 分层收益: 每个交易日按因子排名等分为若干组，各组的平均未来收益与多空 (最高组 - 最低组) 收益
+
+每个交易日只使用因子和未来收益都有效的股票 (停牌、未上市、最后 horizon 天为 NaN)。
+
+用法:
+    values = compute_factors(panel, {'momentum': '(close / delay(close, 120) - 1) / ts_std(close / delay(close, 1) - 1, 120)'})
+    report = evaluate_factor(values['momentum'], panel.field('close'), horizons=(1, 5, 20), dates=panel.dates)
+    report['summary']        # 每个持有期的 rank IC 均值、ICIR、IC 为正的比例 ...
+    report['quantiles']      # 每个持有期各组的平均收益与多空收益
+"""
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from indicators.cross_section import _sorted_ranks, cs_rank
+
+METHODS = ('spearman', 'pearson')
+
+
+def forward_returns(close, horizon: int = 1) -> np.ndarray:
+    """
+    未来收益 close[t + horizon] / close[t] - 1
+
+    参数:
+        close: (股票数, 交易日数) 收盘价 (建议后复权)
+        horizon: 持有交易日数
+
+    返回:
+        同形状数组，最后 horizon 个交易日为 NaN
+    """
+    close = np.asarray(close, dtype=np.float64)
+    out = np.full(close.shape, np.nan)
+    if 0 < horizon < close.shape[1]:
+        with np.errstate(divide='ignore', invalid='ignore'):
+            out[:, :-horizon] = close[:, horizon:] / close[:, :-horizon] - 1
+    return out
+
+
+def _pearson(x: np.ndarray, y: np.ndarray, valid: np.ndarray, min_count: int) -> np.ndarray:
+    """每列在 valid 位置上的相关系数，有效数不足 min_count 或方差为 0 时为 NaN"""
+    count = valid.sum(axis=0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        centered = []
+        for values in (x, y):
+            d = np.where(valid, values, 0.0)
+            d -= d.sum(axis=0) / count
+            d *= valid
+            centered.append(d)
+        dx, dy = centered
+        var_x = np.einsum('ij,ij->j', dx, dx)
+        var_y = np.einsum('ij,ij->j', dy, dy)
+        corr = np.einsum('ij,ij->j', dx, dy) / np.sqrt(var_x * var_y)
+    return np.where((count >= max(min_count, 2)) & (var_x > 0) & (var_y > 0), corr, np.nan)
+
+
+def _bucket_means(ranks: np.ndarray, returns: np.ndarray, valid: np.ndarray, quantiles: int, min_count: int) -> np.ndarray:
+    """按排名等分为 quantiles 组，返回 (组数, 交易日数) 的组内平均收益"""
+    t = returns.shape[1]
+    count = valid.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        bucket = (ranks - 1) * (quantiles / count)
+    # 无效位置记为第 quantiles 组 (多余的组)，不参与统计
+    bucket = np.where(valid, np.minimum(bucket, quantiles - 1), quantiles).astype(np.int64)
+    slot = (bucket * t + np.arange(t)).ravel()
+    size = (quantiles + 1) * t
+    sums = np.bincount(slot, weights=np.where(valid, returns, 0.0).ravel(), minlength=size)[:quantiles * t]
+    sizes = np.bincount(slot, minlength=size)[:quantiles * t]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = (sums / sizes).reshape(quantiles, t)
+    means[:, count < max(min_count, quantiles)] = np.nan
+    return means
+
+
+def _sort_columns(values: np.ndarray):
+    """每列排序 -> (排序后的值, 扁平下标)；扁平下标可直接用于取值与回填，比 take_along_axis 快"""
+    t = values.shape[1]
+    flat = np.argsort(values, axis=0, kind='stable') * t + np.arange(t)
+    return values.ravel()[flat], flat
+
+
+def information_coefficient(factor, returns, method: str = 'spearman', min_count: int = 10) -> np.ndarray:
+    """
+    每个交易日的截面 IC
+
+    参数:
+        factor: (股票数, 交易日数) 因子值
+        returns: 同形状的未来收益 (forward_returns)
+        method: 'spearman' (rank IC) 或 'pearson'
+        min_count: 当日有效股票少于该数时为 NaN
+
+    返回:
+        (交易日数,) 数组
+    """
+    if method not in METHODS:
+        raise ValueError(f"不支持的相关系数: {method}，可选 {' / '.join(METHODS)}")
+    factor = np.asarray(factor, dtype=np.float64)
+    returns = np.asarray(returns, dtype=np.float64)
+    valid = ~np.isnan(factor) & ~np.isnan(returns)
+    if method == 'spearman':
+        factor = cs_rank(np.where(valid, factor, np.nan))
+        returns = cs_rank(np.where(valid, returns, np.nan))
+    return _pearson(factor, returns, valid, min_count)
+
+
+def quantile_returns(factor, returns, quantiles: int = 5, min_count: int = 10) -> np.ndarray:
+    """
+    分层收益
+
+    参数:
+        factor: (股票数, 交易日数) 因子值
+        returns: 同形状的未来收益
+        quantiles: 分组数，第 1 组因子最小
+        min_count: 当日有效股票少于该数 (或少于分组数) 时为 NaN
+
+    返回:
+        (分组数, 交易日数) 每组的平均未来收益
+    """
+    factor = np.asarray(factor, dtype=np.float64)
+    returns = np.asarray(returns, dtype=np.float64)
+    valid = ~np.isnan(factor) & ~np.isnan(returns)
+    ranks = cs_rank(np.where(valid, factor, np.nan))
+    return _bucket_means(ranks, returns, valid, quantiles, min_count)
+
+
+def evaluate_factor(
+    factor,
+    close,
+    horizons: Sequence[int] = (1, 5, 10, 20),
+    quantiles: int = 5,
+    dates: Optional[Sequence] = None,
+    min_count: int = 10
+) -> Dict[str, pd.DataFrame]:
+    """
+    因子检验: 多个持有期的 IC、IC 衰减与分层收益
+
+    参数:
+        factor: (股票数, 交易日数) 因子值，如 compute_factors / panel_composite_signal 的结果
+        close: 同形状的收盘价，用于计算各持有期的未来收益
+        horizons: 持有交易日数
+        quantiles: 分层组数
+        dates: 交易日 (如 PricePanel.dates)，作为逐日结果的索引
+        min_count: 当日有效股票少于该数时不计入
+
+    返回:
+        {
+            'rank_ic': 逐日 rank IC (交易日 × 持有期),
+            'ic': 逐日 Pearson IC (交易日 × 持有期),
+            'long_short': 逐日多空收益 (交易日 × 持有期),
+            'summary': 每个持有期的 rank_ic / rank_ic_std / rank_icir / ic / ic_std / icir / positive / dates,
+            'quantiles': 每个持有期各组 (Q1 ~ Qn) 的平均收益与多空收益 long_short,
+        }
+        收益为持有 horizon 日的收益 (各交易日的持有期相互重叠)
+    """
+    factor = np.asarray(factor, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    if factor.shape != close.shape:
+        raise ValueError(f"因子与收盘价形状不一致: {factor.shape} vs {close.shape}")
+    index = pd.Index(dates if dates is not None else np.arange(factor.shape[1]))
+
+    # 因子只排序一次，各持有期只在有效位置上重新计数排名
+    ordered, flat = _sort_columns(np.ascontiguousarray(factor))
+    factor_valid = ~np.isnan(factor)
+
+    rank_ic, ic, long_short, summary, layers = {}, {}, {}, [], []
+    for horizon in horizons:
+        returns = forward_returns(close, horizon)
+        valid = factor_valid & ~np.isnan(returns)
+        ranks = np.empty(factor.shape)
+        ranks.ravel()[flat] = _sorted_ranks(ordered, valid.ravel()[flat])
+
+        # 收益排名在收益的排序位置上计算，因子排名取到同样的位置后直接求相关
+        ordered_returns, return_flat = _sort_columns(np.where(valid, returns, np.nan))
+        returns_valid = ~np.isnan(ordered_returns)
+        rank_ic[horizon] = _pearson(ranks.ravel()[return_flat], _sorted_ranks(ordered_returns, returns_valid),
+                                    returns_valid, min_count)
+        del ordered_returns, return_flat, returns_valid
+
+        ic[horizon] = _pearson(factor, returns, valid, min_count)
+        means = _bucket_means(ranks, returns, valid, quantiles, min_count)
+        long_short[horizon] = means[-1] - means[0]
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            row = {'horizon': horizon}
+            for name, ir_name, values in (('rank_ic', 'rank_icir', rank_ic[horizon]), ('ic', 'icir', ic[horizon])):
+                observed = values[~np.isnan(values)]
+                mean = observed.mean() if len(observed) else np.nan
+                std = observed.std(ddof=1) if len(observed) > 1 else np.nan
+                row[name], row[f'{name}_std'] = mean, std
+                row[ir_name] = mean / std if std > 0 else np.nan
+            observed = rank_ic[horizon][~np.isnan(rank_ic[horizon])]
+            row['positive'] = (observed > 0).mean() if len(observed) else np.nan
+            row['dates'] = len(observed)
+        summary.append(row)
+
+        observed = ~np.isnan(means).any(axis=0)
+        layer = {'horizon': horizon}
+        layer.update({f'Q{q + 1}': means[q, observed].mean() if observed.any() else np.nan for q in range(quantiles)})
+        layer['long_short'] = long_short[horizon][observed].mean() if observed.any() else np.nan
+        layers.append(layer)
+
+    return {
+        'rank_ic': pd.DataFrame(rank_ic, index=index),
+        'ic': pd.DataFrame(ic, index=index),
+        'long_short': pd.DataFrame(long_short, index=index),
+        'summary': pd.DataFrame(summary).set_index('horizon'),
+        'quantiles': pd.DataFrame(layers).set_index('horizon'),
+    }
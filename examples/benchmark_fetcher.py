@@ -0,0 +1,88 @@
+"""
+benchmark_fetcher.py - 批量拉取吞吐量测试
+
+在本机启动一个模拟行情服务 (每个请求固定延迟)，
+对比不同并发上限下 BulkFetcher 的吞吐量，不访问真实网络。
+
+用法:
+    python examples/benchmark_fetcher.py --symbols 200 --latency 0.05
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from market_data import BulkFetcher, MarketDataProvider
+from market_data.provider import _date_range
+
+
+def make_stub_server(latency: float) -> ThreadingHTTPServer:
+    """创建模拟行情服务，/bars?symbol=...&start=...&end=... 返回 JSON 日线"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            dates = pd.bdate_range(query['start'][0], query['end'][0])
+            body = json.dumps({
+                '日期': dates.strftime('%Y-%m-%d').tolist(),
+                '收盘': [10.0 + i * 0.01 for i in range(len(dates))],
+            }).encode('utf-8')
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+
+
+class HttpStubProvider(MarketDataProvider):
+    """从模拟行情服务拉取日线的数据源"""
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url
+
+    def get_bars(self, symbol, start_date=None, end_date=None, adjust='qfq'):
+        start, end = _date_range(start_date, end_date)
+        url = f"{self.base_url}/bars?symbol={symbol}&start={start:%Y%m%d}&end={end:%Y%m%d}"
+        with urllib.request.urlopen(url) as response:
+            return pd.DataFrame(json.loads(response.read()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='BulkFetcher 吞吐量测试')
+    parser.add_argument('--symbols', type=int, default=200, help='股票数量')
+    parser.add_argument('--latency', type=float, default=0.05, help='模拟服务单次响应延迟 (秒)')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16, 32], help='并发上限')
+    parser.add_argument('--rate', type=float, default=None, help='限流 (请求/秒)')
+    args = parser.parse_args()
+
+    server = make_stub_server(args.latency)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    provider = HttpStubProvider(f"http://127.0.0.1:{server.server_address[1]}")
+
+    requests = [(f'{i:06d}', '20240101', '20241231') for i in range(args.symbols)]
+    print(f"股票数量: {args.symbols}, 模拟延迟: {args.latency * 1000:.0f}ms, 限流: {args.rate or '无'}")
+    for concurrency in args.concurrency:
+        fetcher = BulkFetcher(provider, max_concurrency=concurrency, rate=args.rate)
+        fetcher.fetch(requests)
+        print(f"并发 {concurrency:>3}: 耗时 {fetcher.stats['elapsed']:.2f} 秒, "
+              f"吞吐量 {fetcher.stats['throughput']:.1f} 请求/秒, 失败 {fetcher.stats['failed']}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,10 +2,15 @@
 get_stock_data.py - 获取股票数据示例
 使用 akshare 获取 A 股历史行情
 """
+import os
+import sys
 import pandas as pd
 import akshare as ak
 from datetime import datetime
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from market_data import normalize_bars
+
 def get_stock_data(symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
     """
     获取 A 股历史行情数据
@@ -28,15 +33,8 @@ def get_stock_data(symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
             adjust="qfq"  # 前复权
         )
         
-        # 重命名列
-        df.columns = [
-            'date', 'open', 'close', 'high', 'low',
-            'volume', 'turnover', 'amplitude', 'pct_change',
-            'change', 'turnover_rate'
-        ]
-        
-        # 转换日期格式
-        df['date'] = pd.to_datetime(df['date'])
+        # 转换为规范格式 (英文列名、float32 价格、int64 成交量)
+        df = normalize_bars(df, date_format='datetime')
         df.set_index('date', inplace=True)
         
         return df
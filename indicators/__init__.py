@@ -1,29 +1,107 @@
 """
 indicators - 技术指标模块
 """
-from .ma import calculate_sma, calculate_ema, calculate_wma
+from .ma import calculate_sma, calculate_ema, calculate_wma, calculate_sma_grid
 from .macd import calculate_macd
 from .kdj import calculate_kdj
 from .rsi import calculate_rsi
-from .boll import calculate_boll
+from .boll import calculate_boll, calculate_boll_grid
 from .volume import calculate_volume_ma, calculate_volume_ratio
 from .obv import calculate_obv
 from .atr import calculate_atr
 from .cci import calculate_cci
-from .composite import CompositeIndicator
+from .cache import IndicatorCache, get_indicator_cache, set_indicator_cache
+from .precision import get_precision, set_precision, use_precision, compare_precision
+from .composite import CompositeIndicator, composite_score
+from .cross_section import cs_rank, cs_zscore, top_k
+from .graph import IndicatorGraph, compute_indicators, get_indicator_graph
+from .chunked import ChunkedIndicators
+from .factor import FUNCTIONS as FACTOR_FUNCTIONS, compute_factors, parse_factor
+from .streaming import (
+    StreamingIndicator, StreamingSMA, StreamingEMA, StreamingMACD, StreamingRSI,
+    StreamingKDJ, StreamingBOLL, StreamingATR, StreamingCCI, StreamingOBV,
+)
+from .panel import (
+    panel_sma, panel_ema, panel_macd, panel_rsi, panel_kdj,
+    panel_boll, panel_atr, panel_cci, panel_obv, panel_divergence, panel_macd_divergence,
+)
+from .rolling import (
+    rolling_min, rolling_max, rolling_mean, rolling_var, rolling_std, rolling_mean_std, rolling_mad,
+    rolling_mean_grid, rolling_mean_std_grid, rolling_rank, rolling_slope,
+)
+from .patterns import PATTERNS, local_extrema, head_and_shoulders, double_top_bottom, trend_patterns, locate_patterns, scan_patterns
 
 __all__ = [
     'calculate_sma',
     'calculate_ema',
     'calculate_wma',
+    'calculate_sma_grid',
     'calculate_macd',
     'calculate_kdj',
     'calculate_rsi',
     'calculate_boll',
+    'calculate_boll_grid',
     'calculate_volume_ma',
     'calculate_volume_ratio',
     'calculate_obv',
     'calculate_atr',
     'calculate_cci',
     'CompositeIndicator',
+    'composite_score',
+    'cs_rank',
+    'cs_zscore',
+    'top_k',
+    'IndicatorCache',
+    'get_indicator_cache',
+    'set_indicator_cache',
+    'get_precision',
+    'set_precision',
+    'use_precision',
+    'compare_precision',
+    'IndicatorGraph',
+    'compute_indicators',
+    'get_indicator_graph',
+    'ChunkedIndicators',
+    'FACTOR_FUNCTIONS',
+    'compute_factors',
+    'parse_factor',
+    'StreamingIndicator',
+    'StreamingSMA',
+    'StreamingEMA',
+    'StreamingMACD',
+    'StreamingRSI',
+    'StreamingKDJ',
+    'StreamingBOLL',
+    'StreamingATR',
+    'StreamingCCI',
+    'StreamingOBV',
+    'panel_sma',
+    'panel_ema',
+    'panel_macd',
+    'panel_rsi',
+    'panel_kdj',
+    'panel_boll',
+    'panel_atr',
+    'panel_cci',
+    'panel_obv',
+    'panel_divergence',
+    'panel_macd_divergence',
+    'rolling_min',
+    'rolling_max',
+    'rolling_mean',
+    'rolling_var',
+    'rolling_std',
+    'rolling_mean_std',
+    'rolling_mad',
+    'rolling_mean_grid',
+    'rolling_mean_std_grid',
+    'rolling_rank',
+    'rolling_slope',
+    'PATTERNS',
+    'local_extrema',
+    'head_and_shoulders',
+    'double_top_bottom',
+    'trend_patterns',
+    'locate_patterns',
+    'scan_patterns',
 ]
@@ -5,6 +5,8 @@ atr.py - ATR 波动率指标 (Average True Range)
 """
 import numpy as np
 import pandas as pd
+from .cache import memoize
+from .precision import with_precision
 
 
 def calculate_true_range(
@@ -39,6 +41,8 @@ def calculate_true_range(
     return tr
 
 
+@memoize
+@with_precision
 def calculate_atr(
     high: pd.Series,
     low: pd.Series,
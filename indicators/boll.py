@@ -6,8 +6,13 @@ boll.py - 布林带指标 (Bollinger Bands)
 import numpy as np
 import pandas as pd
 from typing import Tuple
+from .cache import memoize
+from .precision import with_precision
+from .rolling import rolling_mean_std_grid
 
 
+@memoize
+@with_precision
 def calculate_boll(
     close: pd.Series,
     window: int = 20,
@@ -46,6 +51,36 @@ def calculate_boll(
     return middle, upper, lower, bandwidth
 
 
+@memoize
+@with_precision
+def calculate_boll_grid(
+    close: pd.Series,
+    windows,
+    num_std: float = 2.0
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    一次计算多个周期的布林带 (参数扫描用)
+
+    所有周期共用一次前缀和与平方前缀和
+
+    参数:
+        close: 收盘价序列
+        windows: 周期列表，如 range(10, 61)
+        num_std: 标准差倍数，默认 2
+
+    返回:
+        (中轨，上轨，下轨，带宽) 四元组，每个都是 (周期数, 序列长度) 数组，
+        第 k 行与 calculate_boll(close, windows[k], num_std) 相同
+    """
+    values = close.to_numpy(dtype=np.float64) if isinstance(close, pd.Series) else np.asarray(close, dtype=np.float64)
+    middle, std = rolling_mean_std_grid(values, list(windows))
+    upper = middle + num_std * std
+    lower = middle - num_std * std
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bandwidth = (upper - lower) / middle * 100
+    return middle, upper, lower, bandwidth
+
+
 def detect_breakout(
     close: pd.Series,
     upper: pd.Series,
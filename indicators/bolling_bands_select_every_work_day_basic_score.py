@@ -1,6 +1,10 @@
 import pandas as pd
 from sklearn.preprocessing import MinMaxScaler
-import akshare as ak
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from market_data import get_bar_store, get_financial_store, get_universe_store
+from market_data.universe import BOARD_NAMES, classify_boards
 
 # https://github.com/z1041950008/deyide_quant
 # 获取股票板块类型
@@ -9,25 +13,8 @@ import akshare as ak
 # 后续会更新更多指标，敬请期待
 
 def get_board_type(stock_code):
-    stock_code = str(stock_code).strip()  # 确保股票代码是字符串类型并去除空格
-
-    # 判断科创板：股票代码以 '688' 开头
-    if stock_code.startswith('688'):
-        return '科创板'
-    # 判断创业板：股票代码以 '300' 开头
-    elif stock_code.startswith('300'):
-        return '创业板'
-    # 判断上海主板：股票代码以 '600' 或 '601' 开头
-    elif stock_code.startswith('600') or stock_code.startswith('601') or stock_code.startswith('602') or stock_code.startswith('603') or stock_code.startswith('605'):
-        return '上海主板'
-    # 判断深圳主板：股票代码以 '000' 或 '002' 开头
-    elif stock_code.startswith('000') or stock_code.startswith('002'):
-        return '深圳主板'
-    # 假设北京市场：股票代码以 '800' 开头
-    elif stock_code.startswith('800'):
-        return '北京市场'
-    else:
-        return '未知'
+    # 板块划分规则见 market_data.universe.BOARD_PREFIXES
+    return BOARD_NAMES[classify_boards([stock_code])[0]]
 # 定义布林带计算函数
 def calculate_bollinger_bands(df, window=20, num_std=2):
     """
@@ -37,22 +24,22 @@ def calculate_bollinger_bands(df, window=20, num_std=2):
     :param num_std: 计算标准差的倍数，默认2倍
     :return: 包含布林带计算结果的DataFrame
     """
+    # 每次都是整段历史一次性计算，用向量化的 rolling (增量状态见 BollScreener)
     df['SMA'] = df['收盘'].rolling(window=window).mean()  # 计算简单移动平均线（中轨）
     df['std'] = df['收盘'].rolling(window=window).std()  # 计算标准差
     df['upper'] = df['SMA'] + num_std * df['std']  # 上轨
     df['lower'] = df['SMA'] - num_std * df['std']  # 下轨
     return df
 
-stock_df = ak.stock_zh_a_spot_em()
+# 当天的股票池快照，板块与流通市值排序已预先计算
+universe = get_universe_store().get()
+top = universe.rows(top_n=300)
+stock_df = universe.frame.loc[top, ['代码', '名称', '市盈率-动态', '市净率', '流通市值']].reset_index(drop=True)
 stock_df['代码'] = stock_df['代码'].astype(str)
+stock_df['板块'] = universe.board_names()[top]
 
-stock_df = stock_df[['代码', '名称', '市盈率-动态', '市净率', '流通市值']]
-stock_df['板块'] = stock_df['代码'].apply(get_board_type)
-
-stock_df = stock_df.sort_values(by='流通市值', ascending=False)
 stock_df['布林带买入'] = None 
 stock_df['布林带卖出'] = None
-stock_df = stock_df.head(300)
 # print(stock_df)
 
 def score_stock(stock_df):
@@ -61,15 +48,15 @@ def score_stock(stock_df):
 
         stock_code = row['代码']
 
-        stock_financial_analysis_indicator_df = ak.stock_financial_abstract_ths(symbol=stock_code, indicator="按报告期")
-        # print(stock_financial_analysis_indicator_df.iloc[0])
-        if len(stock_financial_analysis_indicator_df) > 0:
-            if '净资产收益率' in stock_financial_analysis_indicator_df.columns and isinstance(stock_financial_analysis_indicator_df.iloc[0]['净资产收益率'], str):
-                stock_df.at[index, '净资产收益率'] = stock_financial_analysis_indicator_df.iloc[0]['净资产收益率'].replace("%", "")
-            if '资产负债率' in stock_financial_analysis_indicator_df.columns and isinstance(stock_financial_analysis_indicator_df.iloc[0]['资产负债率'], str):
-                stock_df.at[index,'资产负债率'] = stock_financial_analysis_indicator_df.iloc[0]['资产负债率'].replace("%", "")
-            if '销售毛利率' in stock_financial_analysis_indicator_df.columns and isinstance(stock_financial_analysis_indicator_df.iloc[0]['销售毛利率'], str):
-                stock_df.at[index,'销售毛利率'] = stock_financial_analysis_indicator_df.iloc[0]['销售毛利率'].replace("%", "")
+        # 当前已公开的最新一期报告
+        latest_report = get_financial_store().latest(stock_code)
+        if latest_report is not None:
+            if isinstance(latest_report.get('净资产收益率'), str):
+                stock_df.at[index, '净资产收益率'] = latest_report['净资产收益率'].replace("%", "")
+            if isinstance(latest_report.get('资产负债率'), str):
+                stock_df.at[index,'资产负债率'] = latest_report['资产负债率'].replace("%", "")
+            if isinstance(latest_report.get('销售毛利率'), str):
+                stock_df.at[index,'销售毛利率'] = latest_report['销售毛利率'].replace("%", "")
             
 
     scaler = MinMaxScaler()
@@ -129,7 +116,7 @@ for stock_code in stock_df['代码']:
         pass
     try:
         # 获取股票的历史数据（收盘价）
-        stock_data = ak.stock_zh_a_hist(symbol=stock_code, period="daily", start_date=s_date, end_date=e_date, adjust="qfq")
+        stock_data = get_bar_store().get_bars(stock_code, start_date=s_date, end_date=e_date, adjust="qfq")
 
         # 如果历史数据少于20天，跳过
         if len(stock_data) < 20:
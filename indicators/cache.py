@@ -0,0 +1,327 @@
+"""
+cache.py - 指标计算缓存 (Indicator Cache)
+
+按内容寻址的指标缓存:
+- 键 = 函数名 + 输入数据内容的哈希 (数值缓冲区、索引、名称) + 参数 (含默认值)
+- 内存层: 有界 LRU，超过 maxsize 条或 max_bytes 字节时淘汰最久未使用的结果；
+  单个结果超过 max_bytes (如全市场面板的 MACD) 时不进入内存层
+- 磁盘层 (可选): {root}/{键前两位}/{键}.pkl，数据不变时跨进程、跨运行复用；
+  总大小超过 max_disk_bytes 时按最近使用时间删除最旧的文件
+- stats 记录命中/未命中次数
+
+calculate_sma / calculate_boll / panel_macd 等函数已用 @memoize 装饰，
+参数扫描或多个策略对同一份数据重复计算时直接返回缓存结果。
+
+用法:
+    set_indicator_cache(IndicatorCache(maxsize=1024, max_bytes=2 << 30, root='data/store/indicator_cache'))
+    calculate_boll(close, 20, 2)      # 计算并缓存
+    calculate_boll(close, 20, 2)      # 命中
+    get_indicator_cache().stats       # {'hits': 1, 'misses': 1, ...}
+"""
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .precision import get_precision
+
+# 指标实现变化导致旧的磁盘缓存失效时递增
+CACHE_VERSION = 1
+
+
+# ==================== 内容哈希 ====================
+
+def _update_array(h, values) -> None:
+    values = np.asarray(values)
+    if values.dtype == object:
+        values = pd.util.hash_array(values.ravel())
+    h.update(f'{values.dtype.str}{values.shape}'.encode())
+    h.update(np.ascontiguousarray(values).reshape(-1).view(np.uint8))
+
+
+def _update_index(h, index: pd.Index) -> None:
+    if isinstance(index, pd.RangeIndex):
+        h.update(f'range{index.start},{index.stop},{index.step}'.encode())
+    else:
+        _update_array(h, index.to_numpy())
+
+
+def _update(h, value) -> None:
+    """把一个参数加入哈希；无法按内容哈希的类型抛出 TypeError"""
+    if isinstance(value, pd.Series):
+        h.update(b'series' + repr(value.name).encode())
+        _update_index(h, value.index)
+        _update_array(h, value.to_numpy())
+    elif isinstance(value, pd.DataFrame):
+        h.update(b'frame' + repr(list(value.columns)).encode())
+        _update_index(h, value.index)
+        for column in value.columns:
+            _update_array(h, value[column].to_numpy())
+    elif isinstance(value, np.ndarray):
+        h.update(b'array')
+        _update_array(h, value)
+    elif value is None or isinstance(value, (bool, int, float, str, np.number)):
+        h.update(repr((type(value).__name__, value)).encode())
+    elif isinstance(value, (tuple, list, range)):
+        h.update(f'seq{len(value)}'.encode())
+        for item in value:
+            _update(h, item)
+    else:
+        raise TypeError(f"无法缓存的参数类型: {type(value).__name__}")
+
+
+def fingerprint(*values) -> str:
+    """
+    按内容计算哈希 (blake2b)
+
+    参数:
+        values: Series / DataFrame / ndarray / 标量，或由它们组成的元组/列表
+
+    返回:
+        32 位十六进制字符串
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for value in values:
+        _update(h, value)
+    return h.hexdigest()
+
+
+def _copy_on_write() -> bool:
+    """pandas 3 始终写时复制；pandas 2 需要显式开启 mode.copy_on_write"""
+    if int(pd.__version__.split('.')[0]) >= 3:
+        return True
+    return pd.get_option('mode.copy_on_write') is True
+
+
+def _share(value):
+    """
+    返回缓存结果给调用方，调用方修改返回值不影响缓存:
+    pandas 对象在写时复制开启时返回浅拷贝，否则返回深拷贝；ndarray 返回只读视图
+    """
+    if isinstance(value, (pd.Series, pd.DataFrame)):
+        return value.copy(deep=not _copy_on_write())
+    if isinstance(value, np.ndarray):
+        view = value.view()
+        view.flags.writeable = False
+        return view
+    if isinstance(value, tuple):
+        return tuple(_share(item) for item in value)
+    return value
+
+
+def _nbytes(value) -> int:
+    """结果占用的内存 (数值缓冲区与索引)"""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=True))
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True).sum())
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(item) for item in value)
+    return 0
+
+
+# ==================== 缓存 ====================
+
+class IndicatorCache:
+    """
+    两级指标缓存
+
+    统计信息 (stats):
+        hits: 内存层命中次数
+        disk_hits: 磁盘层命中次数
+        misses: 未命中 (实际计算) 次数
+        evictions: 内存层淘汰次数
+        oversized: 超过 max_bytes、未进入内存层的结果数
+        disk_evictions: 磁盘层删除的文件数
+        uncacheable: 参数无法哈希、直接计算的次数
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 256,
+        root: Optional[str] = None,
+        enabled: bool = True,
+        max_bytes: int = 1 << 30,
+        max_disk_bytes: int = 10 << 30
+    ):
+        """
+        参数:
+            maxsize: 内存层最多保存的结果条数，0 表示不使用内存层
+            root: 磁盘层目录，None 表示不落盘
+            enabled: False 时所有调用直接计算
+            max_bytes: 内存层最多占用的字节数，默认 1 GB
+            max_disk_bytes: 磁盘层最多占用的字节数，默认 10 GB
+        """
+        self.maxsize = maxsize
+        self.root = root
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._memory: 'OrderedDict[str, Tuple[Any, int]]' = OrderedDict()
+        self._bytes = 0
+        self._disk_bytes: Optional[int] = None   # 首次写盘时扫描目录得到
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'oversized': 0,
+                      'disk_evictions': 0, 'uncacheable': 0}
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    @property
+    def nbytes(self) -> int:
+        """内存层当前占用的字节数"""
+        return self._bytes
+
+    def count(self, name: str) -> None:
+        """统计计数加一"""
+        with self._lock:
+            self.stats[name] += 1
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], f'{key}.pkl')
+
+    def lookup(self, key: str) -> Tuple[bool, Any]:
+        """查找缓存，返回 (是否命中, 结果)"""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats['hits'] += 1
+                return True, self._memory[key][0]
+        if self.root:
+            path = self._path(key)
+            if os.path.exists(path):
+                try:
+                    with open(path, 'rb') as f:
+                        value = pickle.load(f)
+                    os.utime(path)   # 磁盘层按修改时间淘汰，命中时刷新
+                except Exception as e:
+                    print(f"读取指标缓存 {path} 失败: {str(e)}")
+                else:
+                    self.count('disk_hits')
+                    self._remember(key, value)
+                    return True, value
+        self.count('misses')
+        return False, None
+
+    def _remember(self, key: str, value: Any) -> None:
+        if self.maxsize <= 0:
+            return
+        size = _nbytes(value)
+        with self._lock:
+            if size > self.max_bytes:
+                self.stats['oversized'] += 1
+                return
+            if key in self._memory:
+                self._bytes -= self._memory.pop(key)[1]
+            self._memory[key] = (value, size)
+            self._bytes += size
+            while len(self._memory) > self.maxsize or self._bytes > self.max_bytes:
+                _, (_, evicted) = self._memory.popitem(last=False)
+                self._bytes -= evicted
+                self.stats['evictions'] += 1
+
+    def _disk_files(self):
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith('.pkl'):
+                    path = os.path.join(dirpath, filename)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield stat.st_mtime, stat.st_size, path
+
+    def prune_disk(self) -> None:
+        """磁盘层超过 max_disk_bytes 时删除最久未使用的文件"""
+        files = sorted(self._disk_files())
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            self.count('disk_evictions')
+        with self._lock:
+            self._disk_bytes = total
+
+    def store(self, key: str, value: Any) -> None:
+        """写入内存层，配置了磁盘层时同时落盘 (先写临时文件再替换)"""
+        self._remember(key, value)
+        if self.root:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            size = os.path.getsize(tmp)
+            os.replace(tmp, path)
+            with self._lock:
+                if self._disk_bytes is not None:
+                    self._disk_bytes += size
+                over = self._disk_bytes is None or self._disk_bytes > self.max_disk_bytes
+            if over:
+                self.prune_disk()
+
+    def clear(self) -> None:
+        """清空内存层 (磁盘层保留)"""
+        with self._lock:
+            self._memory.clear()
+            self._bytes = 0
+
+
+_cache = IndicatorCache()
+
+
+def get_indicator_cache() -> IndicatorCache:
+    """获取全局指标缓存"""
+    return _cache
+
+
+def set_indicator_cache(cache: IndicatorCache) -> None:
+    """替换全局指标缓存 (例如开启磁盘层或关闭缓存)"""
+    global _cache
+    _cache = cache
+
+
+def memoize(fn: Callable) -> Callable:
+    """
+    指标函数缓存装饰器
+
+    参数按函数签名补全默认值后参与哈希，calculate_boll(close) 与 calculate_boll(close, 20, 2.0) 命中同一条缓存；
+    当前计算精度也是键的一部分，float32 与 float64 的结果分别缓存。原函数保存在 wrapper.uncached
+    """
+    signature = inspect.signature(fn)
+    name = f'{fn.__module__}.{fn.__qualname__}:{CACHE_VERSION}'
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        cache = get_indicator_cache()
+        if not cache.enabled:
+            return fn(*args, **kwargs)
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        try:
+            key = fingerprint(name, get_precision().str, tuple(bound.arguments.items()))
+        except TypeError:
+            cache.count('uncacheable')
+            return fn(*args, **kwargs)
+        found, value = cache.lookup(key)
+        if not found:
+            value = fn(*args, **kwargs)
+            cache.store(key, value)
+        return _share(value)
+
+    wrapper.uncached = fn
+    return wrapper
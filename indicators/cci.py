@@ -5,6 +5,8 @@ cci.py - CCI 顺势指标 (Commodity Channel Index)
 """
 import numpy as np
 import pandas as pd
+from .cache import memoize
+from .precision import with_precision
 
 
 def calculate_typical_price(
@@ -28,6 +30,8 @@ def calculate_typical_price(
     return (high + low + close) / 3
 
 
+@memoize
+@with_precision
 def calculate_cci(
     high: pd.Series,
     low: pd.Series,
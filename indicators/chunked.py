@@ -0,0 +1,229 @@
+"""
+chunked.py - 分块指标计算 (Chunked Indicators)
+
+多年的分钟线 (每只股票每年约 6 万根) 无法一次性装入内存。本模块按时间把面板切成
+固定大小的块依次计算，块与块之间只保留递推所需的状态:
+
+- 滚动类 (sma / std / rsv / cci / ts_rank / delay): 保留上一块末尾 window - 1 根
+  (CCI 为 2 × (window - 1) 根，delay 为 window 根) 输入
+- 递推类 (ema / MACD / KDJ 的平滑 / rsi / atr): 保留 EWM 的加权值、权重和观测数
+- 差分类 (rsi / atr / obv): 保留上一根收盘价，OBV 另保留累计值
+
+每块的计算量和内存只与块大小、股票数和窗口长度有关，与历史长度无关；
+依次传入各块得到的结果与一次性计算全部历史相同 (只有浮点舍入级别的差异)。
+
+指标名称与依赖图一致 (sma20 / ema12 / std20 / rsi14 / atr14 / cci20 / dif / dea / macd_hist /
+kdj_k / kdj_d / kdj_j / boll_upper / obv ...)，也可以传入自己构建的 {名称: 节点}
+(例如 factor.parse_factor 编译的因子表达式)。
+
+用法:
+    chunked = ChunkedIndicators(['ema12', 'dif', 'dea', 'rsi14', 'boll_upper'])
+    for times, fields in get_minute_store().iter_panels(symbols, '2020-01-01', '2024-12-31', period='5'):
+        values = chunked.update(fields)        # {名称: (股票数, 本块分钟数) 数组}
+        ...
+"""
+from typing import Callable, Dict, Iterable, Mapping, Optional, Union
+
+import numpy as np
+
+from .graph import IndicatorGraph, Node
+from .cross_section import cs_rank, cs_zscore
+from .panel import _delay, _ewm_step, _to_array
+from .precision import to_precision
+from .rolling import rolling_max, rolling_mean, rolling_min, rolling_rank, rolling_std
+
+
+def _with_tail(tail: Optional[np.ndarray], values: np.ndarray) -> np.ndarray:
+    """上一块保留的末尾 + 本块"""
+    return values if tail is None else np.concatenate([tail, values], axis=1)
+
+
+def _keep_tail(extended: np.ndarray, size: int) -> Optional[np.ndarray]:
+    """保留末尾 size 根，供下一块拼接"""
+    if size <= 0:
+        return None
+    return extended[:, -size:].copy()
+
+
+def _windowed(lookback: Callable[[tuple], int], fn: Callable) -> Callable:
+    """
+    滚动类运算的分块实现: 在本块前拼接 lookback 根历史输入，计算后去掉拼接部分
+
+    参数:
+        lookback: params -> 需要的历史长度
+        fn: 面板实现 fn(*输入, *params)
+    """
+    def step(state, inputs, params):
+        size = lookback(params)
+        extended = [_with_tail(None if state is None else state[i], x) for i, x in enumerate(inputs)]
+        t = inputs[0].shape[1]
+        out = fn(*extended, *params)[:, extended[0].shape[1] - t:]
+        return out, [_keep_tail(x, size) for x in extended]
+
+    return step
+
+
+def _cci(high, low, close, window):
+    tp = (high + low + close) / 3
+    ma = rolling_mean(tp, window)
+    md = rolling_mean(np.abs(tp - ma), window)
+    return (tp - ma) / (0.015 * md)
+
+
+def _rsv(high, low, close, window):
+    lowest_low = rolling_min(low, window)
+    highest_high = rolling_max(high, window)
+    return (close - lowest_low) / (highest_high - lowest_low) * 100
+
+
+def _ewm_op(alpha: Callable[[tuple], float]) -> Callable:
+    def step(state, inputs, params):
+        return _ewm_step(inputs[0], alpha(params), state=state)
+
+    return step
+
+
+def _prev_close(state, close):
+    """拼接上一块最后一根收盘价后的前收盘价"""
+    prev = np.full(close.shape, np.nan)
+    prev[:, 1:] = close[:, :-1]
+    if state is not None:
+        prev[:, 0] = state
+    return prev
+
+
+def _rsi(state, inputs, params):
+    close, = inputs
+    window, = params
+    last, gain_state, loss_state = state or (None, None, None)
+    delta = close - _prev_close(last, close)
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+    avg_gain, gain_state = _ewm_step(gain, 1.0 / window, adjust=True, min_periods=window, state=gain_state)
+    avg_loss, loss_state = _ewm_step(loss, 1.0 / window, adjust=True, min_periods=window, state=loss_state)
+    rs = avg_gain / avg_loss
+    rsi = 100 - 100 / (1 + rs)
+    rsi[np.isinf(rsi)] = np.nan
+    return rsi, (close[:, -1].copy(), gain_state, loss_state)
+
+
+def _atr(state, inputs, params):
+    high, low, close = inputs
+    window, = params
+    last, ewm_state = state or (None, None)
+    prev_close = _prev_close(last, close)
+    tr = np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+    atr, ewm_state = _ewm_step(tr, 2.0 / (window + 1.0), state=ewm_state)
+    return atr, (close[:, -1].copy(), ewm_state)
+
+
+def _obv(state, inputs, params):
+    close, volume = inputs
+    last, total = state or (None, np.zeros(close.shape[0]))
+    prev_close = _prev_close(last, close)
+    step = np.where(close > prev_close, volume, np.where(close < prev_close, -volume, 0.0))
+    obv = total[:, np.newaxis] + np.cumsum(step, axis=1)
+    return obv, (close[:, -1].copy(), obv[:, -1].copy())
+
+
+def _stateless(fn: Callable) -> Callable:
+    def step(state, inputs, params):
+        return fn(*inputs, *params), None
+
+    return step
+
+
+# op -> 分块实现 step(上一块状态, 本块输入, params) -> (本块结果, 新状态)
+_CHUNK_OPS: Dict[str, Callable] = {
+    'sma': _windowed(lambda p: p[0] - 1, rolling_mean),
+    'std': _windowed(lambda p: p[0] - 1, rolling_std),
+    'rsv': _windowed(lambda p: p[0] - 1, _rsv),
+    'cci': _windowed(lambda p: 2 * (p[0] - 1), _cci),
+    'ts_rank': _windowed(lambda p: p[0] - 1, rolling_rank),
+    'delay': _windowed(lambda p: p[0], _delay),
+    'ema': _ewm_op(lambda p: 2.0 / (p[0] + 1.0)),
+    'ewm_com': _ewm_op(lambda p: 1.0 / (1.0 + p[0])),
+    'rsi': _rsi,
+    'atr': _atr,
+    'obv': _obv,
+    'cs_rank': _stateless(lambda x: cs_rank(x, pct=True)),
+    'cs_zscore': _stateless(cs_zscore),
+    'const': _stateless(lambda value: value),
+    'abs': _stateless(np.abs),
+    'log': _stateless(np.log),
+    'add': _stateless(lambda a, b: a + b),
+    'sub': _stateless(lambda a, b: a - b),
+    'mul': _stateless(lambda a, b: a * b),
+    'div': _stateless(lambda a, b: a / b),
+    'scale': _stateless(lambda x, k: k * x),
+}
+
+
+class ChunkedIndicators:
+    """
+    按时间分块计算面板指标，块之间传递递推状态
+
+    属性:
+        outputs: {名称: 节点}
+        bars: 已处理的时间点数
+    """
+
+    def __init__(
+        self,
+        outputs: Union[Iterable[str], Mapping[str, Node]],
+        graph: Optional[IndicatorGraph] = None
+    ):
+        """
+        参数:
+            outputs: 输出名列表 (同 compute_indicators) 或 {名称: 节点}
+            graph: 构图使用的依赖图，默认新建
+        """
+        self.graph = graph or IndicatorGraph()
+        self.outputs = self.graph._targets(outputs)
+        self._order = self.graph.plan(self.outputs)
+        for node in self._order:
+            if node.op != 'source' and node.op not in _CHUNK_OPS:
+                raise ValueError(f"不支持分块计算的指标运算: {node.op}")
+        self._state: Dict[tuple, object] = {}
+        self.bars = 0
+
+    def reset(self):
+        """清空状态，从头开始"""
+        self._state = {}
+        self.bars = 0
+
+    def update(self, fields: Mapping[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """
+        计算下一块
+
+        参数:
+            fields: {字段: (股票数, 本块时间点数) 数组}，股票顺序与之前各块一致
+
+        返回:
+            {名称: (股票数, 本块时间点数) 数组}
+        """
+        n, t = _to_array(next(iter(fields.values()))).shape
+        if t == 0:
+            return {name: np.empty((n, 0)) for name in self.outputs}
+
+        remaining: Dict[tuple, int] = {}
+        for node in self._order:
+            for child in node.inputs:
+                remaining[child.key] = remaining.get(child.key, 0) + 1
+        keep = {node.key for node in self.outputs.values()}
+
+        values: Dict[tuple, np.ndarray] = {}
+        for node in self._order:
+            if node.op == 'source':
+                values[node.key] = IndicatorGraph._source_value(fields, node.params[0], panel=True)
+                continue
+            args = [values[child.key] for child in node.inputs]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                values[node.key], self._state[node.key] = _CHUNK_OPS[node.op](
+                    self._state.get(node.key), args, node.params)
+            for child in node.inputs:
+                remaining[child.key] -= 1
+                if remaining[child.key] == 0 and child.key not in keep:
+                    del values[child.key]
+        self.bars += t
+        return {name: to_precision(values[node.key]) for name, node in self.outputs.items()}
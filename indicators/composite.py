@@ -2,20 +2,68 @@
 composite.py - 多指标组合应用
 
 将多个技术指标组合使用，提高信号可靠性
+
+综合评分的每一项为 np.select 的 +1 / -1 / 0 三选一 (不做逐项布尔赋值)，
+单只股票 (generate_composite_signal) 与全市场面板 (panel_composite_signal) 共用同一套规则
 """
 import numpy as np
 import pandas as pd
-from typing import Dict, List, Tuple
-from .ma import calculate_sma, calculate_ema, detect_golden_cross
-from .macd import calculate_macd, detect_macd_golden_cross
-from .rsi import calculate_rsi, detect_oversold, detect_overbought
-from .kdj import calculate_kdj, detect_kdj_golden_cross
-from .boll import calculate_boll
+from typing import Dict, List, Mapping, Tuple
+from .ma import detect_golden_cross
+from .macd import detect_macd_golden_cross
+from .rsi import detect_oversold, detect_overbought
+from .kdj import detect_kdj_golden_cross
+from .graph import compute_indicators
+
+# 综合评分默认权重
+DEFAULT_WEIGHTS = {'ma': 0.2, 'macd': 0.2, 'rsi': 0.2, 'kdj': 0.2, 'boll': 0.2}
+
+# 综合评分各项: (看涨条件 -> +1, 看跌条件 -> -1)，都不满足或指标为 NaN 时为 0
+SCORE_RULES = {
+    'ma': lambda v: (v['sma20'] > v['sma60'], v['sma20'] < v['sma60']),
+    'macd': lambda v: (v['dif'] > v['dea'], v['dif'] < v['dea']),
+    'rsi': lambda v: (v['rsi14'] < 30, v['rsi14'] > 70),            # 超卖看涨，超买卖出
+    'kdj': lambda v: (v['kdj_k'] > v['kdj_d'], v['kdj_k'] < v['kdj_d']),
+    'boll': lambda v: (v['close'] < v['boll_lower'], v['close'] > v['boll_upper']),
+}
+
+# 综合评分用到的指标
+SCORE_INDICATORS = ['sma20', 'sma60', 'dif', 'dea', 'rsi14', 'kdj_k', 'kdj_d', 'boll_lower', 'boll_upper']
+
+
+def composite_score(values: Mapping[str, np.ndarray], weights: Dict[str, float] = None) -> np.ndarray:
+    """
+    按 SCORE_RULES 计算综合评分
+
+    参数:
+        values: {指标名: 数组}，包含 SCORE_INDICATORS 与 close，形状相同 (序列或面板)
+        weights: 各项权重，默认 DEFAULT_WEIGHTS
+
+    返回:
+        与输入同形状的 float64 数组 (-1 到 1)
+    """
+    weights = weights or DEFAULT_WEIGHTS
+    arrays = {name: np.asarray(value, dtype=np.float64) for name, value in values.items()}
+    score = np.zeros(np.shape(arrays['close']))
+    with np.errstate(invalid='ignore'):
+        for name, rule in SCORE_RULES.items():
+            bullish, bearish = rule(arrays)
+            score += np.select([bullish, bearish], [weights[name], -weights[name]], 0.0)
+    return score
 
 
 class CompositeIndicator:
     """多指标组合分析器"""
     
+    # calculate_all_indicators 输出的指标列
+    INDICATORS = [
+        'sma20', 'sma60', 'ema12', 'ema26',         # 移动平均线
+        'dif', 'dea', 'macd_hist',                  # MACD
+        'rsi14',                                    # RSI
+        'kdj_k', 'kdj_d', 'kdj_j',                  # KDJ
+        'boll_middle', 'boll_upper', 'boll_lower',  # 布林带
+    ]
+    
     def __init__(self):
         self.signals = {}
     
@@ -32,37 +80,10 @@ class CompositeIndicator:
         返回:
             添加指标后的 DataFrame
         """
-        close = df['close']
-        high = df['high']
-        low = df['low']
-        volume = df['volume']
-        
-        # 移动平均线
-        df['sma20'] = calculate_sma(close, 20)
-        df['sma60'] = calculate_sma(close, 60)
-        df['ema12'] = calculate_ema(close, 12)
-        df['ema26'] = calculate_ema(close, 26)
-        
-        # MACD
-        dif, dea, macd_hist = calculate_macd(close)
-        df['dif'] = dif
-        df['dea'] = dea
-        df['macd_hist'] = macd_hist
-        
-        # RSI
-        df['rsi14'] = calculate_rsi(close, 14)
-        
-        # KDJ
-        k, d, j = calculate_kdj(high, low, close)
-        df['kdj_k'] = k
-        df['kdj_d'] = d
-        df['kdj_j'] = j
-        
-        # 布林带
-        middle, upper, lower, bandwidth = calculate_boll(close)
-        df['boll_middle'] = middle
-        df['boll_upper'] = upper
-        df['boll_lower'] = lower
+        # 通过指标依赖图计算: ema12/ema26 与 MACD 快慢线、sma20 与布林带中轨共享同一次计算
+        values = compute_indicators(df, self.INDICATORS)
+        for name in self.INDICATORS:
+            df[name] = values[name]
         
         return df
     
@@ -155,47 +176,29 @@ class CompositeIndicator:
         返回:
             综合评分序列 (-1 到 1)
         """
-        if weights is None:
-            weights = {
-                'ma': 0.2,
-                'macd': 0.2,
-                'rsi': 0.2,
-                'kdj': 0.2,
-                'boll': 0.2
-            }
-        
-        score = pd.Series(0.0, index=df.index)
-        
-        # MA 评分
-        ma_score = pd.Series(0, index=df.index)
-        ma_score[df['sma20'] > df['sma60']] = 1
-        ma_score[df['sma20'] < df['sma60']] = -1
-        score += weights['ma'] * ma_score
-        
-        # MACD 评分
-        macd_score = pd.Series(0, index=df.index)
-        macd_score[df['dif'] > df['dea']] = 1
-        macd_score[df['dif'] < df['dea']] = -1
-        score += weights['macd'] * macd_score
-        
-        # RSI 评分
-        rsi_score = pd.Series(0, index=df.index)
-        rsi_score[df['rsi14'] < 30] = 1  # 超卖看涨
-        rsi_score[df['rsi14'] > 70] = -1  # 超买卖出
-        score += weights['rsi'] * rsi_score
-        
-        # KDJ 评分
-        kdj_score = pd.Series(0, index=df.index)
-        kdj_score[df['kdj_k'] > df['kdj_d']] = 1
-        kdj_score[df['kdj_k'] < df['kdj_d']] = -1
-        score += weights['kdj'] * kdj_score
-        
-        # 布林带评分
-        boll_score = pd.Series(0, index=df.index)
-        boll_score[df['close'] < df['boll_lower']] = 1
-        boll_score[df['close'] > df['boll_upper']] = -1
-        score += weights['boll'] * boll_score
+        values = {name: df[name].to_numpy(dtype=np.float64) for name in SCORE_INDICATORS + ['close']}
+        return pd.Series(composite_score(values, weights), index=df.index)
+    
+    def panel_composite_signal(
+        self,
+        fields: Mapping[str, np.ndarray],
+        weights: Dict[str, float] = None
+    ) -> np.ndarray:
+        """
+        全市场综合评分 (每只股票、每个交易日一次算完)
         
+        参数:
+            fields: {字段: (股票数, 交易日数) 数组}，至少包含 close / high / low
+            weights: 各指标权重
+        
+        返回:
+            (股票数, 交易日数) 评分，与逐只调用 generate_composite_signal 相同；
+            收盘价为 NaN (停牌、未上市) 的位置为 NaN，不参与截面排名
+        """
+        values = compute_indicators(fields, SCORE_INDICATORS)
+        values['close'] = np.asarray(fields['close'], dtype=np.float64)
+        score = composite_score(values, weights)
+        score[np.isnan(values['close'])] = np.nan
         return score
     
     def get_strategy_summary(self, df: pd.DataFrame) -> Dict:
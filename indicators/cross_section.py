@@ -0,0 +1,146 @@
+"""
+cross_section.py - 截面排名与选股 (Cross-Sectional Ranking)
+
+面板形状为 (股票数, 交易日数)，截面即同一交易日的一列，一次处理全部交易日:
+
+- cs_rank: 每个交易日内的排名 / 百分位 (同 DataFrame.rank(axis=0, method='average'))，
+  NaN (停牌、未上市) 不参与排名
+- cs_zscore: 每个交易日内的标准化 (减截面均值、除以截面标准差)
+- top_k: 每个交易日得分最高的 k 只股票，用 np.argpartition 找到第 k 大的值，
+  不对整个截面排序；与第 k 名同分时按股票顺序 (面板行号) 取靠前的，结果可复现
+
+用法:
+    score = CompositeIndicator().panel_composite_signal(fields)
+    pct = cs_rank(score, pct=True)          # 每日百分位
+    best = top_k(score, 10)                 # (10, 交易日数) 行号，best[:, -1] 为最新一天
+"""
+from typing import Optional
+
+import numpy as np
+
+
+def _as_columns(values) -> np.ndarray:
+    array = np.asarray(values, dtype=np.float64)
+    return array[:, np.newaxis] if array.ndim == 1 else array
+
+
+def _sorted_ranks(ordered: np.ndarray, valid: np.ndarray) -> np.ndarray:
+    """
+    已沿 axis=0 排好序的截面 -> 排序位置上的平均排名
+
+    参数:
+        ordered: 排序后的值
+        valid: 排序后每个位置是否参与排名 (可以不连续，例如另一张面板缺失的位置)
+
+    返回:
+        与 ordered 同形状，不参与排名的位置为 NaN
+    """
+    n = ordered.shape[0]
+    # 排序后相同值为一组，组内有效值取平均排名: 组前有效数 + (组内有效数 + 1) / 2
+    new_group = ordered[1:] != ordered[:-1]
+    counted = np.cumsum(valid, axis=0, dtype=np.int32)
+    # 累计有效数单调不减: 组首的 "组前有效数" 向后传播，组尾的累计数向前传播
+    before = counted - valid
+    before[1:] *= new_group
+    np.maximum.accumulate(before, axis=0, out=before)
+    through = counted
+    through[:-1][~new_group] = n
+    through = np.minimum.accumulate(through[::-1], axis=0)[::-1]
+    return np.where(valid, (before + through + 1) * 0.5, np.nan)
+
+
+def cs_rank(values, ascending: bool = True, pct: bool = False) -> np.ndarray:
+    """
+    截面排名
+
+    参数:
+        values: (股票数, 交易日数) 数组，一维数组视为一个截面
+        ascending: True 时最小值排名为 1
+        pct: 返回百分位 (排名 / 当日有效股票数)，范围 (0, 1]
+
+    返回:
+        与输入同形状的数组，同值取平均排名，NaN 位置仍为 NaN
+    """
+    x = _as_columns(values)
+    n = x.shape[0]
+    out = np.full(x.shape, np.nan)
+    if n == 0:
+        return out[:, 0] if np.ndim(values) == 1 else out
+    work = x if ascending else -x
+    order = np.argsort(work, axis=0, kind='stable')   # NaN 排在最后
+    ordered = np.take_along_axis(work, order, axis=0)
+    valid = ~np.isnan(ordered)
+    ranks = _sorted_ranks(ordered, valid)
+    if pct:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ranks = ranks / valid.sum(axis=0)
+    np.put_along_axis(out, order, ranks, axis=0)
+    return out[:, 0] if np.ndim(values) == 1 else out
+
+
+def cs_zscore(values) -> np.ndarray:
+    """
+    截面标准化 (x - 当日均值) / 当日标准差 (总体标准差，ddof=0)
+
+    参数:
+        values: (股票数, 交易日数) 数组，一维数组视为一个截面
+
+    返回:
+        与输入同形状的数组，NaN 不参与均值和标准差；当日有效值全部相同时为 NaN
+    """
+    x = _as_columns(values)
+    valid = ~np.isnan(x)
+    count = valid.sum(axis=0)
+    filled = np.where(valid, x, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = filled.sum(axis=0) / count
+        deviation = np.where(valid, x - mean, 0.0)
+        std = np.sqrt((deviation * deviation).sum(axis=0) / count)
+        out = np.where(valid & (std > 0), (x - mean) / std, np.nan)
+    return out[:, 0] if np.ndim(values) == 1 else out
+
+
+def top_k(values, k: int, valid: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    每个交易日得分最高的 k 只股票
+
+    参数:
+        values: (股票数, 交易日数) 得分，NaN 不参与选择；一维数组视为一个截面
+        k: 选取数量
+        valid: 可选的布尔数组，False 的位置不参与选择 (如 ST、停牌)
+
+    返回:
+        (k, 交易日数) 行号数组，按得分从高到低 (同分按行号)，有效股票不足 k 只时用 -1 补齐；
+        一维输入返回长度为 k 的数组
+    """
+    x = _as_columns(values)
+    n, t = x.shape
+    candidate = ~np.isnan(x)
+    if valid is not None:
+        candidate &= _as_columns(valid).astype(bool)
+    k = max(int(k), 0)
+    out = np.full((k, t), -1, dtype=np.int64)
+    if k == 0 or n == 0:
+        return out[:, 0] if np.ndim(values) == 1 else out
+
+    score = np.where(candidate, x, -np.inf)
+    kth = min(k, n) - 1
+    # 每列第 k 大的值 (门槛)，高于门槛的全部入选，等于门槛的按行号补足 k 个
+    kth_row = np.argpartition(-score, kth, axis=0)[kth]
+    threshold = score[kth_row, np.arange(t)]
+    above = (score > threshold) & candidate
+    tied = (score == threshold) & candidate
+    need = np.minimum(k, candidate.sum(axis=0)) - above.sum(axis=0)
+    selected = above | (tied & (np.cumsum(tied, axis=0) <= need))
+
+    cols, rows = np.nonzero(selected.T)
+    counts = selected.sum(axis=0)
+    slot = np.arange(len(rows)) - np.repeat(np.cumsum(counts) - counts, counts)
+    picked = np.full((k, t), -1, dtype=np.int64)
+    picked[slot, cols] = rows
+
+    # 只对选中的 k 个排序: 得分从高到低，同分按行号
+    picked_score = np.where(picked >= 0, np.take_along_axis(score, np.maximum(picked, 0), axis=0), -np.inf)
+    rank = np.lexsort((np.where(picked >= 0, picked, n), -picked_score), axis=0)
+    out = np.take_along_axis(picked, rank, axis=0)
+    return out[:, 0] if np.ndim(values) == 1 else out
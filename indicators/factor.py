@@ -0,0 +1,215 @@
+"""
+factor.py - 因子表达式 (Factor Expressions)
+
+用一行表达式描述因子，编译为指标依赖图 (graph.py) 中的节点，在面板上一次向量化计算全部股票:
+
+    ts_std(close / delay(close, 1) - 1, 20)              # 20 日波动率
+    (close - ts_mean(close, 60)) / ts_mean(close, 60)    # 60 日均线偏离率
+    cs_rank(ts_rank(volume, 20)) - cs_zscore(rsi14)
+
+- 时间序列算子 (沿交易日): ts_mean / ts_std / ts_rank / delay，以及 sma / ema / rsi / atr / cci / obv
+- 截面算子 (同一交易日的全部股票): cs_rank (百分位) / cs_zscore
+- 逐元素: + - * / 、一元负号、abs / log
+- 名称: 行情字段 open / high / low / close / volume / amount，
+  或依赖图的命名输出 sma20 / ema12 / rsi14 / dif / dea / kdj_k / boll_upper / obv ...
+
+表达式用 Python 语法解析 (ast)，只接受上述名称、函数和数字。编译后的节点与依赖图共享:
+ts_mean(close, 20)、sma20 与布林带中轨是同一个节点，多个因子中的相同子表达式只计算一次。
+
+用法:
+    values = compute_factors(PricePanel(), {
+        'volatility': 'ts_std(close / delay(close, 1) - 1, 20)',
+        'deviation': '(close - ts_mean(close, 60)) / ts_mean(close, 60)',
+    }, start='2024-01-01')
+    values['volatility']        # (股票数, 交易日数)
+"""
+import ast
+from typing import Dict, Iterable, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .graph import IndicatorGraph, Node
+
+# 行情字段名
+FIELD_NAMES = ('open', 'high', 'low', 'close', 'volume', 'amount')
+
+# 函数名 -> (依赖图运算, 序列参数个数, 整数参数个数)
+FUNCTIONS: Dict[str, Tuple[str, int, int]] = {
+    'ts_mean': ('sma', 1, 1),
+    'ts_std': ('std', 1, 1),
+    'ts_rank': ('ts_rank', 1, 1),
+    'delay': ('delay', 1, 1),
+    'cs_rank': ('cs_rank', 1, 0),
+    'cs_zscore': ('cs_zscore', 1, 0),
+    'sma': ('sma', 1, 1),
+    'ema': ('ema', 1, 1),
+    'rsi': ('rsi', 1, 1),
+    'atr': ('atr', 3, 1),
+    'cci': ('cci', 3, 1),
+    'obv': ('obv', 2, 0),
+    'abs': ('abs', 1, 0),
+    'log': ('log', 1, 0),
+}
+
+_BINARY_OPS = {ast.Add: 'add', ast.Sub: 'sub', ast.Mult: 'mul', ast.Div: 'div'}
+
+_FOLD = {
+    'add': lambda a, b: a + b,
+    'sub': lambda a, b: a - b,
+    'mul': lambda a, b: a * b,
+    'div': lambda a, b: a / b,
+}
+
+
+class _Compiler:
+    """ast -> 依赖图节点；数字在编译期保留为 float，参与运算时才变成 const 节点"""
+
+    def __init__(self, graph: IndicatorGraph, expression: str):
+        self.graph = graph
+        self.expression = expression
+
+    def error(self, message: str) -> ValueError:
+        return ValueError(f"因子表达式 {self.expression!r}: {message}")
+
+    def node(self, value) -> Node:
+        if isinstance(value, Node):
+            return value
+        return self.graph.node('const', params=(value,))
+
+    def visit(self, tree: ast.AST) -> Union[Node, float]:
+        if isinstance(tree, ast.Expression):
+            return self.visit(tree.body)
+        if isinstance(tree, ast.Constant) and isinstance(tree.value, (int, float)) and not isinstance(tree.value, bool):
+            return float(tree.value)
+        if isinstance(tree, ast.Name):
+            return self.name(tree.id)
+        if isinstance(tree, ast.UnaryOp) and isinstance(tree.op, (ast.USub, ast.UAdd)):
+            operand = self.visit(tree.operand)
+            if isinstance(tree.op, ast.UAdd):
+                return operand
+            return -operand if isinstance(operand, float) else self.graph.scale(operand, -1.0)
+        if isinstance(tree, ast.BinOp) and type(tree.op) in _BINARY_OPS:
+            return self.binary(_BINARY_OPS[type(tree.op)], self.visit(tree.left), self.visit(tree.right))
+        if isinstance(tree, ast.Call):
+            return self.call(tree)
+        raise self.error(f"不支持的语法 {ast.unparse(tree)!r}")
+
+    def name(self, name: str) -> Node:
+        if name in FIELD_NAMES:
+            return self.graph.source(name)
+        try:
+            return self.graph.resolve(name)
+        except KeyError:
+            raise self.error(f"未知的名称 {name!r}") from None
+
+    def binary(self, op: str, left, right) -> Union[Node, float]:
+        if isinstance(left, float) and isinstance(right, float):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return float(_FOLD[op](np.float64(left), np.float64(right)))
+        # 乘以常数与 MACD / KDJ 中的 scale 节点共享
+        if op == 'mul' and isinstance(left, float):
+            return self.graph.scale(right, left)
+        if op == 'mul' and isinstance(right, float):
+            return self.graph.scale(left, right)
+        return self.graph.node(op, self.node(left), self.node(right))
+
+    def call(self, tree: ast.Call) -> Node:
+        if not isinstance(tree.func, ast.Name) or tree.func.id not in FUNCTIONS:
+            raise self.error(f"未知的函数 {ast.unparse(tree.func)!r}，可选 {', '.join(FUNCTIONS)}")
+        if tree.keywords:
+            raise self.error(f"{tree.func.id} 不接受关键字参数")
+        name = tree.func.id
+        op, series_count, param_count = FUNCTIONS[name]
+        if len(tree.args) != series_count + param_count:
+            raise self.error(f"{name} 需要 {series_count + param_count} 个参数，实际 {len(tree.args)} 个")
+
+        inputs = []
+        for arg in tree.args[:series_count]:
+            value = self.visit(arg)
+            if not isinstance(value, Node):
+                raise self.error(f"{name} 的第 {len(inputs) + 1} 个参数应为序列")
+            inputs.append(value)
+        params = []
+        for arg in tree.args[series_count:]:
+            if not (isinstance(arg, ast.Constant) and type(arg.value) is int):
+                raise self.error(f"{name} 的周期参数应为整数常量，实际 {ast.unparse(arg)!r}")
+            lowest = 0 if op == 'delay' else 1
+            if arg.value < lowest:
+                raise self.error(f"{name} 的周期参数应不小于 {lowest}，实际 {arg.value}")
+            params.append(arg.value)
+        return self.graph.node(op, *inputs, params=tuple(params))
+
+
+def parse_factor(expression: str, graph: Optional[IndicatorGraph] = None) -> Node:
+    """
+    编译因子表达式
+
+    参数:
+        expression: 表达式字符串，如 'ts_std(close / delay(close, 1) - 1, 20)'
+        graph: 构图使用的依赖图，默认新建
+
+    返回:
+        依赖图节点，可直接传给 graph.evaluate / ChunkedIndicators
+    """
+    graph = graph or IndicatorGraph()
+    compiler = _Compiler(graph, expression)
+    try:
+        tree = ast.parse(expression.strip(), mode='eval')
+    except SyntaxError as exc:
+        raise compiler.error(f"语法错误 ({exc.msg})") from None
+    return compiler.node(compiler.visit(tree))
+
+
+class _PanelFields(Mapping):
+    """PricePanel 的按需字段视图: 只读取表达式用到的字段"""
+
+    def __init__(self, panel, symbols, start, end):
+        self.panel = panel
+        self.symbols = symbols
+        self.start = start
+        self.end = end
+
+    def __contains__(self, field) -> bool:
+        return field in self.panel.field_index
+
+    def __getitem__(self, field: str) -> np.ndarray:
+        if field not in self.panel.field_index:
+            raise KeyError(field)
+        return self.panel.select(self.symbols, self.start, self.end, fields=field)
+
+    def __iter__(self):
+        return iter(self.panel.fields)
+
+    def __len__(self) -> int:
+        return len(self.panel.fields)
+
+
+def compute_factors(
+    data,
+    factors: Union[Iterable[str], Mapping[str, str]],
+    graph: Optional[IndicatorGraph] = None,
+    symbols: Optional[Sequence[str]] = None,
+    start=None,
+    end=None
+) -> Dict[str, np.ndarray]:
+    """
+    计算一组因子，全部因子共用一张图，相同子表达式只计算一次
+
+    参数:
+        data: PricePanel，{字段: (股票数, 交易日数) 数组}，或单只股票的日线 DataFrame (不支持截面算子)
+        factors: {因子名: 表达式}，或表达式列表 (以表达式本身为名)
+        graph: 依赖图，默认每次调用新建 (表达式各不相同，建在全局图上会使其无限增长)
+        symbols: data 为 PricePanel 时选取的股票，默认全部
+        start: data 为 PricePanel 时的开始日期；滚动窗口从这一天开始累计，需要预留足够的历史
+        end: data 为 PricePanel 时的结束日期
+
+    返回:
+        {因子名: (股票数, 交易日数) 数组}，DataFrame 输入返回 Series
+    """
+    graph = graph or IndicatorGraph()
+    if not isinstance(factors, Mapping):
+        factors = {expression: expression for expression in factors}
+    targets = {name: parse_factor(expression, graph) for name, expression in factors.items()}
+    if hasattr(data, 'field_index') and hasattr(data, 'select'):
+        data = _PanelFields(data, symbols, start, end)
+    return graph.evaluate(data, targets)
@@ -0,0 +1,311 @@
+"""
+graph.py - 指标依赖图 (Indicator Graph)
+
+每个指标声明自己的输入，组成有向无环图:
+
+    close ─┬─ ema(12) ─┐
+           ├─ ema(26) ─┴─ sub ─ dif ─ ema(9) ─ dea
+           ├─ sma(20) ─┬─ boll_middle / sma20
+           └─ std(20) ─┘
+
+- 相同运算、相同输入、相同参数的节点只创建一次 (公共子表达式消除)，
+  例如 ema12 与 MACD 的快线、sma20 与布林带中轨是同一个节点
+- 求值时只计算请求的输出所依赖的节点，每个节点只算一次，
+  中间结果在最后一个使用者算完后立即释放
+- 输入为 DataFrame 时按单序列计算 (结果与 calculate_* 完全一致)；
+  输入为 {字段: (股票数, 交易日数) 数组} 时使用 panel 中的面板算子
+- 图只增不减，策略参数、因子表达式等按调用变化的节点都建在每次调用新建的图上；
+  节点按 (运算, 输入, 参数) 求值，不依赖所在的图
+
+用法:
+    values = compute_indicators(df, ['sma20', 'ema12', 'dif', 'dea', 'boll_upper'])
+
+    graph = IndicatorGraph()
+    close = graph.source('close')
+    middle, upper, lower, _ = graph.boll(close, 30, 2.5)
+    values = graph.evaluate(df, {'ma': middle, 'upper': upper})
+"""
+import re
+from typing import Callable, Dict, Iterable, List, Mapping, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .ma import calculate_sma, calculate_ema
+from .rsi import calculate_rsi
+from .kdj import calculate_rsv
+from .atr import calculate_atr
+from .cci import calculate_cci
+from .obv import calculate_obv
+from .cross_section import cs_rank, cs_zscore
+from .panel import (
+    _delay, _ewm, _to_array, panel_atr, panel_cci, panel_ema, panel_obv,
+    panel_rsi, panel_rsv, panel_sma,
+)
+from .precision import to_precision
+from .rolling import rolling_rank, rolling_std
+
+# 规范字段名 -> 数据源中文列名
+_SOURCE_COLUMNS = {'open': '开盘', 'high': '最高', 'low': '最低', 'close': '收盘', 'volume': '成交量', 'amount': '成交额'}
+
+
+class Node:
+    """图中的一个运算: op(inputs..., params...)"""
+
+    __slots__ = ('op', 'inputs', 'params', 'key')
+
+    def __init__(self, op: str, inputs: Tuple['Node', ...], params: tuple):
+        self.op = op
+        self.inputs = inputs
+        self.params = params
+        self.key = (op, tuple(node.key for node in inputs), params)
+
+    def __repr__(self) -> str:
+        args = [repr(node) for node in self.inputs] + [repr(p) for p in self.params]
+        return f"{self.op}({', '.join(args)})"
+
+
+def _cross_section_only(name: str) -> Callable:
+    def fn(*args):
+        raise ValueError(f"截面算子 {name} 只能用于面板输入")
+
+    return fn
+
+
+# op -> (单序列实现, 面板实现)，参数为 (*输入值, *params)
+_OPS: Dict[str, Tuple[Callable, Callable]] = {
+    'sma': (calculate_sma, lambda x, w: panel_sma(x, w)),
+    'std': (lambda x, w: x.rolling(window=w).std(), rolling_std),
+    'ema': (calculate_ema, lambda x, w: panel_ema(x, w)),
+    'ewm_com': (lambda x, com: x.ewm(com=com, adjust=False).mean(), lambda x, com: _ewm(x, 1.0 / (1.0 + com))),
+    'rsv': (calculate_rsv, panel_rsv),
+    'rsi': (calculate_rsi, panel_rsi),
+    'atr': (calculate_atr, panel_atr),
+    'cci': (calculate_cci, panel_cci),
+    'obv': (calculate_obv, panel_obv),
+    'ts_rank': (lambda x, w: x.rolling(window=w).rank(pct=True), rolling_rank),
+    'delay': (lambda x, d: x.shift(d), _delay),
+    'cs_rank': (_cross_section_only('cs_rank'), lambda x: cs_rank(x, pct=True)),
+    'cs_zscore': (_cross_section_only('cs_zscore'), cs_zscore),
+    'const': (lambda value: value,) * 2,
+    'abs': (np.abs,) * 2,
+    'log': (np.log,) * 2,
+    'add': (lambda a, b: a + b,) * 2,
+    'sub': (lambda a, b: a - b,) * 2,
+    'mul': (lambda a, b: a * b,) * 2,
+    'div': (lambda a, b: a / b,) * 2,
+    'scale': (lambda x, k: k * x,) * 2,
+}
+
+# 带周期的输出名，如 sma20 / ema12 / std20 / rsi14 / atr14 / cci20
+_PERIOD_NAME = re.compile(r'^(sma|ema|std|rsi|atr|cci)(\d+)$')
+
+
+class IndicatorGraph:
+    """
+    指标依赖图
+
+    统计信息 (stats):
+        nodes: 图中的节点数 (去重后)
+        evaluated: 累计实际计算的节点数
+    """
+
+    def __init__(self):
+        self._nodes: Dict[tuple, Node] = {}
+        self.outputs: Dict[str, Node] = {}
+        self.stats = {'nodes': 0, 'evaluated': 0}
+        self._register_defaults()
+
+    # ==================== 构图 ====================
+
+    def node(self, op: str, *inputs: Node, params: tuple = ()) -> Node:
+        """创建节点；相同 (运算, 输入, 参数) 的节点只保留一个"""
+        if op != 'source' and op not in _OPS:
+            raise ValueError(f"未知的指标运算: {op}")
+        candidate = Node(op, tuple(inputs), tuple(params))
+        existing = self._nodes.get(candidate.key)
+        if existing is not None:
+            return existing
+        self._nodes[candidate.key] = candidate
+        self.stats['nodes'] = len(self._nodes)
+        return candidate
+
+    def source(self, field: str) -> Node:
+        """行情字段 (close / high / low / volume ...)"""
+        return self.node('source', params=(field,))
+
+    def sma(self, x: Node, window: int) -> Node:
+        return self.node('sma', x, params=(window,))
+
+    def std(self, x: Node, window: int) -> Node:
+        return self.node('std', x, params=(window,))
+
+    def ema(self, x: Node, window: int) -> Node:
+        return self.node('ema', x, params=(window,))
+
+    def add(self, a: Node, b: Node) -> Node:
+        return self.node('add', a, b)
+
+    def sub(self, a: Node, b: Node) -> Node:
+        return self.node('sub', a, b)
+
+    def div(self, a: Node, b: Node) -> Node:
+        return self.node('div', a, b)
+
+    def scale(self, x: Node, k: float) -> Node:
+        return self.node('scale', x, params=(k,))
+
+    def macd(self, close: Node, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9) -> Tuple[Node, Node, Node]:
+        """(DIF, DEA, MACD 柱)，快慢线与同周期的 ema 节点共享"""
+        dif = self.sub(self.ema(close, fast_period), self.ema(close, slow_period))
+        dea = self.ema(dif, signal_period)
+        return dif, dea, self.scale(self.sub(dif, dea), 2)
+
+    def boll(self, close: Node, window: int = 20, num_std: float = 2.0) -> Tuple[Node, Node, Node, Node]:
+        """(中轨，上轨，下轨，带宽)，中轨与同周期的 sma 节点共享"""
+        middle = self.sma(close, window)
+        width = self.scale(self.std(close, window), num_std)
+        upper = self.add(middle, width)
+        lower = self.sub(middle, width)
+        bandwidth = self.scale(self.div(self.sub(upper, lower), middle), 100)
+        return middle, upper, lower, bandwidth
+
+    def kdj(self, high: Node, low: Node, close: Node, n: int = 9, m1: int = 3, m2: int = 3) -> Tuple[Node, Node, Node]:
+        """(K, D, J)"""
+        rsv = self.node('rsv', high, low, close, params=(n,))
+        k = self.node('ewm_com', rsv, params=(m2 - 1,))
+        d = self.node('ewm_com', k, params=(m1 - 1,))
+        return k, d, self.sub(self.scale(k, 3), self.scale(d, 2))
+
+    def _register_defaults(self):
+        """默认参数的命名输出 (与 CompositeIndicator 的列名一致)"""
+        close, high, low = self.source('close'), self.source('high'), self.source('low')
+        for name, node in zip(('dif', 'dea', 'macd_hist'), self.macd(close)):
+            self.outputs[name] = node
+        for name, node in zip(('kdj_k', 'kdj_d', 'kdj_j'), self.kdj(high, low, close)):
+            self.outputs[name] = node
+        for name, node in zip(('boll_middle', 'boll_upper', 'boll_lower', 'boll_bandwidth'), self.boll(close)):
+            self.outputs[name] = node
+        self.outputs['obv'] = self.node('obv', close, self.source('volume'))
+
+    def resolve(self, name: str) -> Node:
+        """
+        命名输出 -> 节点
+
+        支持已注册的名称 (dif / dea / macd_hist / kdj_k / boll_upper / obv ...)
+        以及带周期的名称 (sma20 / ema12 / std20 / rsi14 / atr14 / cci20)
+        """
+        if name in self.outputs:
+            return self.outputs[name]
+        match = _PERIOD_NAME.match(name)
+        if match is None:
+            raise KeyError(f"未知的指标输出: {name}")
+        op, window = match.group(1), int(match.group(2))
+        close = self.source('close')
+        if op in ('atr', 'cci'):
+            node = self.node(op, self.source('high'), self.source('low'), close, params=(window,))
+        else:
+            node = self.node(op, close, params=(window,))
+        self.outputs[name] = node
+        return node
+
+    # ==================== 求值 ====================
+
+    def _targets(self, outputs: Union[Iterable[str], Mapping[str, Node]]) -> Dict[str, Node]:
+        if isinstance(outputs, Mapping):
+            return dict(outputs)
+        return {name: self.resolve(name) for name in outputs}
+
+    def plan(self, outputs: Union[Iterable[str], Mapping[str, Node]]) -> List[Node]:
+        """
+        求值顺序 (拓扑序)
+
+        参数:
+            outputs: 输出名列表或 {名称: 节点}
+
+        返回:
+            需要计算的节点列表，只包含请求的输出依赖的节点，每个节点出现一次
+        """
+        order: List[Node] = []
+        seen = set()
+
+        def visit(node: Node):
+            if node.key in seen:
+                return
+            seen.add(node.key)
+            for child in node.inputs:
+                visit(child)
+            order.append(node)
+
+        for node in self._targets(outputs).values():
+            visit(node)
+        return order
+
+    @staticmethod
+    def _source_value(data, field: str, panel: bool):
+        column = field if field in data else _SOURCE_COLUMNS.get(field, field)
+        value = data[column]
+        return _to_array(value) if panel else value
+
+    def evaluate(self, data, outputs: Union[Iterable[str], Mapping[str, Node]]) -> Dict[str, Union[pd.Series, np.ndarray]]:
+        """
+        计算请求的输出
+
+        参数:
+            data: 日线 DataFrame (英文或中文列名)，或 {字段: (股票数, 交易日数) 数组}
+            outputs: 输出名列表或 {名称: 节点}
+
+        返回:
+            {名称: 指标值}，DataFrame 输入返回 Series，面板输入返回数组
+        """
+        targets = self._targets(outputs)
+        order = self.plan(targets)
+        panel = not isinstance(data, pd.DataFrame)
+
+        # 每个节点还有多少个使用者，归零后释放中间结果
+        remaining: Dict[tuple, int] = {}
+        for node in order:
+            for child in node.inputs:
+                remaining[child.key] = remaining.get(child.key, 0) + 1
+        keep = {node.key for node in targets.values()}
+
+        values: Dict[tuple, object] = {}
+        for node in order:
+            if node.op == 'source':
+                values[node.key] = self._source_value(data, node.params[0], panel)
+                continue
+            args = [values[child.key] for child in node.inputs]
+            fn = _OPS[node.op][1 if panel else 0]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                values[node.key] = fn(*args, *node.params)
+            self.stats['evaluated'] += 1
+            for child in node.inputs:
+                remaining[child.key] -= 1
+                if remaining[child.key] == 0 and child.key not in keep:
+                    del values[child.key]
+        return {name: to_precision(values[node.key]) for name, node in targets.items()}
+
+
+_graph = None
+
+
+def get_indicator_graph() -> IndicatorGraph:
+    """获取全局指标依赖图 (节点与命名输出不会释放，只用于固定的一组指标)"""
+    global _graph
+    if _graph is None:
+        _graph = IndicatorGraph()
+    return _graph
+
+
+def compute_indicators(data, names: Iterable[str]) -> Dict[str, Union[pd.Series, np.ndarray]]:
+    """
+    便捷函数: 在新建的依赖图上计算命名指标 (默认输出的图很小，构图开销可以忽略)
+
+    参数:
+        data: 日线 DataFrame 或面板字段字典
+        names: 输出名列表，如 ['sma20', 'ema12', 'dif', 'dea', 'rsi14', 'boll_upper']
+
+    返回:
+        {名称: 指标值}
+    """
+    return IndicatorGraph().evaluate(data, list(names))
@@ -6,6 +6,8 @@ KDJ 又称随机指标，用于判断超买超卖
 import numpy as np
 import pandas as pd
 from typing import Tuple
+from .cache import memoize
+from .precision import with_precision
 
 
 def calculate_rsv(
@@ -35,6 +37,8 @@ def calculate_rsv(
     return rsv
 
 
+@memoize
+@with_precision
 def calculate_kdj(
     high: pd.Series,
     low: pd.Series,
@@ -5,12 +5,18 @@ ma.py - 移动平均线指标 (Moving Average)
 - SMA: 简单移动平均
 - EMA: 指数移动平均
 - WMA: 加权移动平均
+- SMA 网格: 一组周期共用一次前缀和
 """
 import numpy as np
 import pandas as pd
 from typing import Union
+from .cache import memoize
+from .precision import with_precision
+from .rolling import rolling_mean_grid
 
 
+@memoize
+@with_precision
 def calculate_sma(series: Union[pd.Series, np.ndarray], window: int) -> pd.Series:
     """
     计算简单移动平均线 (Simple Moving Average)
@@ -28,6 +34,8 @@ def calculate_sma(series: Union[pd.Series, np.ndarray], window: int) -> pd.Serie
     return series.rolling(window=window).mean()
 
 
+@memoize
+@with_precision
 def calculate_ema(series: Union[pd.Series, np.ndarray], window: int) -> pd.Series:
     """
     计算指数移动平均线 (Exponential Moving Average)
@@ -47,6 +55,8 @@ def calculate_ema(series: Union[pd.Series, np.ndarray], window: int) -> pd.Serie
     return series.ewm(span=window, adjust=False).mean()
 
 
+@memoize
+@with_precision
 def calculate_wma(series: Union[pd.Series, np.ndarray], window: int) -> pd.Series:
     """
     计算加权移动平均线 (Weighted Moving Average)
@@ -70,6 +80,26 @@ def calculate_wma(series: Union[pd.Series, np.ndarray], window: int) -> pd.Serie
     return series.rolling(window=window).apply(wma_func, raw=True)
 
 
+@memoize
+@with_precision
+def calculate_sma_grid(series: Union[pd.Series, np.ndarray], windows) -> np.ndarray:
+    """
+    一次计算多个周期的简单移动平均 (参数扫描用)
+
+    所有周期共用一次前缀和，每个周期只做一次相减，
+    计算 5..250 共 246 条均线的开销约等于一次滚动计算
+
+    参数:
+        series: 价格序列
+        windows: 周期列表，如 range(5, 251)
+
+    返回:
+        (周期数, 序列长度) 数组，第 k 行与 calculate_sma(series, windows[k]) 相同
+    """
+    values = series.to_numpy(dtype=np.float64) if isinstance(series, pd.Series) else np.asarray(series, dtype=np.float64)
+    return rolling_mean_grid(values, list(windows))
+
+
 def detect_golden_cross(short_ma: pd.Series, long_ma: pd.Series) -> pd.Series:
     """
     检测金叉信号 (短期均线上穿长期均线)
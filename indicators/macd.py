@@ -7,8 +7,13 @@ import numpy as np
 import pandas as pd
 from typing import Tuple
 from .ma import calculate_ema
+from .panel import panel_macd_divergence
+from .cache import memoize
+from .precision import with_precision
 
 
+@memoize
+@with_precision
 def calculate_macd(
     close: pd.Series,
     fast_period: int = 12,
@@ -94,23 +99,9 @@ def detect_bullish_divergence(
     返回:
         底背离信号序列
     """
-    signal = pd.Series(0, index=close.index)
-    
-    for i in range(window, len(close)):
-        # 检查价格是否创新低
-        price_window = close.iloc[i-window:i+1]
-        current_price_low = price_window.min()
-        
-        # 检查 DIF 是否未创新低
-        dif_window = dif.iloc[i-window:i+1]
-        
-        # 简化版背离检测
-        if (close.iloc[i] < close.iloc[i-5] and 
-            dif.iloc[i] > dif.iloc[i-5] and
-            dif.iloc[i] > 0):
-            signal.iloc[i] = 1
-    
-    return signal
+    # 简化版背离检测：价格低于 5 日前，DIF 高于 5 日前且在零轴上方
+    bullish, _ = panel_macd_divergence(close.to_numpy(), dif.to_numpy(), window)
+    return pd.Series(bullish, index=close.index)
 
 
 def detect_bearish_divergence(
@@ -131,16 +122,9 @@ def detect_bearish_divergence(
     返回:
         顶背离信号序列
     """
-    signal = pd.Series(0, index=close.index)
-    
-    for i in range(window, len(close)):
-        # 简化版背离检测
-        if (close.iloc[i] > close.iloc[i-5] and 
-            dif.iloc[i] < dif.iloc[i-5] and
-            dif.iloc[i] < 0):
-            signal.iloc[i] = 1
-    
-    return signal
+    # 简化版背离检测：价格高于 5 日前，DIF 低于 5 日前且在零轴下方
+    _, bearish = panel_macd_divergence(close.to_numpy(), dif.to_numpy(), window)
+    return pd.Series(bearish, index=close.index)
 
 
 def macd_trend(dif: pd.Series, lookback: int = 5) -> str:
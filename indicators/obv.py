@@ -6,8 +6,13 @@ obv.py - OBV 能量潮指标 (On-Balance Volume)
 import numpy as np
 import pandas as pd
 from .ma import calculate_sma
+from .panel import panel_divergence, panel_obv
+from .cache import memoize
+from .precision import with_precision
 
 
+@memoize
+@with_precision
 def calculate_obv(close: pd.Series, volume: pd.Series) -> pd.Series:
     """
     计算 OBV 能量潮
@@ -24,17 +29,9 @@ def calculate_obv(close: pd.Series, volume: pd.Series) -> pd.Series:
     返回:
         OBV 序列
     """
-    obv = pd.Series(0.0, index=close.index)
-    
-    for i in range(1, len(close)):
-        if close.iloc[i] > close.iloc[i-1]:
-            obv.iloc[i] = obv.iloc[i-1] + volume.iloc[i]
-        elif close.iloc[i] < close.iloc[i-1]:
-            obv.iloc[i] = obv.iloc[i-1] - volume.iloc[i]
-        else:
-            obv.iloc[i] = obv.iloc[i-1]
-    
-    return obv
+    # 按涨跌方向取正负号的成交量累加
+    obv = panel_obv(close.to_numpy(), volume.to_numpy())
+    return pd.Series(obv, index=close.index)
 
 
 def calculate_obv_ma(obv: pd.Series, window: int = 30) -> pd.Series:
@@ -96,21 +93,10 @@ def detect_divergence(
     返回:
         (底背离，顶背离)
     """
-    bullish_div = pd.Series(0, index=close.index)
-    bearish_div = pd.Series(0, index=close.index)
-    
-    for i in range(window, len(close)):
-        # 底背离：价格创新低，OBV 未创新低
-        if (close.iloc[i] < close.iloc[i-window:i].min() and
-            obv.iloc[i] > obv.iloc[i-window:i].min()):
-            bullish_div.iloc[i] = 1
-        
-        # 顶背离：价格创新高，OBV 未创新高
-        if (close.iloc[i] > close.iloc[i-window:i].max() and
-            obv.iloc[i] < obv.iloc[i-window:i].max()):
-            bearish_div.iloc[i] = 1
-    
-    return bullish_div, bearish_div
+    # 底背离：价格创新低，OBV 未创新低；顶背离：价格创新高，OBV 未创新高
+    # 与前 window 日 (不含当日) 的滚动最值比较
+    bullish, bearish = panel_divergence(close.to_numpy(), obv.to_numpy(), window)
+    return pd.Series(bullish, index=close.index), pd.Series(bearish, index=close.index)
 
 
 # ==================== 使用示例 ====================
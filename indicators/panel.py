@@ -0,0 +1,459 @@
+"""
+panel.py - 面板指标 (多股票 × 多交易日 向量化计算)
+
+单序列函数每次只算一只股票，全市场选股需要调用 5000 × k 次。
+本模块的函数一次计算整个面板:
+
+- ndarray 输入: 形状 (股票数, 交易日数)，沿 axis=1 (时间) 计算，
+  与 PricePanel.field('close') / PricePanel.window(...) 的形状一致；一维数组视为单只股票
+- DataFrame 输入: 宽表，行为交易日、列为股票代码，返回同样形状的 DataFrame
+
+计算语义与 ma / macd / rsi / kdj / boll / atr / cci / obv 中的单序列函数一致
+(包括前导 NaN、停牌 NaN 和 min_periods 的处理)，结果只有浮点舍入级别的差异。
+
+用法:
+    close = panel.window(120, fields='close')
+    dif, dea, hist = panel_macd(close)
+    golden = (dif[:, -1] > dea[:, -1]) & (dif[:, -2] <= dea[:, -2])
+"""
+from typing import Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .cache import memoize
+from .precision import with_precision
+from .rolling import rolling_max, rolling_mean, rolling_mean_std, rolling_min
+
+PanelLike = Union[np.ndarray, pd.DataFrame]
+
+# ==================== 输入输出 ====================
+
+def _to_array(values: PanelLike) -> np.ndarray:
+    """转换为 float64 的 (股票数, 交易日数) 数组"""
+    if isinstance(values, pd.DataFrame):
+        return values.to_numpy(dtype=np.float64).T
+    if isinstance(values, pd.Series):
+        return values.to_numpy(dtype=np.float64)[np.newaxis, :]
+    array = np.asarray(values, dtype=np.float64)
+    return array[np.newaxis, :] if array.ndim == 1 else array
+
+
+def _wrap(result: np.ndarray, like: PanelLike) -> PanelLike:
+    """按输入类型还原输出"""
+    if isinstance(like, pd.DataFrame):
+        return pd.DataFrame(result.T, index=like.index, columns=like.columns)
+    if isinstance(like, pd.Series):
+        return pd.Series(result[0], index=like.index, name=like.name)
+    return result[0] if np.ndim(like) == 1 else result
+
+
+# ==================== 基础算子 ====================
+
+def _diff(values: np.ndarray) -> np.ndarray:
+    """沿时间差分 (同 Series.diff())"""
+    out = np.full(values.shape, np.nan)
+    out[:, 1:] = values[:, 1:] - values[:, :-1]
+    return out
+
+
+def _delay(values: np.ndarray, periods: int) -> np.ndarray:
+    """沿时间后移 periods 日 (同 Series.shift(periods))，periods 为负时前移"""
+    out = np.full(values.shape, np.nan)
+    if periods == 0:
+        out[:] = values
+    elif 0 < periods < values.shape[1]:
+        out[:, periods:] = values[:, :-periods]
+    elif 0 < -periods < values.shape[1]:
+        out[:, :periods] = values[:, -periods:]
+    return out
+
+
+def _prior_extreme(values: np.ndarray, window: int, mode: str) -> np.ndarray:
+    """
+    前 window 日 (不含当日) 的最小/最大值，忽略 NaN
+
+    与 Series.iloc[i-window:i].min() / max() 相同，前 window 日为 NaN
+    """
+    out = np.full(values.shape, np.nan)
+    n, t = values.shape
+    if window <= 0 or window >= t or n == 0:
+        return out
+    rolling = pd.DataFrame(values.T).rolling(window, min_periods=1)
+    extreme = (rolling.min() if mode == 'min' else rolling.max()).to_numpy().T
+    out[:, window:] = extreme[:, window - 1:-1]
+    return out
+
+
+def _ewm(values: np.ndarray, alpha: float, adjust: bool = False, min_periods: int = 0) -> np.ndarray:
+    """
+    指数加权平均 (逐日递推，所有股票同时计算)
+
+    与 pandas ewm(alpha=..., adjust=..., min_periods=...).mean() 的递推完全相同:
+    前导 NaN 保持为 NaN，中间 NaN 沿用上一个值且旧权重继续衰减
+
+    参数:
+        values: (股票数, 交易日数) 数组
+        alpha: 平滑系数
+        adjust: 同 pandas adjust 参数
+        min_periods: 有效观测数不足时输出 NaN
+    """
+    return _ewm_step(values, alpha, adjust, min_periods)[0]
+
+
+def _ewm_step(
+    values: np.ndarray,
+    alpha: float,
+    adjust: bool = False,
+    min_periods: int = 0,
+    state: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+) -> Tuple[np.ndarray, Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    从上一段的递推状态继续计算 _ewm (分块计算长历史时使用)
+
+    参数:
+        values: 本段 (股票数, 交易日数) 数组
+        alpha / adjust / min_periods: 同 _ewm
+        state: 上一段返回的状态，None 表示从头开始
+
+    返回:
+        (本段结果, 状态 (加权值, 旧权重, 有效观测数))，依次传入各段的结果与一次性计算相同
+    """
+    n, t = values.shape
+    if state is None:
+        weighted, old_wt, nobs = np.full(n, np.nan), np.ones(n), np.zeros(n, dtype=np.int64)
+    else:
+        weighted, old_wt, nobs = (part.copy() for part in state)
+    out = np.full((t, n), np.nan)
+    series = np.ascontiguousarray(values.T)
+    old_wt_factor = 1.0 - alpha
+    new_wt = 1.0 if adjust else alpha
+    minp = max(min_periods, 1)
+
+    for i in range(t):
+        cur = series[i]
+        is_obs = ~np.isnan(cur)
+        nobs += is_obs
+        started = ~np.isnan(weighted)
+        old_wt = np.where(started, old_wt * old_wt_factor, old_wt)
+        blend = started & is_obs
+        mixed = (old_wt * weighted + new_wt * cur) / (old_wt + new_wt)
+        weighted = np.where(blend & (weighted != cur), mixed, weighted)
+        if adjust:
+            old_wt = np.where(blend, old_wt + new_wt, old_wt)
+        else:
+            old_wt = np.where(blend, 1.0, old_wt)
+        weighted = np.where(~started & is_obs, cur, weighted)
+        out[i] = np.where(nobs >= minp, weighted, np.nan)
+    return out.T, (weighted, old_wt, nobs)
+
+
+# ==================== 指标 ====================
+
+@memoize
+@with_precision
+def panel_sma(close: PanelLike, window: int) -> PanelLike:
+    """
+    面板简单移动平均 (同 calculate_sma)
+
+    参数:
+        close: 价格面板
+        window: 周期数
+
+    返回:
+        SMA 面板
+    """
+    return _wrap(rolling_mean(_to_array(close), window), close)
+
+
+@memoize
+@with_precision
+def panel_ema(close: PanelLike, window: int) -> PanelLike:
+    """
+    面板指数移动平均 (同 calculate_ema，α = 2 / (window + 1))
+
+    参数:
+        close: 价格面板
+        window: 周期数
+
+    返回:
+        EMA 面板
+    """
+    return _wrap(_ewm(_to_array(close), 2.0 / (window + 1.0)), close)
+
+
+@memoize
+@with_precision
+def panel_macd(
+    close: PanelLike,
+    fast_period: int = 12,
+    slow_period: int = 26,
+    signal_period: int = 9
+) -> Tuple[PanelLike, PanelLike, PanelLike]:
+    """
+    面板 MACD (同 calculate_macd)
+
+    参数:
+        close: 收盘价面板
+        fast_period: 快线周期，默认 12
+        slow_period: 慢线周期，默认 26
+        signal_period: 信号线周期，默认 9
+
+    返回:
+        (DIF, DEA, MACD 柱) 三元组
+    """
+    values = _to_array(close)
+    dif = _ewm(values, 2.0 / (fast_period + 1.0)) - _ewm(values, 2.0 / (slow_period + 1.0))
+    dea = _ewm(dif, 2.0 / (signal_period + 1.0))
+    hist = 2 * (dif - dea)
+    return _wrap(dif, close), _wrap(dea, close), _wrap(hist, close)
+
+
+@memoize
+@with_precision
+def panel_rsi(close: PanelLike, window: int = 14) -> PanelLike:
+    """
+    面板 RSI (同 calculate_rsi)
+
+    参数:
+        close: 收盘价面板
+        window: 周期数，默认 14
+
+    返回:
+        RSI 面板
+    """
+    delta = _diff(_to_array(close))
+    # 与 Series.where 一致: 差分为 NaN 的位置记为 0
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = np.where(delta < 0, -delta, 0.0)
+
+    alpha = 1.0 / window
+    avg_gain = _ewm(gain, alpha, adjust=True, min_periods=window)
+    avg_loss = _ewm(loss, alpha, adjust=True, min_periods=window)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = avg_gain / avg_loss
+        rsi = 100 - 100 / (1 + rs)
+    rsi[np.isinf(rsi)] = np.nan
+    return _wrap(rsi, close)
+
+
+def panel_rsv(high: PanelLike, low: PanelLike, close: PanelLike, window: int = 9) -> PanelLike:
+    """
+    面板 RSV (同 calculate_rsv)
+
+    参数:
+        high: 最高价面板
+        low: 最低价面板
+        close: 收盘价面板
+        window: 周期数，默认 9
+
+    返回:
+        RSV 面板
+    """
+    lowest_low = rolling_min(_to_array(low), window)
+    highest_high = rolling_max(_to_array(high), window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsv = (_to_array(close) - lowest_low) / (highest_high - lowest_low) * 100
+    return _wrap(rsv, close)
+
+
+@memoize
+@with_precision
+def panel_kdj(
+    high: PanelLike,
+    low: PanelLike,
+    close: PanelLike,
+    n: int = 9,
+    m1: int = 3,
+    m2: int = 3
+) -> Tuple[PanelLike, PanelLike, PanelLike]:
+    """
+    面板 KDJ (同 calculate_kdj)
+
+    参数:
+        high: 最高价面板
+        low: 最低价面板
+        close: 收盘价面板
+        n: RSV 周期，默认 9
+        m1: D 的平滑周期，默认 3
+        m2: K 的平滑周期，默认 3
+
+    返回:
+        (K, D, J) 三元组
+    """
+    rsv = _to_array(panel_rsv(_to_array(high), _to_array(low), _to_array(close), n))
+    k = _ewm(rsv, 1.0 / m2)
+    d = _ewm(k, 1.0 / m1)
+    j = 3 * k - 2 * d
+    return _wrap(k, close), _wrap(d, close), _wrap(j, close)
+
+
+@memoize
+@with_precision
+def panel_boll(
+    close: PanelLike,
+    window: int = 20,
+    num_std: float = 2.0
+) -> Tuple[PanelLike, PanelLike, PanelLike, PanelLike]:
+    """
+    面板布林带 (同 calculate_boll，标准差为样本标准差)
+
+    参数:
+        close: 收盘价面板
+        window: 周期数，默认 20
+        num_std: 标准差倍数，默认 2
+
+    返回:
+        (中轨，上轨，下轨，带宽) 四元组
+    """
+    values = _to_array(close)
+    middle, std = rolling_mean_std(values, window)
+    upper = middle + num_std * std
+    lower = middle - num_std * std
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bandwidth = (upper - lower) / middle * 100
+    return _wrap(middle, close), _wrap(upper, close), _wrap(lower, close), _wrap(bandwidth, close)
+
+
+def panel_true_range(high: PanelLike, low: PanelLike, close: PanelLike) -> PanelLike:
+    """
+    面板真实波幅 (同 calculate_true_range，缺少前收盘时取 high - low)
+
+    参数:
+        high: 最高价面板
+        low: 最低价面板
+        close: 收盘价面板
+
+    返回:
+        TR 面板
+    """
+    h, l, c = _to_array(high), _to_array(low), _to_array(close)
+    prev_close = np.full(c.shape, np.nan)
+    prev_close[:, 1:] = c[:, :-1]
+    tr = np.fmax(np.fmax(h - l, np.abs(h - prev_close)), np.abs(l - prev_close))
+    return _wrap(tr, close)
+
+
+@memoize
+@with_precision
+def panel_atr(high: PanelLike, low: PanelLike, close: PanelLike, window: int = 14) -> PanelLike:
+    """
+    面板 ATR (同 calculate_atr)
+
+    参数:
+        high: 最高价面板
+        low: 最低价面板
+        close: 收盘价面板
+        window: 周期数，默认 14
+
+    返回:
+        ATR 面板
+    """
+    tr = _to_array(panel_true_range(_to_array(high), _to_array(low), _to_array(close)))
+    return _wrap(_ewm(tr, 2.0 / (window + 1.0)), close)
+
+
+@memoize
+@with_precision
+def panel_cci(high: PanelLike, low: PanelLike, close: PanelLike, window: int = 20) -> PanelLike:
+    """
+    面板 CCI (同 calculate_cci)
+
+    参数:
+        high: 最高价面板
+        low: 最低价面板
+        close: 收盘价面板
+        window: 周期数，默认 20
+
+    返回:
+        CCI 面板
+    """
+    tp = (_to_array(high) + _to_array(low) + _to_array(close)) / 3
+    ma = rolling_mean(tp, window)
+    md = rolling_mean(np.abs(tp - ma), window)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cci = (tp - ma) / (0.015 * md)
+    return _wrap(cci, close)
+
+
+@memoize
+@with_precision
+def panel_obv(close: PanelLike, volume: PanelLike) -> PanelLike:
+    """
+    面板 OBV 能量潮 (同 calculate_obv)
+
+    每日成交量按涨跌方向取正负号后沿时间累加，首日为 0；
+    收盘价持平或无法比较 (NaN) 时当日不计入
+
+    参数:
+        close: 收盘价面板
+        volume: 成交量面板
+
+    返回:
+        OBV 面板
+    """
+    c, v = _to_array(close), _to_array(volume)
+    step = np.zeros(c.shape)
+    up = np.zeros(c.shape, dtype=bool)
+    down = np.zeros(c.shape, dtype=bool)
+    up[:, 1:] = c[:, 1:] > c[:, :-1]
+    down[:, 1:] = c[:, 1:] < c[:, :-1]
+    step[up] = v[up]
+    step[down] = -v[down]
+    return _wrap(np.cumsum(step, axis=1), close)
+
+
+def panel_divergence(close: PanelLike, oscillator: PanelLike, window: int = 20) -> Tuple[PanelLike, PanelLike]:
+    """
+    面板价格与指标背离 (同 obv.detect_divergence / rsi.detect_divergence)
+
+    底背离: 收盘价低于前 window 日最低价，指标高于前 window 日最低值
+    顶背离: 收盘价高于前 window 日最高价，指标低于前 window 日最高值
+
+    参数:
+        close: 收盘价面板
+        oscillator: 指标面板 (OBV / RSI 等)
+        window: 检测窗口
+
+    返回:
+        (底背离，顶背离)，0/1 整数面板
+    """
+    c, o = _to_array(close), _to_array(oscillator)
+    bullish = (c < _prior_extreme(c, window, 'min')) & (o > _prior_extreme(o, window, 'min'))
+    bearish = (c > _prior_extreme(c, window, 'max')) & (o < _prior_extreme(o, window, 'max'))
+    return _wrap(bullish.astype(np.int64), close), _wrap(bearish.astype(np.int64), close)
+
+
+def panel_macd_divergence(
+    close: PanelLike,
+    dif: PanelLike,
+    window: int = 20,
+    lag: int = 5
+) -> Tuple[PanelLike, PanelLike]:
+    """
+    面板 MACD 背离 (同 macd.detect_bullish_divergence / detect_bearish_divergence)
+
+    底背离: 收盘价低于 lag 日前，DIF 高于 lag 日前且 DIF > 0
+    顶背离: 收盘价高于 lag 日前，DIF 低于 lag 日前且 DIF < 0
+    前 window 日不产生信号
+
+    参数:
+        close: 收盘价面板
+        dif: DIF 面板
+        window: 检测窗口
+        lag: 比较的间隔天数，默认 5
+
+    返回:
+        (底背离，顶背离)，0/1 整数面板
+    """
+    c, d = _to_array(close), _to_array(dif)
+    t = c.shape[1]
+    # 与 iloc[i - lag] 相同，负下标从序列末尾取
+    lagged = np.arange(t) - lag
+    prev_c = np.take(c, lagged, axis=1, mode='wrap')
+    prev_d = np.take(d, lagged, axis=1, mode='wrap')
+    active = np.arange(t) >= window
+    bullish = active & (c < prev_c) & (d > prev_d) & (d > 0)
+    bearish = active & (c > prev_c) & (d < prev_d) & (d < 0)
+    return _wrap(bullish.astype(np.int64), close), _wrap(bearish.astype(np.int64), close)
@@ -0,0 +1,269 @@
+"""
+patterns.py - 形态识别 (Chart Patterns)
+
+面向 (股票数, 交易日数) 面板的形态扫描，一维数组视为单只股票:
+
+- 局部极值每个序列只找一次 (与前后 order 根的滚动最值比较，全部股票同时完成)，
+  头肩、双顶/双底在极值点序列上判断，不再逐窗口搜索
+- 三角形、旗形、楔形用滚动最小二乘斜率 (rolling_slope 的闭式解) 代替逐窗口 np.polyfit
+- scan_patterns 一次返回全部形态的布尔数组，locate_patterns 返回最近一次出现的位置，
+  PATTERNS 为各形态的方向、置信度和说明
+
+用法:
+    found = scan_patterns(high, low, close)          # {形态名: (股票数,) 布尔数组}
+    symbols[found['DOUBLE_BOTTOM']]
+"""
+from typing import Dict, Tuple
+
+import numpy as np
+
+from .rolling import _as_2d, rolling_max, rolling_min, rolling_slope
+
+# 形态名 -> 方向、置信度、说明
+PATTERNS: Dict[str, Dict] = {
+    'HEAD_AND_SHOULDERS_TOP': {'type': 'bearish', 'confidence': 0.8, 'description': '形成完整头肩顶形态，强烈看跌信号'},
+    'HEAD_AND_SHOULDERS_BOTTOM': {'type': 'bullish', 'confidence': 0.8, 'description': '形成完整头肩底形态，强烈看涨信号'},
+    'DOUBLE_TOP': {'type': 'bearish', 'confidence': 0.6, 'description': '可能形成双顶形态，看跌信号'},
+    'DOUBLE_BOTTOM': {'type': 'bullish', 'confidence': 0.6, 'description': '可能形成双底形态，看涨信号'},
+    'SYMMETRIC_TRIANGLE': {'type': 'neutral', 'confidence': 0.5, 'description': '可能形成对称三角形，需要等待突破方向'},
+    'BULL_FLAG': {'type': 'bullish', 'confidence': 0.7, 'description': '形成上升旗形，看涨延续形态'},
+    'BEAR_FLAG': {'type': 'bearish', 'confidence': 0.7, 'description': '形成下降旗形，看跌延续形态'},
+    'RISING_WEDGE': {'type': 'bearish', 'confidence': 0.75, 'description': '形成上升楔形，潜在顶部反转信号'},
+    'FALLING_WEDGE': {'type': 'bullish', 'confidence': 0.75, 'description': '形成下降楔形，潜在底部反转信号'},
+}
+
+
+def _restore_rows(out: np.ndarray, values):
+    """按股票的结果: 一维输入返回标量"""
+    return out[0] if np.ndim(values) == 1 else out
+
+
+# ==================== 局部极值 ====================
+
+def local_extrema(values, order: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    局部极大/极小值
+
+    第 i 根严格高于 (低于) 前后各 order 根时为极大 (极小)，两端不足 order 根的不算；
+    窗口内有 NaN 时不算极值
+
+    参数:
+        values: 一维序列或 (股票数, 交易日数) 数组
+        order: 比较的前后根数，1 即与相邻两根比较
+
+    返回:
+        (极大值位置, 极小值位置)，与输入同形状的布尔数组
+    """
+    x = _as_2d(values)
+    n, t = x.shape
+    peaks = np.zeros((n, t), dtype=bool)
+    troughs = np.zeros((n, t), dtype=bool)
+    if order >= 1 and t >= 2 * order + 1:
+        center = x[:, order:t - order]
+        # 前 order 根的最值在 i - 1 处，后 order 根的最值在 i + order 处
+        upper = rolling_max(x, order)
+        lower = rolling_min(x, order)
+        with np.errstate(invalid='ignore'):
+            peaks[:, order:t - order] = (center > upper[:, order - 1:t - order - 1]) & (center > upper[:, 2 * order:])
+            troughs[:, order:t - order] = (center < lower[:, order - 1:t - order - 1]) & (center < lower[:, 2 * order:])
+    if np.ndim(values) == 1:
+        return peaks[0], troughs[0]
+    return peaks, troughs
+
+
+def _runs(mask: np.ndarray, length: int):
+    """
+    极值点序列中同一只股票内连续 length 个极值的组合
+
+    返回:
+        (组合起点在极值列表中的下标 k, 全部极值的行号, 列号, 展平后的位置)
+    """
+    rows, cols = np.nonzero(mask)
+    flat = rows * mask.shape[1] + cols
+    k = np.arange(max(len(rows) - length + 1, 0))
+    k = k[rows[k] == rows[k + length - 1]]
+    return k, rows, cols, flat
+
+
+# ==================== 头肩 ====================
+
+def _head_and_shoulders(x: np.ndarray, mask: np.ndarray, window: int, tolerance: float, top: bool) -> np.ndarray:
+    n, t = x.shape
+    found = np.full(n, -1, dtype=np.int64)
+    if t <= window:
+        return found
+    k, rows, cols, flat = _runs(mask, 3)
+    if len(k) == 0:
+        return found
+    flat_x = x.ravel()
+    # 相邻两个极值之间的最低 (头肩顶) / 最高 (头肩底) 价，颈线取两段中更低 (更高) 的一个
+    between = (np.minimum if top else np.maximum).reduceat(flat_x, flat)
+    neckline = (np.minimum if top else np.maximum)(between[k], between[k + 1])
+
+    # 存在 window 根的窗口 [i, i + window) 使这三个极值是窗口内部的前三个极值
+    c0, c2 = cols[k], cols[k + 2]
+    prev = np.where((k > 0) & (rows[np.maximum(k - 1, 0)] == rows[k]), cols[np.maximum(k - 1, 0)], 0)
+    lo = np.maximum(prev, c2 - window + 2)
+    hi = np.minimum(c0 - 1, t - window - 1)
+
+    left, head, right = flat_x[flat[k]], flat_x[flat[k + 1]], flat_x[flat[k + 2]]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if top:
+            ok = ((head > left) & (head > right) & (np.abs(left - right) / head < tolerance)
+                  & (left > neckline) & (right > neckline))
+        else:
+            ok = ((head < left) & (head < right) & (np.abs(left - right) / left < tolerance)
+                  & (left < neckline) & (right < neckline))
+    ok &= lo <= hi
+    np.maximum.at(found, rows[k[ok]], c2[ok])
+    return found
+
+
+def head_and_shoulders(close, window: int = 40, tolerance: float = 0.1) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    头肩顶 / 头肩底
+
+    头肩顶: 某个 window 根的窗口内前三个局部高点，中间最高、两肩高度相差不超过 tolerance，
+    两肩都高于之间的最低价 (颈线)；头肩底在局部低点上对称判断
+
+    参数:
+        close: 收盘价，一维序列或 (股票数, 交易日数) 数组
+        window: 形态的最大跨度，默认 40
+        tolerance: 两肩的相对高度差上限，默认 0.1
+
+    返回:
+        (头肩顶，头肩底)，每只股票最近一次形态的右肩位置，没有时为 -1
+    """
+    x = _as_2d(close)
+    peaks, troughs = local_extrema(x)
+    top = _head_and_shoulders(x, peaks, window, tolerance, top=True)
+    bottom = _head_and_shoulders(x, troughs, window, tolerance, top=False)
+    return _restore_rows(top, close), _restore_rows(bottom, close)
+
+
+# ==================== 双顶 / 双底 ====================
+
+def _double(x: np.ndarray, mask: np.ndarray, window: int, tolerance: float) -> np.ndarray:
+    n, t = x.shape
+    found = np.full(n, -1, dtype=np.int64)
+    k, rows, cols, flat = _runs(mask, 2)
+    # 每只股票只看最近的两个极值
+    k = k[(k + 2 == len(rows)) | (rows[np.minimum(k + 2, len(rows) - 1)] != rows[k])]
+    if len(k) == 0:
+        return found
+    flat_x = x.ravel()
+    first, second = flat_x[flat[k]], flat_x[flat[k + 1]]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ok = (np.abs(first - second) / np.abs(first) < tolerance) & (cols[k] >= t - window)
+    found[rows[k[ok]]] = cols[k + 1][ok]
+    return found
+
+
+def double_top_bottom(close, window: int = 60, order: int = 5, tolerance: float = 0.05) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    双顶 / 双底
+
+    最近两个局部高点 (前后 order 根内最高) 都在最近 window 根内，高度相差不超过 tolerance 为双顶；
+    局部低点对称判断为双底
+
+    参数:
+        close: 收盘价，一维序列或 (股票数, 交易日数) 数组
+        window: 回看根数，默认 60
+        order: 局部极值的比较范围，默认 5
+        tolerance: 两个顶 (底) 的相对差上限，默认 0.05
+
+    返回:
+        (双顶，双底)，每只股票第二个顶 (底) 的位置，没有时为 -1
+    """
+    x = _as_2d(close)
+    peaks, troughs = local_extrema(x, order)
+    top = _double(x, peaks, window, tolerance)
+    bottom = _double(x, troughs, window, tolerance)
+    return _restore_rows(top, close), _restore_rows(bottom, close)
+
+
+# ==================== 趋势线形态 ====================
+
+def _last_slope(values: np.ndarray, window: int, offset: int = 0) -> np.ndarray:
+    """截至倒数第 offset + 1 根的 window 根斜率，只计算需要的尾部"""
+    t = values.shape[1]
+    end = t - offset
+    if end < window:
+        return np.full(values.shape[0], np.nan)
+    return rolling_slope(values[:, end - window:end], window)[:, -1]
+
+
+def trend_patterns(high, low, close, window: int = 20, flat: float = 0.01, ratio: float = 3.0) -> Dict[str, np.ndarray]:
+    """
+    三角形、楔形、旗形 (只看最近的 K 线)
+
+    - 对称三角形: 最近 window 根最高价、最低价的回归斜率绝对值都小于 flat
+    - 上升楔形: 两条斜率都为正且高点斜率更小；下降楔形: 都为负且高点斜率更大
+    - 旗形: 前半段 (旗杆) 收盘价斜率的绝对值超过后半段 (旗面) 的 ratio 倍，按旗杆方向分上升/下降
+
+    参数:
+        high / low / close: 一维序列或 (股票数, 交易日数) 数组
+        window: 回看根数，默认 20 (旗杆、旗面各一半)
+        flat: 三角形的斜率阈值
+        ratio: 旗杆与旗面的斜率倍数
+
+    返回:
+        {形态名: (股票数,) 布尔数组}
+    """
+    h, l, c = _as_2d(high), _as_2d(low), _as_2d(close)
+    high_slope = _last_slope(h, window)
+    low_slope = _last_slope(l, window)
+    half = window // 2
+    trend_slope = _last_slope(c, half, offset=half)
+    flag_slope = _last_slope(c, half)
+
+    flag = np.abs(trend_slope) > np.abs(flag_slope) * ratio
+    result = {
+        'SYMMETRIC_TRIANGLE': (np.abs(high_slope) < flat) & (np.abs(low_slope) < flat),
+        'BULL_FLAG': flag & (trend_slope > 0),
+        'BEAR_FLAG': flag & (trend_slope < 0),
+        'RISING_WEDGE': (high_slope > 0) & (low_slope > 0) & (high_slope < low_slope),
+        'FALLING_WEDGE': (high_slope < 0) & (low_slope < 0) & (high_slope > low_slope),
+    }
+    return {name: _restore_rows(found, close) for name, found in result.items()}
+
+
+# ==================== 汇总 ====================
+
+def locate_patterns(high, low, close) -> Dict[str, np.ndarray]:
+    """
+    按默认参数扫描全部形态，返回每个形态最近一次出现的位置
+
+    头肩为右肩、双顶/双底为第二个顶 (底)、三角形/旗形/楔形为最后一根 K 线
+
+    参数:
+        high / low / close: 一维序列或 (股票数, 交易日数) 数组
+
+    返回:
+        {形态名: 位置}，面板输入为 (股票数,) 整数数组，没有出现时为 -1，顺序与 PATTERNS 相同
+    """
+    hs_top, hs_bottom = head_and_shoulders(close)
+    double_top, double_bottom = double_top_bottom(close)
+    last = np.shape(close)[-1] - 1
+    found = {
+        'HEAD_AND_SHOULDERS_TOP': hs_top,
+        'HEAD_AND_SHOULDERS_BOTTOM': hs_bottom,
+        'DOUBLE_TOP': double_top,
+        'DOUBLE_BOTTOM': double_bottom,
+    }
+    for name, hit in trend_patterns(high, low, close).items():
+        found[name] = np.where(hit, last, -1)
+    return {name: found[name] for name in PATTERNS}
+
+
+def scan_patterns(high, low, close) -> Dict[str, np.ndarray]:
+    """
+    按默认参数扫描全部形态
+
+    参数:
+        high / low / close: 一维序列或 (股票数, 交易日数) 数组
+
+    返回:
+        {形态名: 是否出现}，面板输入为 (股票数,) 布尔数组，顺序与 PATTERNS 相同
+    """
+    return {name: np.asarray(position) >= 0 for name, position in locate_patterns(high, low, close).items()}
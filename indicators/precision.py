@@ -0,0 +1,146 @@
+"""
+precision.py - 计算精度策略 (Precision Policy)
+
+默认 float64，与原来的行为完全相同。切换到 float32 后:
+
+- 指标 (calculate_* / panel_* / 依赖图) 的输出为 float32
+- 策略 generate_signals 复制行情时把浮点列转换为 float32，新增的指标列也是 float32
+- 滚动、EWM 等累加仍在 float64 中进行 (pandas 与 panel 算子内部本来就按 float64 计算)，
+  只在输出时转换一次；回测的资金、累计收益、波动率也按 float64 计算
+
+全市场面板的内存和缓存占用减半，与 float64 的差异见 FLOAT32_RTOL / FLOAT32_ATOL，
+可用 compare_precision 在自己的数据上验证。
+
+用法:
+    set_precision('float32')              # 全局
+    with use_precision('float32'):        # 只对一段代码生效
+        result, stats = BollStrategy().backtest(df)
+"""
+import functools
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict
+
+import numpy as np
+import pandas as pd
+
+# float32 结果相对 float64 的容差: |x32 - x64| <= FLOAT32_ATOL + FLOAT32_RTOL * max|x64|
+# 误差主要来自 float32 价格本身的舍入 (约 1e-7 相对误差)，经 KDJ、CCI、MACD 等差值类指标放大，
+# 按整列的量级衡量 (而不是逐元素)，零轴附近的 DIF、横盘时的 KDJ 才有可比的标准
+FLOAT32_RTOL = 1e-5
+FLOAT32_ATOL = 1e-5
+
+_SUPPORTED = (np.dtype(np.float32), np.dtype(np.float64))
+
+_precision = np.dtype(np.float64)
+_local = threading.local()
+
+
+def _normalize(dtype) -> np.dtype:
+    dtype = np.dtype(dtype)
+    if dtype not in _SUPPORTED:
+        raise ValueError(f"不支持的计算精度: {dtype}，可选 float32 / float64")
+    return dtype
+
+
+def get_precision() -> np.dtype:
+    """当前生效的计算精度 (use_precision 优先于全局设置)"""
+    override = getattr(_local, 'precision', None)
+    return override if override is not None else _precision
+
+
+def set_precision(dtype) -> None:
+    """设置全局计算精度 ('float32' / 'float64')"""
+    global _precision
+    _precision = _normalize(dtype)
+
+
+@contextmanager
+def use_precision(dtype):
+    """在 with 块内 (当前线程) 使用指定精度，None 表示沿用当前设置"""
+    previous = getattr(_local, 'precision', None)
+    _local.precision = previous if dtype is None else _normalize(dtype)
+    try:
+        yield
+    finally:
+        _local.precision = previous
+
+
+def to_precision(value, copy: bool = False):
+    """
+    把浮点结果转换为当前精度
+
+    float64 精度下不做转换 (float32 输入也不会被放大)；
+    整数、布尔列保持不变。copy=True 时总是返回新对象 (替代 df.copy())
+
+    参数:
+        value: Series / DataFrame / ndarray，或由它们组成的元组
+        copy: 是否保证返回副本
+
+    返回:
+        转换后的对象
+    """
+    dtype = get_precision()
+    if isinstance(value, tuple):
+        return tuple(to_precision(item, copy) for item in value)
+    if dtype == np.float64:
+        return value.copy() if copy and hasattr(value, 'copy') else value
+    if isinstance(value, pd.DataFrame):
+        columns = {name: dtype for name, kind in value.dtypes.items()
+                   if kind.kind == 'f' and kind != dtype}
+        if columns:
+            return value.astype(columns)
+        return value.copy() if copy else value
+    if isinstance(value, (pd.Series, np.ndarray)) and value.dtype.kind == 'f' and value.dtype != dtype:
+        return value.astype(dtype)
+    return value.copy() if copy and hasattr(value, 'copy') else value
+
+
+def with_precision(fn: Callable) -> Callable:
+    """指标函数装饰器: 按 float64 计算，输出转换为当前精度"""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        return to_precision(fn(*args, **kwargs))
+
+    return wrapper
+
+
+def compare_precision(fn: Callable, *args, rtol: float = FLOAT32_RTOL, atol: float = FLOAT32_ATOL, **kwargs) -> Dict:
+    """
+    分别在 float64 / float32 精度下调用 fn，比较结果
+
+    参数:
+        fn: 指标函数或返回 DataFrame 的函数 (如策略的 generate_signals)
+        args / kwargs: 传给 fn 的参数 (float32 下输入同样转换为 float32)
+        rtol / atol: 容差
+
+    返回:
+        {'max_abs_error', 'max_rel_error', 'ok'}，相对误差以每一列的最大绝对值为分母
+    """
+    with use_precision('float64'):
+        expected = fn(*args, **kwargs)
+    with use_precision('float32'):
+        converted = [to_precision(arg) for arg in args]
+        got = fn(*converted, **kwargs)
+
+    def flatten(value):
+        if isinstance(value, tuple):
+            return [part for item in value for part in flatten(item)]
+        if isinstance(value, pd.DataFrame):
+            value = value.select_dtypes('number')
+            return [value[column].to_numpy(dtype=np.float64) for column in value.columns]
+        return [np.asarray(value, dtype=np.float64)]
+
+    max_abs, max_rel, ok = 0.0, 0.0, True
+    for want, have in zip(flatten(expected), flatten(got)):
+        both = ~np.isnan(want) & ~np.isnan(have)
+        if not np.array_equal(np.isnan(want), np.isnan(have)):
+            ok = False
+        if not both.any():
+            continue
+        error = float(np.abs(have[both] - want[both]).max())
+        scale = float(np.abs(want[both]).max())
+        max_abs = max(max_abs, error)
+        max_rel = max(max_rel, error / scale if scale > 0 else 0.0)
+        ok = ok and error <= atol + rtol * scale
+    return {'max_abs_error': max_abs, 'max_rel_error': max_rel, 'ok': ok}
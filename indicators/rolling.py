@@ -0,0 +1,416 @@
+"""
+rolling.py - 面板滚动窗口算子 (Rolling Kernels)
+
+面向 (股票数, 交易日数) 面板的滚动统计，沿 axis=1 (时间) 计算，一维数组视为单只股票。
+语义与 pandas rolling(window) 相同: 窗口内有 NaN 或不足 window 个时结果为 NaN。
+
+- rolling_min / rolling_max: 分块前缀/后缀最值 (van Herk / Gil-Werman)，
+  每个元素固定 3 次比较，与窗口长度无关，全部股票一次向量化完成
+- rolling_mean / rolling_var / rolling_std / rolling_mean_std:
+  逐日加入新值、移出旧值，均值用 Kahan 补偿求和，方差用 Welford 增删公式，
+  每日计算量与窗口长度无关；窗口内数值全部相同时均值取该值、方差为 0
+- rolling_mad: 真正的滚动平均绝对偏差 mean(|x_i - 窗口均值|)，按股票分块计算
+- rolling_mean_grid / rolling_mean_std_grid: 一组窗口 (如 5..250) 共用一次前缀和 / 平方前缀和，
+  每个窗口只做一次相减，用于均线、布林带的参数扫描
+- rolling_rank: 当日值在最近 window 日中的百分位排名 (同 rolling(window).rank(pct=True))
+- rolling_slope: 滚动最小二乘斜率 (同窗口内 np.polyfit(range(window), y, 1)[0])，
+  由 Σy、Σjy 两个前缀和的闭式解得到
+
+窗口长度扫到 250 时，计算量不再随窗口线性增长；输出数组只分配一次。
+"""
+from typing import Tuple
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# rolling_mad 临时数组的元素数上限，超过时按股票分块计算
+_CHUNK_ELEMENTS = 1 << 22
+
+
+def _as_2d(values) -> np.ndarray:
+    array = np.asarray(values, dtype=np.float64)
+    return array[np.newaxis, :] if array.ndim == 1 else array
+
+
+def _restore(out: np.ndarray, values) -> np.ndarray:
+    return out[0] if np.ndim(values) == 1 else out
+
+
+# ==================== 滚动最值 ====================
+
+def _rolling_extreme(values, window: int, ufunc: np.ufunc, identity: float) -> np.ndarray:
+    x = _as_2d(values)
+    n, t = x.shape
+    if window < 1 or window > t or n == 0:
+        return _restore(np.full((n, t), np.nan), values)
+
+    blocks = -(-t // window)
+    padded = blocks * window
+    if padded != t:
+        xp = np.full((n, padded), identity)
+        xp[:, :t] = x
+    else:
+        xp = x
+    grouped = xp.reshape(n, blocks, window)
+
+    # 块内前缀最值直接写入输出，块内后缀最值为临时数组
+    out = np.empty((n, padded))
+    ufunc.accumulate(grouped, axis=2, out=out.reshape(n, blocks, window))
+    suffix = ufunc.accumulate(grouped[:, :, ::-1], axis=2)[:, :, ::-1].reshape(n, padded)
+
+    # 窗口 [i-window+1, i] 跨越至多两个块: 起点所在块的后缀 + 终点所在块的前缀
+    out[:, window - 1:t] = ufunc(suffix[:, :t - window + 1], out[:, window - 1:t])
+    out[:, :window - 1] = np.nan
+    return _restore(out[:, :t], values)
+
+
+def rolling_min(values, window: int) -> np.ndarray:
+    """
+    滚动最小值 (同 rolling(window).min())
+
+    参数:
+        values: (股票数, 交易日数) 数组或一维数组
+        window: 窗口长度
+
+    返回:
+        与输入同形状的数组
+    """
+    return _rolling_extreme(values, window, np.minimum, np.inf)
+
+
+def rolling_max(values, window: int) -> np.ndarray:
+    """
+    滚动最大值 (同 rolling(window).max())
+
+    参数:
+        values: (股票数, 交易日数) 数组或一维数组
+        window: 窗口长度
+
+    返回:
+        与输入同形状的数组
+    """
+    return _rolling_extreme(values, window, np.maximum, -np.inf)
+
+
+# ==================== 滚动均值 / 方差 ====================
+
+def _rolling_moments(values, window: int, ddof: int, want_mean: bool, want_var: bool):
+    """
+    逐日增删的滚动均值 (Kahan) 与方差 (Welford)，所有股票同时递推
+
+    返回:
+        (均值, 方差)，未请求的为 None；数组为 (交易日数, 股票数) 布局的转置视图
+    """
+    x = _as_2d(values)
+    n, t = x.shape
+    series = np.ascontiguousarray(x.T)
+    mean_out = np.full((t, n), np.nan) if want_mean else None
+    var_out = np.full((t, n), np.nan) if want_var else None
+    if window < 1 or window > t or n == 0:
+        return (None if mean_out is None else mean_out.T), (None if var_out is None else var_out.T)
+
+    nobs = np.zeros(n)
+    total = np.zeros(n)       # Kahan 求和
+    total_comp = np.zeros(n)
+    mean = np.zeros(n)        # Welford
+    ssqdm = np.zeros(n)
+    mean_comp = np.zeros(n)
+    same = np.zeros(n)        # 连续相同值的个数
+    prev = np.full(n, np.nan)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for i in range(t):
+            # 移出窗口最早的值
+            if i >= window:
+                old = series[i - window]
+                valid = ~np.isnan(old)
+                nobs -= valid
+                if want_mean:
+                    y = -old - total_comp
+                    s = total + y
+                    total_comp = np.where(valid, s - total - y, total_comp)
+                    total = np.where(valid, s, total)
+                if want_var:
+                    prev_mean = mean - mean_comp
+                    y = old - mean_comp
+                    d = y - mean
+                    new_mean = mean - d / nobs
+                    keep = valid & (nobs > 0)
+                    reset = valid & (nobs == 0)
+                    ssqdm = np.where(keep, ssqdm - (old - prev_mean) * (old - new_mean), np.where(reset, 0.0, ssqdm))
+                    mean_comp = np.where(keep, d + mean - y, np.where(reset, 0.0, mean_comp))
+                    mean = np.where(keep, new_mean, np.where(reset, 0.0, mean))
+
+            # 加入当日的值
+            cur = series[i]
+            valid = ~np.isnan(cur)
+            nobs += valid
+            same = np.where(valid, np.where(cur == prev, same + 1, 1), 0)
+            prev = cur
+            if want_mean:
+                y = cur - total_comp
+                s = total + y
+                total_comp = np.where(valid, s - total - y, total_comp)
+                total = np.where(valid, s, total)
+            if want_var:
+                prev_mean = mean - mean_comp
+                y = cur - mean_comp
+                d = y - mean
+                new_mean = mean + d / nobs
+                ssqdm = np.where(valid, ssqdm + (cur - prev_mean) * (cur - new_mean), ssqdm)
+                mean_comp = np.where(valid, d + mean - y, mean_comp)
+                mean = np.where(valid, new_mean, mean)
+
+            if i < window - 1:
+                continue
+            full = nobs == window
+            constant = same >= window
+            if want_mean:
+                mean_out[i] = np.where(full, np.where(constant, cur, total / nobs), np.nan)
+            if want_var:
+                var = np.where(constant, 0.0, np.maximum(ssqdm / (nobs - ddof), 0.0))
+                var_out[i] = np.where(full & (nobs > ddof), var, np.nan)
+
+    return (None if mean_out is None else mean_out.T), (None if var_out is None else var_out.T)
+
+
+def rolling_mean(values, window: int) -> np.ndarray:
+    """
+    滚动均值 (同 rolling(window).mean())，Kahan 补偿求和
+
+    参数:
+        values: (股票数, 交易日数) 数组或一维数组
+        window: 窗口长度
+
+    返回:
+        与输入同形状的数组
+    """
+    mean, _ = _rolling_moments(values, window, 1, True, False)
+    return _restore(mean, values)
+
+
+def rolling_var(values, window: int, ddof: int = 1) -> np.ndarray:
+    """
+    滚动方差 (同 rolling(window).var(ddof))，Welford 增删公式
+
+    参数:
+        values: (股票数, 交易日数) 数组或一维数组
+        window: 窗口长度
+        ddof: 自由度修正，默认 1 (样本方差)
+
+    返回:
+        与输入同形状的数组
+    """
+    _, var = _rolling_moments(values, window, ddof, False, True)
+    return _restore(var, values)
+
+
+def rolling_std(values, window: int, ddof: int = 1) -> np.ndarray:
+    """
+    滚动标准差 (同 rolling(window).std(ddof))
+
+    参数:
+        values: (股票数, 交易日数) 数组或一维数组
+        window: 窗口长度
+        ddof: 自由度修正，默认 1 (样本标准差)
+
+    返回:
+        与输入同形状的数组
+    """
+    _, var = _rolling_moments(values, window, ddof, False, True)
+    return _restore(np.sqrt(var, out=var), values)
+
+
+def rolling_mean_std(values, window: int, ddof: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    一次递推同时得到滚动均值和标准差 (布林带、均值回归)
+
+    参数:
+        values: (股票数, 交易日数) 数组或一维数组
+        window: 窗口长度
+        ddof: 自由度修正，默认 1
+
+    返回:
+        (均值, 标准差)
+    """
+    mean, var = _rolling_moments(values, window, ddof, True, True)
+    return _restore(mean, values), _restore(np.sqrt(var, out=var), values)
+
+
+def rolling_mad(values, window: int) -> np.ndarray:
+    """
+    滚动平均绝对偏差: 窗口内每个值与 该窗口均值 之差的绝对值的平均
+
+    注意与 calculate_cci 中的 MA(|TP - MA|, N) 不同，后者使用每个值当天的均值
+
+    参数:
+        values: (股票数, 交易日数) 数组或一维数组
+        window: 窗口长度
+
+    返回:
+        与输入同形状的数组
+    """
+    x = _as_2d(values)
+    n, t = x.shape
+    out = np.full((n, t), np.nan)
+    if window < 1 or window > t or n == 0:
+        return _restore(out, values)
+    mean = _as_2d(rolling_mean(x, window))
+    step = max(1, _CHUNK_ELEMENTS // (t * window))
+    for lo in range(0, n, step):
+        windows = sliding_window_view(x[lo:lo + step], window, axis=1)
+        deviation = np.abs(windows - mean[lo:lo + step, window - 1:, np.newaxis])
+        out[lo:lo + step, window - 1:] = deviation.mean(axis=-1)
+    return _restore(out, values)
+
+
+# ==================== 多窗口 (前缀和) ====================
+
+def _grid_moments(values, windows, ddof: int, want_std: bool):
+    x = np.asarray(values, dtype=np.float64)
+    windows = [int(w) for w in windows]
+    if any(w < 1 for w in windows):
+        raise ValueError(f"窗口长度必须为正整数: {windows}")
+    t = x.shape[-1]
+    valid = ~np.isnan(x)
+
+    # 减去整列均值后再累加，平方前缀和相减时不会因量级过大丢失精度
+    with np.errstate(invalid='ignore'):
+        count = valid.sum(axis=-1, keepdims=True)
+        shift = np.where(count > 0, np.where(valid, x, 0.0).sum(axis=-1, keepdims=True) / np.maximum(count, 1), 0.0)
+    centered = np.where(valid, x - shift, 0.0)
+    pad = [(0, 0)] * (x.ndim - 1) + [(1, 0)]
+    s1 = np.pad(np.cumsum(centered, axis=-1), pad)
+    s2 = np.pad(np.cumsum(centered * centered, axis=-1), pad) if want_std else None
+    nans = np.pad(np.cumsum(~valid, axis=-1), pad)
+
+    # 截至每个位置连续相同值的个数，窗口内全部相同时均值取该值、标准差为 0 (同 rolling)
+    positions = np.arange(t)
+    changed = np.ones(x.shape, dtype=bool)
+    changed[..., 1:] = x[..., 1:] != x[..., :-1]
+    run = positions - np.maximum.accumulate(np.where(changed, positions, 0), axis=-1) + 1
+
+    mean_out = np.full((len(windows),) + x.shape, np.nan)
+    std_out = np.full((len(windows),) + x.shape, np.nan) if want_std else None
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for k, w in enumerate(windows):
+            if w > t:
+                continue
+            full = (nans[..., w:] - nans[..., :-w]) == 0
+            constant = run[..., w - 1:] >= w
+            total = s1[..., w:] - s1[..., :-w]
+            mean = np.where(constant, x[..., w - 1:], total / w + shift)
+            mean_out[k, ..., w - 1:] = np.where(full, mean, np.nan)
+            if want_std and w > ddof:
+                var = np.maximum((s2[..., w:] - s2[..., :-w] - total * total / w) / (w - ddof), 0.0)
+                std_out[k, ..., w - 1:] = np.where(full, np.where(constant, 0.0, np.sqrt(var)), np.nan)
+    return mean_out, std_out
+
+
+def rolling_mean_grid(values, windows) -> np.ndarray:
+    """
+    多个窗口的滚动均值，共用一次前缀和
+
+    参数:
+        values: 一维序列或 (股票数, 交易日数) 数组
+        windows: 窗口长度列表，如 range(5, 251)
+
+    返回:
+        (窗口数, *values.shape) 数组，第 k 行为 rolling(windows[k]).mean()
+    """
+    mean, _ = _grid_moments(values, windows, 1, False)
+    return mean
+
+
+def rolling_mean_std_grid(values, windows, ddof: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    多个窗口的滚动均值与标准差，共用一次前缀和与平方前缀和
+
+    参数:
+        values: 一维序列或 (股票数, 交易日数) 数组
+        windows: 窗口长度列表
+        ddof: 自由度修正，默认 1
+
+    返回:
+        (均值, 标准差)，均为 (窗口数, *values.shape) 数组
+    """
+    return _grid_moments(values, windows, ddof, True)
+
+
+# ==================== 滚动排名 ====================
+
+def rolling_rank(values, window: int) -> np.ndarray:
+    """
+    当日值在最近 window 日 (含当日) 中的排名百分位
+
+    与 pandas rolling(window).rank(pct=True) 相同: 同值取平均排名，结果为 排名 / window，
+    窗口内有 NaN 时为 NaN；逐个偏移量比较，计算量为 window 次向量化比较
+
+    参数:
+        values: 一维序列或 (股票数, 交易日数) 数组
+        window: 窗口长度
+
+    返回:
+        与输入同形状的数组，范围 (0, 1]
+    """
+    x = _as_2d(values)
+    n, t = x.shape
+    out = np.full((n, t), np.nan)
+    if window < 1 or window > t:
+        return _restore(out, values)
+    current = x[:, window - 1:]
+    less = np.zeros(current.shape)
+    equal = np.zeros(current.shape)
+    with np.errstate(invalid='ignore'):
+        for lag in range(1, window):
+            previous = x[:, window - 1 - lag:t - lag]
+            less += previous < current
+            equal += previous == current
+    nans = np.pad(np.cumsum(np.isnan(x), axis=1), [(0, 0), (1, 0)])
+    full = (nans[:, window:] - nans[:, :-window]) == 0
+    out[:, window - 1:] = np.where(full, (1.0 + less + 0.5 * equal) / window, np.nan)
+    return _restore(out, values)
+
+
+# ==================== 滚动线性回归 ====================
+
+def rolling_slope(values, window: int) -> np.ndarray:
+    """
+    滚动最小二乘斜率 (自变量为窗口内的位置 0..window-1)
+
+    与逐窗口 np.polyfit(range(window), y, 1)[0] 相同，窗口内有 NaN 时为 NaN
+
+    参数:
+        values: 一维序列或 (股票数, 交易日数) 数组
+        window: 窗口长度 (>= 2)
+
+    返回:
+        与输入同形状的数组，前 window - 1 个为 NaN
+    """
+    x = _as_2d(values)
+    n, t = x.shape
+    out = np.full((n, t), np.nan)
+    if window < 2 or window > t:
+        return _restore(out, values)
+    valid = ~np.isnan(x)
+
+    # 减去整行均值不改变斜率，累加的量级更小
+    with np.errstate(invalid='ignore'):
+        count = valid.sum(axis=1, keepdims=True)
+        shift = np.where(count > 0, np.where(valid, x, 0.0).sum(axis=1, keepdims=True) / np.maximum(count, 1), 0.0)
+    y = np.where(valid, x - shift, 0.0)
+    positions = np.arange(t, dtype=np.float64)
+    pad = [(0, 0), (1, 0)]
+    s_y = np.pad(np.cumsum(y, axis=1), pad)
+    s_jy = np.pad(np.cumsum(y * positions, axis=1), pad)
+    nans = np.pad(np.cumsum(~valid, axis=1), pad)
+
+    sum_y = s_y[:, window:] - s_y[:, :-window]
+    # Σ (j - 窗口起点) y_j
+    sum_xy = s_jy[:, window:] - s_jy[:, :-window] - positions[:t - window + 1] * sum_y
+    sum_x = window * (window - 1) / 2.0
+    sum_xx = (window - 1) * window * (2 * window - 1) / 6.0
+    slope = (window * sum_xy - sum_x * sum_y) / (window * sum_xx - sum_x * sum_x)
+    full = (nans[:, window:] - nans[:, :-window]) == 0
+    out[:, window - 1:] = np.where(full, slope, np.nan)
+    return _restore(out, values)
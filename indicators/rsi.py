@@ -6,8 +6,13 @@ rsi.py - RSI 相对强弱指标 (Relative Strength Index)
 import numpy as np
 import pandas as pd
 from typing import Tuple
+from .panel import panel_divergence
+from .cache import memoize
+from .precision import with_precision
 
 
+@memoize
+@with_precision
 def calculate_rsi(
     close: pd.Series,
     window: int = 14
@@ -95,21 +100,10 @@ def detect_divergence(
     返回:
         (底背离信号，顶背离信号)
     """
-    bullish_div = pd.Series(0, index=close.index)
-    bearish_div = pd.Series(0, index=close.index)
-    
-    for i in range(window, len(close)):
-        # 底背离：价格创新低，RSI 未创新低
-        if (close.iloc[i] < close.iloc[i-window:i].min() and
-            rsi.iloc[i] > rsi.iloc[i-window:i].min()):
-            bullish_div.iloc[i] = 1
-        
-        # 顶背离：价格创新高，RSI 未创新高
-        if (close.iloc[i] > close.iloc[i-window:i].max() and
-            rsi.iloc[i] < rsi.iloc[i-window:i].max()):
-            bearish_div.iloc[i] = 1
-    
-    return bullish_div, bearish_div
+    # 底背离：价格创新低，RSI 未创新低；顶背离：价格创新高，RSI 未创新高
+    # 与前 window 日 (不含当日) 的滚动最值比较
+    bullish, bearish = panel_divergence(close.to_numpy(), rsi.to_numpy(), window)
+    return pd.Series(bullish, index=close.index), pd.Series(bearish, index=close.index)
 
 
 # ==================== 使用示例 ====================
@@ -0,0 +1,485 @@
+"""
+streaming.py - 增量指标 (Streaming Indicators)
+
+每个指标对象只保存计算下一根 K 线所需的最小状态，
+update(bar) 为 O(1) 计算 (滚动窗口保存最近 window 个值，最值使用单调队列)，
+状态可序列化为 dict / JSON，第二天恢复后只需推进当天一根 K 线，不必重新读取历史。
+
+与单序列函数的对应关系 (逐根推进的结果与一次性计算一致):
+    StreamingSMA   -> calculate_sma
+    StreamingEMA   -> calculate_ema
+    StreamingMACD  -> calculate_macd
+    StreamingRSI   -> calculate_rsi (Wilder 平滑 α = 1/N，预热方式与 calculate_rsi 相同)
+    StreamingKDJ   -> calculate_kdj
+    StreamingBOLL  -> calculate_boll
+    StreamingATR   -> calculate_atr
+    StreamingCCI   -> calculate_cci
+    StreamingOBV   -> calculate_obv
+
+bar 可以是收盘价 (float)，也可以是 dict / pd.Series / DataFrame 行，
+字段名支持 close/high/low/volume 或 收盘/最高/最低/成交量。
+
+用法:
+    boll = StreamingBOLL(20, 2)
+    boll.update_many(history['收盘'])
+    state = boll.to_state()                 # 保存
+    boll = StreamingIndicator.from_state(state)
+    middle, upper, lower, bandwidth = boll.update(today_bar)
+"""
+import json
+import math
+import os
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# 规范字段名 -> 数据源中文列名
+_SOURCE_FIELDS = {'close': '收盘', 'high': '最高', 'low': '最低', 'volume': '成交量'}
+
+NAN = float('nan')
+
+
+def _isnan(value: float) -> bool:
+    return value != value
+
+
+# ==================== 状态序列化 ====================
+
+class _Stateful:
+    """状态可导出/恢复的对象: 属性为数字、列表、deque 或其他 _Stateful"""
+
+    def _dump(self) -> Dict[str, Any]:
+        state = {}
+        for name, value in vars(self).items():
+            if isinstance(value, _Stateful):
+                value = value._dump()
+            elif isinstance(value, deque):
+                value = [list(v) if isinstance(v, tuple) else v for v in value]
+            state[name] = value
+        return state
+
+    def _load(self, state: Dict[str, Any]):
+        for name, value in state.items():
+            current = getattr(self, name, None)
+            if isinstance(current, _Stateful):
+                current._load(value)
+            elif isinstance(current, deque):
+                current.clear()
+                current.extend(tuple(v) if isinstance(v, list) else v for v in value)
+            else:
+                setattr(self, name, value)
+
+
+class _EWM(_Stateful):
+    """
+    单序列指数加权平均，递推方式与 pandas ewm(...).mean() 相同
+    (前导 NaN 输出 NaN，中间 NaN 沿用上一个值且旧权重继续衰减)
+    """
+
+    def __init__(self, alpha: float, adjust: bool = False, min_periods: int = 0):
+        self.alpha = alpha
+        self.adjust = adjust
+        self.min_periods = max(min_periods, 1)
+        self.weighted = NAN
+        self.old_wt = 1.0
+        self.nobs = 0
+
+    def update(self, value: float) -> float:
+        is_obs = not _isnan(value)
+        self.nobs += is_obs
+        if not _isnan(self.weighted):
+            self.old_wt *= 1.0 - self.alpha
+            if is_obs:
+                new_wt = 1.0 if self.adjust else self.alpha
+                if self.weighted != value:
+                    self.weighted = (self.old_wt * self.weighted + new_wt * value) / (self.old_wt + new_wt)
+                self.old_wt = self.old_wt + new_wt if self.adjust else 1.0
+        elif is_obs:
+            self.weighted = value
+        return self.weighted if self.nobs >= self.min_periods else NAN
+
+
+class _RollingWindow(_Stateful):
+    """
+    最近 window 个值的滚动均值 / 样本方差
+
+    均值使用补偿求和，方差使用 Welford 增删公式；窗口内有 NaN 或不足 window 个时为 NaN，
+    窗口内数值全部相同时均值取该值、方差为 0 (与 pandas rolling 一致)
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.nobs = 0
+        self.nan_count = 0
+        self.total = 0.0
+        self.compensation = 0.0
+        self.mean = 0.0
+        self.ssqdm = 0.0
+        self.same_count = 0
+
+    def _add_sum(self, value: float):
+        y = value - self.compensation
+        t = self.total + y
+        self.compensation = (t - self.total) - y
+        self.total = t
+
+    def update(self, value: float):
+        if len(self.values) == self.window:
+            old = self.values[0]
+            if _isnan(old):
+                self.nan_count -= 1
+            else:
+                self.nobs -= 1
+                self._add_sum(-old)
+                if self.nobs:
+                    delta = old - self.mean
+                    self.mean -= delta / self.nobs
+                    self.ssqdm -= delta * (old - self.mean)
+                else:
+                    self.mean = self.ssqdm = 0.0
+        if _isnan(value):
+            self.nan_count += 1
+            self.same_count = 0
+        else:
+            self.nobs += 1
+            self._add_sum(value)
+            delta = value - self.mean
+            self.mean += delta / self.nobs
+            self.ssqdm += delta * (value - self.mean)
+            last = self.values[-1] if self.values else NAN
+            self.same_count = self.same_count + 1 if value == last else 1
+        self.values.append(value)
+
+    @property
+    def full(self) -> bool:
+        return self.nobs == self.window
+
+    def rolling_mean(self) -> float:
+        if not self.full:
+            return NAN
+        if self.same_count >= self.window:
+            return self.values[-1]
+        return self.total / self.nobs
+
+    def rolling_std(self) -> float:
+        if not self.full:
+            return NAN
+        if self.same_count >= self.window or self.window < 2:
+            return 0.0 if self.window >= 2 else NAN
+        return math.sqrt(max(self.ssqdm / (self.nobs - 1), 0.0))
+
+
+class _RollingExtreme(_Stateful):
+    """最近 window 个值的最小/最大值 (单调队列，均摊 O(1))"""
+
+    def __init__(self, window: int, mode: str = 'min'):
+        self.window = window
+        self.mode = mode
+        self.count = 0
+        self.last_nan = -1
+        self.queue = deque()  # (序号, 值)
+
+    def update(self, value: float) -> float:
+        i = self.count
+        self.count += 1
+        if _isnan(value):
+            self.last_nan = i
+        else:
+            if self.mode == 'min':
+                while self.queue and self.queue[-1][1] >= value:
+                    self.queue.pop()
+            else:
+                while self.queue and self.queue[-1][1] <= value:
+                    self.queue.pop()
+            self.queue.append((i, value))
+        while self.queue and self.queue[0][0] <= i - self.window:
+            self.queue.popleft()
+        if self.count < self.window or self.last_nan > i - self.window:
+            return NAN
+        return self.queue[0][1]
+
+
+# ==================== 指标 ====================
+
+class StreamingIndicator(_Stateful):
+    """
+    增量指标基类
+
+    子类声明 fields (所需字段) 并实现 _update(*values)
+    """
+
+    fields: Sequence[str] = ('close',)
+    _registry: Dict[str, type] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        StreamingIndicator._registry[cls.__name__] = cls
+
+    def __init__(self, **params):
+        self.params = params
+        self.count = 0
+        self.value = None
+
+    def _update(self, *values):
+        raise NotImplementedError
+
+    def _extract(self, bar) -> List[float]:
+        if isinstance(bar, (int, float, np.number)):
+            return [float(bar)]
+        values = []
+        for field in self.fields:
+            if field in bar:
+                values.append(float(bar[field]))
+            else:
+                values.append(float(bar[_SOURCE_FIELDS[field]]))
+        return values
+
+    def update(self, bar):
+        """
+        推进一根 K 线
+
+        参数:
+            bar: 收盘价，或包含所需字段的 dict / pd.Series
+
+        返回:
+            最新指标值 (多值指标返回元组)
+        """
+        self.count += 1
+        self.value = self._update(*self._extract(bar))
+        return self.value
+
+    def update_many(self, data) -> list:
+        """
+        依次推进多根 K 线
+
+        参数:
+            data: DataFrame (包含所需字段)、收盘价序列或数组
+
+        返回:
+            每根 K 线对应的指标值列表
+        """
+        if isinstance(data, pd.DataFrame):
+            columns = []
+            for field in self.fields:
+                column = field if field in data.columns else _SOURCE_FIELDS[field]
+                columns.append(data[column].to_numpy(dtype=np.float64))
+        else:
+            columns = [np.asarray(data, dtype=np.float64)]
+        results = []
+        for values in zip(*columns):
+            self.count += 1
+            self.value = self._update(*(float(v) for v in values))
+            results.append(self.value)
+        return results
+
+    @property
+    def ready(self) -> bool:
+        """指标是否已有有效值"""
+        values = self.value if isinstance(self.value, tuple) else (self.value,)
+        return self.value is not None and not any(v is None or _isnan(v) for v in values)
+
+    def to_state(self) -> Dict[str, Any]:
+        """导出状态 (可 JSON 序列化)"""
+        return {'type': type(self).__name__, 'state': self._dump()}
+
+    @staticmethod
+    def from_state(state: Dict[str, Any]) -> 'StreamingIndicator':
+        """由 to_state 的结果恢复指标对象"""
+        cls = StreamingIndicator._registry[state['type']]
+        indicator = cls(**state['state']['params'])
+        indicator._load(state['state'])
+        if isinstance(indicator.value, list):
+            indicator.value = tuple(indicator.value)
+        return indicator
+
+
+class StreamingSMA(StreamingIndicator):
+    """增量简单移动平均"""
+
+    def __init__(self, window: int):
+        super().__init__(window=window)
+        self.rolling = _RollingWindow(window)
+
+    def _update(self, close):
+        self.rolling.update(close)
+        return self.rolling.rolling_mean()
+
+
+class StreamingEMA(StreamingIndicator):
+    """增量指数移动平均 (α = 2 / (window + 1))"""
+
+    def __init__(self, window: int):
+        super().__init__(window=window)
+        self.ewm = _EWM(2.0 / (window + 1.0))
+
+    def _update(self, close):
+        return self.ewm.update(close)
+
+
+class StreamingMACD(StreamingIndicator):
+    """增量 MACD，值为 (DIF, DEA, MACD 柱)"""
+
+    def __init__(self, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9):
+        super().__init__(fast_period=fast_period, slow_period=slow_period, signal_period=signal_period)
+        self.fast = _EWM(2.0 / (fast_period + 1.0))
+        self.slow = _EWM(2.0 / (slow_period + 1.0))
+        self.signal = _EWM(2.0 / (signal_period + 1.0))
+
+    def _update(self, close):
+        dif = self.fast.update(close) - self.slow.update(close)
+        dea = self.signal.update(dif)
+        return dif, dea, 2 * (dif - dea)
+
+
+class StreamingRSI(StreamingIndicator):
+    """增量 RSI (Wilder 平滑，α = 1/window)"""
+
+    def __init__(self, window: int = 14):
+        super().__init__(window=window)
+        self.prev_close = NAN
+        self.gain = _EWM(1.0 / window, adjust=True, min_periods=window)
+        self.loss = _EWM(1.0 / window, adjust=True, min_periods=window)
+
+    def _update(self, close):
+        delta = close - self.prev_close
+        self.prev_close = close
+        # 与 calculate_rsi 一致: 差分为 NaN 时涨跌幅记为 0
+        avg_gain = self.gain.update(delta if delta > 0 else 0.0)
+        avg_loss = self.loss.update(-delta if delta < 0 else 0.0)
+        if _isnan(avg_gain) or _isnan(avg_loss):
+            return NAN
+        if avg_loss == 0:
+            return NAN if avg_gain == 0 else 100.0
+        return 100 - 100 / (1 + avg_gain / avg_loss)
+
+
+class StreamingKDJ(StreamingIndicator):
+    """增量 KDJ，值为 (K, D, J)"""
+
+    fields = ('high', 'low', 'close')
+
+    def __init__(self, n: int = 9, m1: int = 3, m2: int = 3):
+        super().__init__(n=n, m1=m1, m2=m2)
+        self.lowest = _RollingExtreme(n, 'min')
+        self.highest = _RollingExtreme(n, 'max')
+        self.k = _EWM(1.0 / m2)
+        self.d = _EWM(1.0 / m1)
+
+    def _update(self, high, low, close):
+        lowest_low = self.lowest.update(low)
+        highest_high = self.highest.update(high)
+        spread = highest_high - lowest_low
+        if spread == 0:
+            rsv = NAN if close == lowest_low else math.copysign(math.inf, close - lowest_low)
+        else:
+            rsv = (close - lowest_low) / spread * 100
+        k = self.k.update(rsv)
+        d = self.d.update(k)
+        return k, d, 3 * k - 2 * d
+
+
+class StreamingBOLL(StreamingIndicator):
+    """增量布林带，值为 (中轨，上轨，下轨，带宽)"""
+
+    def __init__(self, window: int = 20, num_std: float = 2.0):
+        super().__init__(window=window, num_std=num_std)
+        self.rolling = _RollingWindow(window)
+
+    def _update(self, close):
+        self.rolling.update(close)
+        middle = self.rolling.rolling_mean()
+        std = self.rolling.rolling_std()
+        num_std = self.params['num_std']
+        upper = middle + num_std * std
+        lower = middle - num_std * std
+        bandwidth = (upper - lower) / middle * 100 if middle != 0 else NAN
+        return middle, upper, lower, bandwidth
+
+
+class StreamingATR(StreamingIndicator):
+    """增量 ATR"""
+
+    fields = ('high', 'low', 'close')
+
+    def __init__(self, window: int = 14):
+        super().__init__(window=window)
+        self.prev_close = NAN
+        self.ewm = _EWM(2.0 / (window + 1.0))
+
+    def _update(self, high, low, close):
+        ranges = [r for r in (high - low, abs(high - self.prev_close), abs(low - self.prev_close)) if not _isnan(r)]
+        self.prev_close = close
+        return self.ewm.update(max(ranges) if ranges else NAN)
+
+
+class StreamingCCI(StreamingIndicator):
+    """增量 CCI (平均偏差使用每根 K 线当时的均值，与 calculate_cci 相同)"""
+
+    fields = ('high', 'low', 'close')
+
+    def __init__(self, window: int = 20):
+        super().__init__(window=window)
+        self.tp = _RollingWindow(window)
+        self.deviation = _RollingWindow(window)
+
+    def _update(self, high, low, close):
+        tp = (high + low + close) / 3
+        self.tp.update(tp)
+        ma = self.tp.rolling_mean()
+        self.deviation.update(abs(tp - ma))
+        md = self.deviation.rolling_mean()
+        if md == 0:
+            return NAN if tp == ma else math.copysign(math.inf, tp - ma)
+        return (tp - ma) / (0.015 * md)
+
+
+class StreamingOBV(StreamingIndicator):
+    """增量 OBV 能量潮"""
+
+    fields = ('close', 'volume')
+
+    def __init__(self):
+        super().__init__()
+        self.prev_close = NAN
+        self.obv = 0.0
+
+    def _update(self, close, volume):
+        if self.count > 1:
+            if close > self.prev_close:
+                self.obv += volume
+            elif close < self.prev_close:
+                self.obv -= volume
+        self.prev_close = close
+        return self.obv
+
+
+# ==================== 状态文件 ====================
+
+def save_states(path: str, states: Dict[str, Any]):
+    """
+    把多只股票的指标状态写入 JSON 文件 (先写临时文件再替换)
+
+    参数:
+        path: 文件路径
+        states: {股票代码: 可 JSON 序列化的状态}
+    """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(states, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def load_states(path: Optional[str]) -> Dict[str, Any]:
+    """读取 save_states 写入的状态文件，不存在或损坏时返回空字典"""
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"读取指标状态 {path} 失败: {str(e)}")
+        return {}
@@ -6,8 +6,12 @@ volume.py - 成交量指标
 import numpy as np
 import pandas as pd
 from .ma import calculate_sma
+from .panel import panel_obv
+from .cache import memoize
+from .precision import with_precision
 
 
+@with_precision
 def calculate_volume_ma(volume: pd.Series, window: int = 5) -> pd.Series:
     """
     计算成交量均线
@@ -22,6 +26,7 @@ def calculate_volume_ma(volume: pd.Series, window: int = 5) -> pd.Series:
     return calculate_sma(volume, window)
 
 
+@with_precision
 def calculate_volume_ratio(
     volume: pd.Series,
     window: int = 5
@@ -85,6 +90,8 @@ def detect_volume_shrink(
     return shrink.astype(int)
 
 
+@memoize
+@with_precision
 def calculate_obv(close: pd.Series, volume: pd.Series) -> pd.Series:
     """
     计算 OBV 能量潮
@@ -101,17 +108,9 @@ def calculate_obv(close: pd.Series, volume: pd.Series) -> pd.Series:
     返回:
         OBV 序列
     """
-    obv = pd.Series(0.0, index=close.index)
-    
-    for i in range(1, len(close)):
-        if close.iloc[i] > close.iloc[i-1]:
-            obv.iloc[i] = obv.iloc[i-1] + volume.iloc[i]
-        elif close.iloc[i] < close.iloc[i-1]:
-            obv.iloc[i] = obv.iloc[i-1] - volume.iloc[i]
-        else:
-            obv.iloc[i] = obv.iloc[i-1]
-    
-    return obv
+    # 按涨跌方向取正负号的成交量累加
+    obv = panel_obv(close.to_numpy(), volume.to_numpy())
+    return pd.Series(obv, index=close.index)
 
 
 # ==================== 使用示例 ====================
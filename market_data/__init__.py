@@ -0,0 +1,53 @@
+"""
+market_data - 行情数据模块
+"""
+from .provider import (
+    MarketDataProvider,
+    AkshareProvider,
+    RecordingProvider,
+    ReplayProvider,
+    get_provider,
+    set_provider,
+)
+from .store import BarStore, get_bar_store
+from .minute_store import MinuteBarStore, get_minute_store
+from .financial import FinancialStore, get_financial_store
+from .universe import UniverseSnapshot, UniverseStore, get_universe_store
+from .fetcher import BulkFetcher, TokenBucket, fetch_bars
+from .panel import PricePanel
+from .resample import BarResampler, period_labels, resample_bars, resample_panel
+from .trading_calendar import TradingCalendar, get_calendar, load_calendar
+from .schema import bar_arrays, concat_bars, normalize_bars, to_source_columns
+
+__all__ = [
+    'MarketDataProvider',
+    'AkshareProvider',
+    'RecordingProvider',
+    'ReplayProvider',
+    'get_provider',
+    'set_provider',
+    'BarStore',
+    'get_bar_store',
+    'MinuteBarStore',
+    'get_minute_store',
+    'FinancialStore',
+    'get_financial_store',
+    'UniverseSnapshot',
+    'UniverseStore',
+    'get_universe_store',
+    'BulkFetcher',
+    'TokenBucket',
+    'fetch_bars',
+    'PricePanel',
+    'BarResampler',
+    'period_labels',
+    'resample_bars',
+    'resample_panel',
+    'TradingCalendar',
+    'get_calendar',
+    'load_calendar',
+    'normalize_bars',
+    'to_source_columns',
+    'bar_arrays',
+    'concat_bars',
+]
@@ -0,0 +1,289 @@
+"""
+fetcher.py - 批量并发拉取 (Bulk Fetcher)
+
+基于 asyncio 的批量日线拉取:
+- 并发上限: asyncio.Semaphore 控制同时进行的请求数
+- 限流: 令牌桶，每次请求 (含重试) 消耗一个令牌；同一个拉取器的多次批量拉取共用一个桶
+- 重试: 失败后指数退避 (带随机抖动)
+- 合并: 相同 (股票, 区间, 复权) 的请求只执行一次，后续请求拿到结果的副本
+- 同一只股票的不同区间串行执行，避免并发写同一份本地文件
+
+数据源接口是同步的 (akshare / BarStore)，实际调用放在线程池中执行；
+进度回调在事件循环线程中执行，计数不需要加锁。
+
+用法:
+    fetcher = BulkFetcher(max_concurrency=8, rate=5)
+    bars = fetcher.fetch([('000001', '20240101', '20240630'), ('600000', '20240101', '20240630')])
+"""
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from .provider import EARLIEST_DATE, to_timestamp
+
+
+class TokenBucket:
+    """
+    令牌桶限流器
+
+    以 rate 个/秒的速度补充令牌，最多积累 capacity 个 (允许的突发量)
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        参数:
+            rate: 每秒补充的令牌数
+            capacity: 桶容量，默认等于 rate (至少为 1)
+        """
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1.0))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop = None
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _loop_lock(self) -> asyncio.Lock:
+        """asyncio.Lock 绑定事件循环，每次 asyncio.run 换用新锁，令牌数跨循环保留"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._lock = loop, asyncio.Lock()
+        return self._lock
+
+    async def acquire(self):
+        """取一个令牌，桶空时等待"""
+        async with self._loop_lock():
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+
+def _request_key(request: Sequence) -> Tuple[str, pd.Timestamp, Optional[pd.Timestamp], str]:
+    """把 (symbol, start, end[, adjust]) 归一化为合并用的键"""
+    symbol = str(request[0])
+    start = to_timestamp(request[1]) if len(request) > 1 and request[1] is not None else to_timestamp(EARLIEST_DATE)
+    end = to_timestamp(request[2]) if len(request) > 2 and request[2] is not None else None
+    adjust = request[3] if len(request) > 3 else 'qfq'
+    return symbol, start, end, adjust
+
+
+class BulkFetcher:
+    """
+    批量并发拉取器
+
+    统计信息 (stats):
+        requests: 提交的请求数
+        coalesced: 被合并 (未实际执行) 的重复请求数
+        calls: 实际调用数据源的次数 (含重试)
+        retries: 重试次数
+        failed: 最终失败的请求数
+        elapsed: 最近一次批量拉取耗时 (秒)
+        throughput: 最近一次批量拉取的吞吐量 (请求数/秒)
+    """
+
+    def __init__(
+        self,
+        source=None,
+        max_concurrency: int = 8,
+        rate: Optional[float] = None,
+        burst: Optional[float] = None,
+        retries: int = 2,
+        backoff: float = 0.5,
+        max_backoff: float = 8.0
+    ):
+        """
+        初始化拉取器
+
+        参数:
+            source: 日线数据来源，需提供 get_bars(symbol, start_date, end_date, adjust)，
+                    BarStore 或 MarketDataProvider 均可，默认使用全局本地存储
+            max_concurrency: 最大并发请求数
+            rate: 每秒最多发起的请求数，None 表示不限流
+            burst: 令牌桶容量 (允许的突发请求数)，默认等于 rate
+            retries: 失败后的最大重试次数
+            backoff: 首次重试等待秒数，之后每次翻倍
+            max_backoff: 单次重试最长等待秒数
+        """
+        self._source = source
+        self.max_concurrency = max_concurrency
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        # 限流按拉取器计，连续多次 fetch 不会各自拿到满桶的突发量
+        self.bucket = TokenBucket(rate, burst) if rate else None
+        self.stats = {'requests': 0, 'coalesced': 0, 'calls': 0, 'retries': 0, 'failed': 0, 'elapsed': 0.0, 'throughput': 0.0}
+
+    @property
+    def source(self):
+        if self._source is None:
+            from .store import get_bar_store
+            return get_bar_store()
+        return self._source
+
+    # ==================== 通用执行 ====================
+
+    async def _attempt(self, fn: Callable, args: tuple, semaphore, bucket, executor) -> Any:
+        """在并发与限流约束下调用 fn，失败时指数退避重试"""
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.retries + 1):
+            if bucket is not None:
+                await bucket.acquire()
+            async with semaphore:
+                self.stats['calls'] += 1
+                try:
+                    return await loop.run_in_executor(executor, fn, *args)
+                except Exception as e:
+                    if attempt >= self.retries:
+                        print(f"请求 {args[0]} 失败 (共尝试 {attempt + 1} 次): {str(e)}")
+                        raise
+            self.stats['retries'] += 1
+            delay = min(self.max_backoff, self.backoff * (2 ** attempt))
+            await asyncio.sleep(delay * (0.5 + random.random() / 2))
+
+    async def map_async(
+        self,
+        fn: Callable,
+        items: Iterable,
+        key: Callable[[Any], Hashable] = None,
+        lock_key: Callable[[Any], Hashable] = None,
+        on_done: Callable[[Any, Any, Optional[Exception]], None] = None
+    ) -> List[Any]:
+        """
+        并发执行 fn(*item) (item 不是元组时执行 fn(item))
+
+        参数:
+            fn: 同步函数
+            items: 参数列表
+            key: 合并键，键相同的请求只执行一次，默认使用 item 本身
+            lock_key: 串行键，键相同的请求依次执行
+            on_done: 完成回调 on_done(item, result, error)，在事件循环线程中执行
+
+        返回:
+            与 items 顺序一致的结果列表，失败的位置为 None
+        """
+        items = list(items)
+        key = key or (lambda item: item)
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        bucket = self.bucket
+        in_flight: Dict[Hashable, asyncio.Task] = {}
+        locks: Dict[Hashable, asyncio.Lock] = {}
+
+        async def run_one(item):
+            args = item if isinstance(item, tuple) else (item,)
+            if lock_key is None:
+                return await self._attempt(fn, args, semaphore, bucket, executor)
+            lock = locks.setdefault(lock_key(item), asyncio.Lock())
+            async with lock:
+                return await self._attempt(fn, args, semaphore, bucket, executor)
+
+        async def wait_one(item, task, shared):
+            try:
+                result, error = await task, None
+            except Exception as e:
+                result, error = None, e
+            if shared and isinstance(result, (pd.DataFrame, pd.Series)):
+                # 合并的请求各拿一份副本，调用方原地修改时互不影响
+                result = result.copy()
+            if on_done is not None:
+                on_done(item, result, error)
+            return result
+
+        started = time.perf_counter()
+        waiters = []
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            for item in items:
+                self.stats['requests'] += 1
+                k = key(item)
+                task = in_flight.get(k)
+                shared = task is not None
+                if task is None:
+                    task = asyncio.ensure_future(run_one(item))
+                    in_flight[k] = task
+                else:
+                    self.stats['coalesced'] += 1
+                waiters.append(wait_one(item, task, shared))
+            results = await asyncio.gather(*waiters)
+
+        self.stats['failed'] += sum(1 for task in in_flight.values() if task.exception() is not None)
+        elapsed = time.perf_counter() - started
+        self.stats['elapsed'] = elapsed
+        self.stats['throughput'] = len(items) / elapsed if elapsed > 0 else 0.0
+        return list(results)
+
+    def map(self, fn: Callable, items: Iterable, **kwargs) -> List[Any]:
+        """map_async 的同步版本"""
+        return asyncio.run(self.map_async(fn, items, **kwargs))
+
+    # ==================== 日线拉取 ====================
+
+    async def fetch_async(
+        self,
+        requests: Iterable[Sequence],
+        on_done: Callable[[Sequence, Optional[pd.DataFrame], Optional[Exception]], None] = None
+    ) -> List[Optional[pd.DataFrame]]:
+        """
+        批量拉取日线
+
+        参数:
+            requests: [(symbol, start_date, end_date[, adjust]), ...]，日期可为 None
+            on_done: 完成回调 on_done(request, df, error)
+
+        返回:
+            与 requests 顺序一致的 DataFrame 列表，失败的位置为 None
+        """
+        requests = list(requests)   # 生成键和回调映射各遍历一次
+        source = self.source
+
+        def get_bars(symbol, start, end, adjust):
+            return source.get_bars(symbol, start_date=start, end_date=end, adjust=adjust)
+
+        keys = [_request_key(request) for request in requests]
+        results = await self.map_async(
+            get_bars,
+            keys,
+            lock_key=lambda k: (k[0], k[3]),
+            on_done=None if on_done is None else self._request_callback(requests, keys, on_done)
+        )
+        return results
+
+    def fetch(self, requests: Iterable[Sequence], on_done=None) -> List[Optional[pd.DataFrame]]:
+        """fetch_async 的同步版本"""
+        return asyncio.run(self.fetch_async(list(requests), on_done))
+
+    @staticmethod
+    def _request_callback(requests, keys, on_done):
+        """把归一化后的键映射回调用方传入的原始请求"""
+        originals: Dict[Tuple, List[Sequence]] = {}
+        for request, k in zip(requests, keys):
+            originals.setdefault(k, []).append(request)
+
+        def callback(k, result, error):
+            on_done(originals[k].pop(0), result, error)
+        return callback
+
+
+def fetch_bars(requests: Iterable[Sequence], source=None, **kwargs) -> List[Optional[pd.DataFrame]]:
+    """
+    便捷函数: 批量拉取日线
+
+    参数:
+        requests: [(symbol, start_date, end_date[, adjust]), ...]
+        source: 日线数据来源，默认全局本地存储
+        **kwargs: 传给 BulkFetcher 的参数 (max_concurrency / rate / retries 等)
+
+    返回:
+        与 requests 顺序一致的 DataFrame 列表，失败的位置为 None
+    """
+    return BulkFetcher(source, **kwargs).fetch(requests)
@@ -0,0 +1,224 @@
+"""
+financial.py - 按时点 (Point-in-Time) 财务数据缓存
+
+财务摘要按 (股票, 公告日期) 建立索引，as_of 查询返回在指定交易日
+已经公开的最新一期报告，避免回测中使用未来才公布的财报。
+
+同花顺财务摘要不含公告日期，此时按法定披露截止日推算 (偏保守):
+- 一季报 (03-31): 当年 04-30
+- 半年报 (06-30): 当年 08-31
+- 三季报 (09-30): 当年 10-31
+- 年报   (12-31): 次年 04-30
+
+数据落盘后常驻内存，回测中每只股票最多回源一次。
+"""
+import json
+import os
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from .provider import MarketDataProvider, get_provider, to_timestamp
+
+DEFAULT_ROOT = os.path.join('data', 'store', 'financial')
+PERIOD_COL = '报告期'
+ANNOUNCE_COL = '公告日期'
+
+# 报告期月份 -> (公告年份偏移, 截止月, 截止日)
+DISCLOSURE_DEADLINES = {
+    3: (0, 4, 30),
+    6: (0, 8, 31),
+    9: (0, 10, 31),
+    12: (1, 4, 30),
+}
+
+
+def parse_report_period(value) -> pd.Timestamp:
+    """
+    解析报告期
+
+    参数:
+        value: '2024-09-30' / '20240930' / '2024' (年度) 等
+
+    返回:
+        报告期截止日，无法解析时返回 NaT
+    """
+    text = str(value).strip()
+    if len(text) == 4 and text.isdigit():
+        return pd.Timestamp(int(text), 12, 31)
+    return pd.to_datetime(text, errors='coerce')
+
+
+def disclosure_deadline(period: pd.Timestamp) -> pd.Timestamp:
+    """
+    计算报告期对应的法定披露截止日
+
+    参数:
+        period: 报告期截止日
+
+    返回:
+        截止日，非标准报告期按 4 个月后处理
+    """
+    if pd.isna(period):
+        return pd.NaT
+    if period.month in DISCLOSURE_DEADLINES:
+        year_offset, month, day = DISCLOSURE_DEADLINES[period.month]
+        return pd.Timestamp(period.year + year_offset, month, day)
+    return period + pd.DateOffset(months=4)
+
+
+class FinancialStore:
+    """
+    按时点财务数据存储
+
+    功能:
+    - 每只股票一份 parquet，附带推算或真实的公告日期
+    - as_of(symbol, date) 返回当日已公开的最新报告
+    - 内存索引，同一进程内每只股票只读一次盘
+    """
+
+    def __init__(
+        self,
+        root: str = DEFAULT_ROOT,
+        provider: Optional[MarketDataProvider] = None,
+        refresh_days: int = 7
+    ):
+        """
+        初始化存储
+
+        参数:
+            root: 存储根目录，None 表示只缓存在内存中
+            provider: 回源使用的数据源，默认使用全局数据源
+            refresh_days: 查询日期晚于上次拉取日时，距上次拉取超过该天数才重新回源
+        """
+        self.root = root
+        self._provider = provider
+        self.refresh_days = refresh_days
+        self._index: Dict[str, pd.DataFrame] = {}
+        self._fetched_at: Dict[str, pd.Timestamp] = {}
+        self.stats = {'network_requests': 0}
+
+    @property
+    def provider(self) -> MarketDataProvider:
+        return self._provider or get_provider()
+
+    def _path(self, symbol: str) -> str:
+        return os.path.join(self.root, f'{symbol}.parquet')
+
+    def _meta_path(self, symbol: str) -> str:
+        return os.path.join(self.root, f'{symbol}.json')
+
+    # ==================== 读写 ====================
+
+    def _normalize(self, df: pd.DataFrame) -> pd.DataFrame:
+        """补充公告日期并按公告日期升序排列"""
+        df = df.copy()
+        periods = df[PERIOD_COL].map(parse_report_period)
+        if ANNOUNCE_COL in df.columns:
+            announce = pd.to_datetime(df[ANNOUNCE_COL], errors='coerce')
+            announce = announce.fillna(periods.map(disclosure_deadline))
+        else:
+            announce = periods.map(disclosure_deadline)
+        df[ANNOUNCE_COL] = pd.to_datetime(announce)
+        df = df[df[ANNOUNCE_COL].notna()]
+        return df.sort_values([ANNOUNCE_COL, PERIOD_COL], kind='stable').reset_index(drop=True)
+
+    def _fetch(self, symbol: str) -> pd.DataFrame:
+        self.stats['network_requests'] += 1
+        raw = self.provider.get_financial_abstract(symbol)
+        if raw is None or raw.empty or PERIOD_COL not in raw.columns:
+            df = pd.DataFrame(columns=[PERIOD_COL, ANNOUNCE_COL])
+        else:
+            df = self._normalize(raw)
+
+        # 同花顺返回的列混杂字符串与数字，统一存为字符串，空值保留为 None
+        for col in df.columns:
+            if df[col].dtype == object:
+                df[col] = df[col].map(lambda v: None if pd.isna(v) else str(v))
+
+        fetched_at = pd.Timestamp(datetime.now().date())
+        if self.root is not None:
+            os.makedirs(self.root, exist_ok=True)
+            df.to_parquet(self._path(symbol), index=False)
+            with open(self._meta_path(symbol), 'w', encoding='utf-8') as f:
+                json.dump({'fetched_at': fetched_at.strftime('%Y-%m-%d')}, f)
+
+        self._index[symbol] = df
+        self._fetched_at[symbol] = fetched_at
+        return df
+
+    def _load(self, symbol: str) -> bool:
+        """从本地加载到内存索引，本地不存在时返回 False"""
+        if self.root is None:
+            return False
+        path = self._path(symbol)
+        if not os.path.exists(path) or not os.path.exists(self._meta_path(symbol)):
+            return False
+        with open(self._meta_path(symbol), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        df = pd.read_parquet(path)
+        df[ANNOUNCE_COL] = pd.to_datetime(df[ANNOUNCE_COL])
+        self._index[symbol] = df
+        self._fetched_at[symbol] = pd.Timestamp(meta['fetched_at'])
+        return True
+
+    def get_reports(self, symbol: str, as_of_date=None) -> pd.DataFrame:
+        """
+        获取某只股票的全部报告 (按公告日期升序)
+
+        参数:
+            symbol: 股票代码
+            as_of_date: 需要覆盖到的查询日期，晚于上次拉取日且超过刷新间隔时重新回源
+
+        返回:
+            含公告日期列的财务摘要
+        """
+        if symbol not in self._index and not self._load(symbol):
+            return self._fetch(symbol)
+
+        fetched_at = self._fetched_at[symbol]
+        if as_of_date is not None and to_timestamp(as_of_date) > fetched_at:
+            today = pd.Timestamp(datetime.now().date())
+            if (today - fetched_at).days >= self.refresh_days:
+                return self._fetch(symbol)
+        return self._index[symbol]
+
+    # ==================== 时点查询 ====================
+
+    def as_of(self, symbol: str, trade_date=None) -> Optional[pd.Series]:
+        """
+        返回指定交易日已经公开的最新一期报告
+
+        参数:
+            symbol: 股票代码
+            trade_date: 交易日期，默认今天
+
+        返回:
+            报告行 (pd.Series)，当日尚无已公开报告时返回 None
+        """
+        trade_date = to_timestamp(trade_date) if trade_date is not None else pd.Timestamp(datetime.now().date())
+        df = self.get_reports(symbol, trade_date)
+        if df.empty:
+            return None
+
+        pos = np.searchsorted(df[ANNOUNCE_COL].values, trade_date.to_datetime64(), side='right') - 1
+        if pos < 0:
+            return None
+        return df.iloc[pos]
+
+    def latest(self, symbol: str) -> Optional[pd.Series]:
+        """返回当前已公开的最新一期报告"""
+        return self.as_of(symbol)
+
+
+_default_store: Optional[FinancialStore] = None
+
+
+def get_financial_store() -> FinancialStore:
+    """获取全局共享的默认财务数据存储"""
+    global _default_store
+    if _default_store is None:
+        _default_store = FinancialStore()
+    return _default_store
@@ -0,0 +1,259 @@
+"""
+minute_store.py - 本地列式分钟线存储 (Minute Bar Store)
+
+每只股票一个目录，按月份分区保存为 parquet 列式文件:
+
+    {root}/{period}m/{adjust}/{symbol}/{YYYY-MM}.parquet
+    {root}/{period}m/{adjust}/{symbol}/meta.json      # 已覆盖的时间区间
+
+- 支持 1 / 5 / 15 / 30 / 60 分钟线，各周期分别缓存 (也可以由 1 分钟线用
+  resample_bars(df, '5min') 合成)
+- 读取时只加载与请求区间相交的月份文件，只有本地尚未覆盖的区间才会回源
+- iter_panels 按月份 (或更小的固定块) 依次产出 (股票数, 分钟数) 面板，
+  配合 indicators.chunked.ChunkedIndicators 计算多年分钟线指标，内存占用与历史长度无关
+
+用法:
+    store = get_minute_store()
+    store.get_bars('000001', '2024-03-01', '2024-03-29', period='5')
+    for times, fields in store.iter_panels(symbols, '2020-01-01', '2024-12-31', period='5'):
+        values = chunked.update(fields)
+"""
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .panel import COLUMN_MAP, FIELDS
+from .provider import EARLIEST_DATE, TIME_COL, MarketDataProvider, _time_range, get_provider
+from .store import settled_date
+
+DEFAULT_ROOT = os.path.join('data', 'store', 'minute')
+
+PERIODS = ('1', '5', '15', '30', '60')
+
+
+class MinuteBarStore:
+    """
+    本地分钟线存储
+
+    功能:
+    - 按 (周期, 复权方式, 股票, 月份) 分区的 parquet 存储
+    - 区间读取只访问相关月份文件
+    - 缺失区间自动回源并合并入库
+    - 按块产出对齐后的多股票面板
+    """
+
+    def __init__(self, root: str = DEFAULT_ROOT, provider: Optional[MarketDataProvider] = None):
+        """
+        初始化存储
+
+        参数:
+            root: 存储根目录
+            provider: 回源使用的数据源，默认使用全局数据源 (akshare)
+        """
+        self.root = root
+        self._provider = provider
+        self.stats = {'disk_reads': 0, 'network_requests': 0}
+
+    @property
+    def provider(self) -> MarketDataProvider:
+        return self._provider or get_provider()
+
+    # ==================== 路径与元数据 ====================
+
+    @staticmethod
+    def _check_period(period: str) -> str:
+        period = str(period)
+        if period not in PERIODS:
+            raise ValueError(f"不支持的分钟周期: {period}，可选 {' / '.join(PERIODS)}")
+        return period
+
+    def _symbol_dir(self, symbol: str, period: str, adjust: str) -> str:
+        return os.path.join(self.root, f'{self._check_period(period)}m', adjust or 'none', symbol)
+
+    def _month_path(self, symbol: str, period: str, adjust: str, month: pd.Period) -> str:
+        return os.path.join(self._symbol_dir(symbol, period, adjust), f'{month}.parquet')
+
+    def _meta_path(self, symbol: str, period: str, adjust: str) -> str:
+        return os.path.join(self._symbol_dir(symbol, period, adjust), 'meta.json')
+
+    def coverage(self, symbol: str, period: str = '1', adjust: str = '') -> Optional[Tuple[pd.Timestamp, pd.Timestamp]]:
+        """返回本地已覆盖的 (起始时间, 结束时间)，没有数据时返回 None"""
+        path = self._meta_path(symbol, period, adjust)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        return pd.Timestamp(meta['start']), pd.Timestamp(meta['end'])
+
+    def _save_coverage(self, symbol: str, period: str, adjust: str, start: pd.Timestamp, end: pd.Timestamp):
+        path = self._meta_path(symbol, period, adjust)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'start': start.strftime('%Y-%m-%d %H:%M'), 'end': end.strftime('%Y-%m-%d %H:%M')}, f)
+        os.replace(tmp_path, path)
+
+    # ==================== 读写 ====================
+
+    def read(self, symbol: str, start, end, period: str = '1', adjust: str = '') -> pd.DataFrame:
+        """
+        从本地读取区间数据 (不访问网络)
+
+        参数:
+            symbol: 股票代码
+            start: 开始时间
+            end: 结束时间，只给日期时包含当天
+            period: 分钟周期
+            adjust: 复权方式
+
+        返回:
+            按时间升序排列的 DataFrame
+        """
+        start, end = _time_range(start, end)
+        frames = []
+        for month in pd.period_range(start, end, freq='M'):
+            path = self._month_path(symbol, period, adjust, month)
+            if os.path.exists(path):
+                frames.append(pd.read_parquet(path))
+                self.stats['disk_reads'] += 1
+
+        if not frames:
+            return pd.DataFrame()
+
+        df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        mask = (df[TIME_COL] >= start) & (df[TIME_COL] <= end)
+        return df.loc[mask].reset_index(drop=True)
+
+    def write(self, symbol: str, df: pd.DataFrame, period: str = '1', adjust: str = ''):
+        """
+        将数据按月份合并写入本地 (同一分钟以新数据为准)
+
+        参数:
+            symbol: 股票代码
+            df: ak.stock_zh_a_hist_min_em 格式的分钟线
+            period: 分钟周期
+            adjust: 复权方式
+        """
+        if df is None or df.empty:
+            return
+
+        df = df.copy()
+        df[TIME_COL] = pd.to_datetime(df[TIME_COL])
+        os.makedirs(self._symbol_dir(symbol, period, adjust), exist_ok=True)
+
+        for month, part in df.groupby(df[TIME_COL].dt.to_period('M')):
+            path = self._month_path(symbol, period, adjust, month)
+            if os.path.exists(path):
+                part = pd.concat([pd.read_parquet(path), part], ignore_index=True)
+                part = part.drop_duplicates(subset=TIME_COL, keep='last')
+            part = part.sort_values(TIME_COL).reset_index(drop=True)
+
+            tmp_path = path + '.tmp'
+            part.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+
+    def _fetch(self, symbol: str, start: pd.Timestamp, end: pd.Timestamp, period: str, adjust: str):
+        self.stats['network_requests'] += 1
+        self.write(symbol, self.provider.get_minute_bars(symbol, start, end, period, adjust), period, adjust)
+
+    # ==================== 对外接口 ====================
+
+    def get_bars(self, symbol: str, start=EARLIEST_DATE, end=None, period: str = '1', adjust: str = '') -> pd.DataFrame:
+        """
+        获取分钟线，优先读取本地，缺失部分回源后入库
+
+        参数:
+            symbol: 股票代码，如 '000001'
+            start: 开始时间
+            end: 结束时间，只给日期时包含当天，默认现在
+            period: 分钟周期 '1' / '5' / '15' / '30' / '60'
+            adjust: 复权方式 '' / 'qfq' / 'hfq'
+
+        返回:
+            与 ak.stock_zh_a_hist_min_em 列一致的 DataFrame
+        """
+        start, end = _time_range(start, end)
+        # 盘中拉到的当天分钟线尚未收盘，不计入已覆盖区间
+        settled = settled_date() + pd.Timedelta(days=1) - pd.Timedelta(minutes=1)
+        covered = self.coverage(symbol, period, adjust)
+        if covered is None:
+            self._fetch(symbol, start, end, period, adjust)
+            cov_start, cov_end = start, min(end, settled)
+        else:
+            cov_start, cov_end = covered
+            if start < cov_start:
+                self._fetch(symbol, start, cov_start - pd.Timedelta(minutes=1), period, adjust)
+                cov_start = start
+            if end > cov_end:
+                self._fetch(symbol, cov_end + pd.Timedelta(minutes=1), end, period, adjust)
+                cov_end = max(cov_end, min(end, settled))
+        if cov_end >= cov_start:
+            self._save_coverage(symbol, period, adjust, cov_start, cov_end)
+        return self.read(symbol, start, end, period, adjust)
+
+    def iter_panels(
+        self,
+        symbols: Sequence[str],
+        start,
+        end,
+        period: str = '1',
+        adjust: str = '',
+        fields: Sequence[str] = FIELDS,
+        chunk_size: Optional[int] = None
+    ) -> Iterator[Tuple[np.ndarray, Dict[str, np.ndarray]]]:
+        """
+        按时间分块产出对齐的多股票面板 (只读本地，不访问网络)
+
+        每次只读取一个月份分区，块内时间为各股票分钟时间戳的并集，
+        某只股票缺少的分钟 (停牌、未上市) 为 NaN
+
+        参数:
+            symbols: 股票代码列表，每块的股票顺序相同
+            start: 开始时间
+            end: 结束时间
+            period: 分钟周期
+            adjust: 复权方式
+            fields: 面板字段 (open / high / low / close / volume / amount)
+            chunk_size: 每块最多的分钟数，默认每块一个月
+
+        返回:
+            依次产出 (时间戳 datetime64[ns] 数组, {字段: (股票数, 分钟数) 数组})
+        """
+        columns = {field: column for column, field in COLUMN_MAP.items()}
+        start, end = _time_range(start, end)
+        for month in pd.period_range(start, end, freq='M'):
+            lo, hi = max(start, month.start_time), min(end, month.end_time)
+            frames: List[pd.DataFrame] = [self.read(symbol, lo, hi, period, adjust) for symbol in symbols]
+            stamps = [frame[TIME_COL].to_numpy(dtype='datetime64[ns]') for frame in frames if not frame.empty]
+            if not stamps:
+                continue
+            times = np.unique(np.concatenate(stamps))
+
+            panel = {field: np.full((len(symbols), len(times)), np.nan) for field in fields}
+            for row, frame in enumerate(frames):
+                if frame.empty:
+                    continue
+                pos = times.searchsorted(frame[TIME_COL].to_numpy(dtype='datetime64[ns]'))
+                for field in fields:
+                    column = columns.get(field, field)
+                    if column in frame.columns:
+                        panel[field][row, pos] = pd.to_numeric(frame[column], errors='coerce').to_numpy(dtype=np.float64)
+            del frames
+
+            size = chunk_size or len(times)
+            for offset in range(0, len(times), size):
+                yield times[offset:offset + size], {field: values[:, offset:offset + size] for field, values in panel.items()}
+
+
+_default_store: Optional[MinuteBarStore] = None
+
+
+def get_minute_store() -> MinuteBarStore:
+    """获取全局共享的默认分钟线存储实例"""
+    global _default_store
+    if _default_store is None:
+        _default_store = MinuteBarStore()
+    return _default_store
@@ -0,0 +1,332 @@
+"""
+panel.py - 全市场价格面板 (Price Panel)
+
+把整个股票池的日线保存为一个稠密三维数组 (股票 × 交易日 × 字段)，
+以 .npy 格式落盘，通过 np.memmap 打开:
+
+    {root}/data.npy      # float64[股票数, 交易日数, 字段数]，缺失为 NaN
+    {root}/symbols.npy   # 股票代码 (升序)
+    {root}/dates.npy     # 交易日 datetime64[D] (升序)
+    {root}/fields.npy    # 字段名
+
+- 按日期区间、连续股票区间、单个字段切片都是视图，不复制数据
+- 多个进程打开同一份面板时共享操作系统页缓存，传递 PricePanel 对象只会 pickle 路径
+"""
+import os
+import shutil
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .provider import DATE_COL, to_timestamp
+
+DEFAULT_ROOT = os.path.join('data', 'store', 'panel')
+
+FIELDS = ('open', 'high', 'low', 'close', 'volume', 'amount')
+
+# akshare 日线列名 -> 面板字段
+COLUMN_MAP = {
+    '开盘': 'open',
+    '最高': 'high',
+    '最低': 'low',
+    '收盘': 'close',
+    '成交量': 'volume',
+    '成交额': 'amount',
+}
+
+
+class PricePanel:
+    """
+    内存映射的价格面板
+
+    属性:
+        data: np.memmap，形状 (股票数, 交易日数, 字段数)
+        symbols: 股票代码数组
+        dates: 交易日数组 (datetime64[D])
+        fields: 字段名元组
+    """
+
+    def __init__(self, root: str = DEFAULT_ROOT, mode: str = 'r'):
+        """
+        打开已构建的面板
+
+        参数:
+            root: 面板目录
+            mode: 'r' 只读 / 'r+' 读写
+        """
+        self.root = root
+        self.mode = mode
+        self.data = np.load(os.path.join(root, 'data.npy'), mmap_mode=mode)
+        self.symbols = np.load(os.path.join(root, 'symbols.npy'))
+        self.dates = np.load(os.path.join(root, 'dates.npy'))
+        self.fields = tuple(np.load(os.path.join(root, 'fields.npy')).tolist())
+        self.symbol_index: Dict[str, int] = {symbol: i for i, symbol in enumerate(self.symbols.tolist())}
+        self.field_index: Dict[str, int] = {field: i for i, field in enumerate(self.fields)}
+
+    # 多进程传递时只序列化路径，子进程重新映射同一份文件
+    def __getstate__(self):
+        return {'root': self.root, 'mode': self.mode}
+
+    def __setstate__(self, state):
+        self.__init__(state['root'], state['mode'])
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    # ==================== 索引 ====================
+
+    def rows(self, symbols: Iterable[str]) -> np.ndarray:
+        """
+        股票代码 -> 行号
+
+        参数:
+            symbols: 股票代码列表
+
+        返回:
+            行号数组，不在面板中的代码为 -1
+        """
+        return np.array([self.symbol_index.get(str(symbol), -1) for symbol in symbols], dtype=np.int64)
+
+    def date_slice(self, start=None, end=None) -> slice:
+        """
+        日期区间 [start, end] -> 列切片
+
+        参数:
+            start: 开始日期，None 表示最早
+            end: 结束日期，None 表示最晚
+        """
+        lo = 0 if start is None else int(self.dates.searchsorted(to_timestamp(start).to_datetime64(), side='left'))
+        hi = len(self.dates) if end is None else int(self.dates.searchsorted(to_timestamp(end).to_datetime64(), side='right'))
+        return slice(lo, hi)
+
+    def window_slice(self, length: int, end=None) -> slice:
+        """截至 end (含) 的最近 length 个交易日 -> 列切片"""
+        hi = self.date_slice(None, end).stop
+        return slice(max(hi - length, 0), hi)
+
+    def _symbol_selector(self, symbols) -> Union[slice, np.ndarray]:
+        """连续的股票区间返回切片 (视图)，否则返回行号数组"""
+        if symbols is None:
+            return slice(None)
+        if isinstance(symbols, slice):
+            return symbols
+        rows = self.rows(symbols)
+        if (rows < 0).any():
+            missing = [s for s, r in zip(symbols, rows) if r < 0]
+            raise KeyError(f"面板中没有股票: {missing[:10]}")
+        if len(rows) > 0 and np.array_equal(rows, np.arange(rows[0], rows[0] + len(rows))):
+            return slice(int(rows[0]), int(rows[0]) + len(rows))
+        return rows
+
+    # ==================== 切片 ====================
+
+    def _block(self, rows, cols: slice, fields) -> np.ndarray:
+        """先按股票、日期取子块，再取字段，只复制所选股票 (行号数组时) 的数据"""
+        block = self.data[rows, cols] if isinstance(rows, slice) else self.data[rows][:, cols]
+        if fields is None:
+            return block
+        if isinstance(fields, str):
+            return block[..., self.field_index[fields]]
+        index = [self.field_index[f] for f in fields]
+        # 连续的字段用切片 (视图)，否则只对已选的子块做花式索引
+        if len(index) > 0 and index == list(range(index[0], index[0] + len(index))):
+            return block[..., index[0]:index[0] + len(index)]
+        return block[..., index]
+
+    def field(self, name: str) -> np.ndarray:
+        """单个字段的 (股票数, 交易日数) 视图"""
+        return self.data[:, :, self.field_index[name]]
+
+    def select(
+        self,
+        symbols: Optional[Sequence[str]] = None,
+        start=None,
+        end=None,
+        fields: Union[str, Sequence[str], None] = None
+    ) -> np.ndarray:
+        """
+        按股票、日期、字段选取数据
+
+        参数:
+            symbols: 股票代码列表或行切片，None 表示全部；连续区间返回视图，否则复制所选行
+            start: 开始日期
+            end: 结束日期
+            fields: 单个字段名 (返回二维) 或字段列表 (返回三维)，None 表示全部字段
+
+        返回:
+            ndarray
+        """
+        rows = self._symbol_selector(symbols)
+        cols = self.date_slice(start, end)
+        return self._block(rows, cols, fields)
+
+    def window(
+        self,
+        length: int,
+        end=None,
+        symbols: Optional[Sequence[str]] = None,
+        fields: Union[str, Sequence[str], None] = None
+    ) -> np.ndarray:
+        """
+        截至 end 的最近 length 个交易日
+
+        参数:
+            length: 交易日数
+            end: 截止日期 (含)，默认面板最后一天
+            symbols: 股票代码列表，None 表示全部
+            fields: 字段
+
+        返回:
+            ndarray，例如 window(60, symbols=codes, fields='close') 形状为 (len(codes), 60)
+        """
+        cols = self.window_slice(length, end)
+        rows = self._symbol_selector(symbols)
+        return self._block(rows, cols, fields)
+
+    def resample(
+        self,
+        freq: str,
+        start=None,
+        end=None,
+        symbols: Optional[Sequence[str]] = None,
+        fields: Optional[Sequence[str]] = None
+    ) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+        """
+        合成周线/月线等高周期 K 线 (见 resample.resample_panel)
+
+        参数:
+            freq: 'W' / 'M' / 'Q' / 'Y'
+            start: 开始日期，不在周期起点时第一根 K 线只包含区间内的交易日
+            end: 结束日期
+            symbols: 股票代码列表，None 表示全部
+            fields: 字段列表，None 表示全部字段
+
+        返回:
+            ({字段: (股票数, K 线数) 数组}, K 线日期)
+        """
+        from .resample import resample_panel
+
+        rows = self._symbol_selector(symbols)
+        cols = self.date_slice(start, end)
+        names = self.fields if fields is None else tuple(fields)
+        return resample_panel({name: self._block(rows, cols, name) for name in names}, self.dates[cols], freq)
+
+    def frame(self, symbol: str, start=None, end=None) -> pd.DataFrame:
+        """
+        取单只股票的 DataFrame (与 ak.stock_zh_a_hist 列名一致，剔除缺失日)
+
+        参数:
+            symbol: 股票代码
+            start: 开始日期
+            end: 结束日期
+        """
+        cols = self.date_slice(start, end)
+        block = self.data[self.symbol_index[str(symbol)], cols, :]
+        reverse = {field: column for column, field in COLUMN_MAP.items()}
+        df = pd.DataFrame({reverse.get(f, f): block[:, i] for i, f in enumerate(self.fields)})
+        df.insert(0, DATE_COL, pd.to_datetime(self.dates[cols]))
+        return df[df[reverse.get('close', 'close')].notna()].reset_index(drop=True)
+
+    # ==================== 构建 ====================
+
+    @classmethod
+    def build(
+        cls,
+        bars: Dict[str, pd.DataFrame],
+        root: str = DEFAULT_ROOT,
+        dates: Optional[Sequence] = None,
+        fields: Sequence[str] = FIELDS,
+        dtype=np.float64
+    ) -> 'PricePanel':
+        """
+        由每只股票的日线构建面板
+
+        参数:
+            bars: {股票代码: ak.stock_zh_a_hist 格式 DataFrame}
+            root: 输出目录 (已存在时整体替换)
+            dates: 交易日轴，默认取所有股票日期的并集
+            fields: 面板字段
+            dtype: 数值类型
+
+        返回:
+            只读打开的 PricePanel
+        """
+        bars = {str(symbol): df for symbol, df in bars.items()}
+        symbols = np.array(sorted(bars), dtype='U')
+        if dates is None:
+            all_dates = [pd.to_datetime(df[DATE_COL]).values for df in bars.values() if df is not None and not df.empty]
+            dates = np.unique(np.concatenate(all_dates)) if all_dates else np.array([], dtype='datetime64[D]')
+        dates = np.asarray(pd.to_datetime(dates).values, dtype='datetime64[D]')
+        fields = tuple(fields)
+        columns = {field: column for column, field in COLUMN_MAP.items()}
+
+        tmp_root = root.rstrip(os.sep) + '.tmp'
+        shutil.rmtree(tmp_root, ignore_errors=True)
+        os.makedirs(tmp_root)
+
+        data = np.lib.format.open_memmap(
+            os.path.join(tmp_root, 'data.npy'), mode='w+', dtype=dtype,
+            shape=(len(symbols), len(dates), len(fields))
+        )
+        data[:] = np.nan
+        for i, symbol in enumerate(symbols):
+            df = bars[symbol]
+            if df is None or df.empty or len(dates) == 0:
+                continue
+            bar_dates = pd.to_datetime(df[DATE_COL]).values.astype('datetime64[D]')
+            pos = np.minimum(dates.searchsorted(bar_dates), len(dates) - 1)
+            valid = dates[pos] == bar_dates
+            for j, field in enumerate(fields):
+                column = columns.get(field, field)
+                if column in df.columns:
+                    data[i, pos[valid], j] = pd.to_numeric(df[column], errors='coerce').to_numpy()[valid]
+        data.flush()
+        del data
+
+        np.save(os.path.join(tmp_root, 'symbols.npy'), symbols)
+        np.save(os.path.join(tmp_root, 'dates.npy'), dates)
+        np.save(os.path.join(tmp_root, 'fields.npy'), np.array(fields, dtype='U'))
+
+        shutil.rmtree(root, ignore_errors=True)
+        os.replace(tmp_root, root)
+        return cls(root)
+
+    @classmethod
+    def build_from_store(
+        cls,
+        symbols: Iterable[str],
+        start_date,
+        end_date=None,
+        root: str = DEFAULT_ROOT,
+        source=None,
+        adjust: str = 'qfq',
+        max_concurrency: int = 8,
+        dates: Optional[Sequence] = None
+    ) -> 'PricePanel':
+        """
+        从本地日线存储并发读取后构建面板
+
+        参数:
+            symbols: 股票代码列表
+            start_date: 开始日期
+            end_date: 结束日期，默认今天
+            root: 输出目录
+            source: 日线来源 (BarStore / 数据源)，默认全局本地存储
+            adjust: 复权方式
+            max_concurrency: 并发读取数
+            dates: 交易日轴，默认取所有股票日期的并集
+
+        返回:
+            只读打开的 PricePanel
+        """
+        from .fetcher import BulkFetcher
+
+        symbols = [str(symbol) for symbol in symbols]
+        fetcher = BulkFetcher(source, max_concurrency=max_concurrency)
+        results = fetcher.fetch([(symbol, start_date, end_date, adjust) for symbol in symbols])
+        return cls.build(dict(zip(symbols, results)), root=root, dates=dates)
@@ -0,0 +1,397 @@
+"""
+provider.py - 行情数据源 (Market Data Provider)
+
+统一的数据源接口，覆盖:
+- 日线行情 (ak.stock_zh_a_hist)
+- 分钟线行情 (ak.stock_zh_a_hist_min_em)
+- 复权因子 (ak.stock_zh_a_daily)
+- 交易日历 (ak.tool_trade_date_hist_sina)
+- 全市场实时快照 (ak.stock_zh_a_spot_em)
+- 财务摘要 (ak.stock_financial_abstract_ths)
+- 公司公告 (ak.stock_notice_report)
+
+包含:
+- AkshareProvider: 直接调用 akshare
+- RecordingProvider: 透传上游数据源，同时把返回结果录制为本地 fixture
+- ReplayProvider: 从 fixture 回放，全部数据常驻内存，不访问网络
+"""
+import os
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+DATE_COL = '日期'
+TIME_COL = '时间'
+FACTOR_COL = '复权因子'
+EARLIEST_DATE = '19700101'
+
+
+def to_timestamp(date) -> pd.Timestamp:
+    """
+    统一日期格式
+
+    参数:
+        date: 'YYYYMMDD' / 'YYYY-MM-DD' 字符串、datetime 或 Timestamp
+
+    返回:
+        归一化到当天 0 点的 Timestamp
+    """
+    return pd.Timestamp(str(date) if isinstance(date, int) else date).normalize()
+
+
+def exchange_prefix(symbol: str) -> str:
+    """股票代码 -> 交易所前缀 'sh' / 'sz' / 'bj'"""
+    symbol = str(symbol).strip()
+    if symbol.startswith(('6', '9')):
+        return 'sh'
+    if symbol.startswith(('4', '8')):
+        return 'bj'
+    return 'sz'
+
+
+def _date_range(start_date, end_date) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    start = to_timestamp(start_date)
+    end = to_timestamp(end_date) if end_date is not None else pd.Timestamp.now().normalize()
+    return start, end
+
+
+def _time_range(start, end) -> Tuple[pd.Timestamp, pd.Timestamp]:
+    """分钟线时间区间，只给日期的结束时间包含当天全部分钟"""
+    start = pd.Timestamp(str(start) if isinstance(start, int) else start)
+    if end is None:
+        end = pd.Timestamp.now()
+    else:
+        end = pd.Timestamp(str(end) if isinstance(end, int) else end)
+        if end == end.normalize():
+            end = end + pd.Timedelta(days=1) - pd.Timedelta(minutes=1)
+    return start, end
+
+
+class MarketDataProvider:
+    """
+    数据源基类
+
+    子类实现各类数据接口，返回值与对应的 akshare 函数保持一致
+    (复权因子统一整理为 [日期, 复权因子] 两列)
+    """
+
+    def get_bars(
+        self,
+        symbol: str,
+        start_date=EARLIEST_DATE,
+        end_date=None,
+        adjust: str = 'qfq'
+    ) -> pd.DataFrame:
+        """
+        获取日线行情
+
+        参数:
+            symbol: 股票代码，如 '000001'
+            start_date: 开始日期
+            end_date: 结束日期，默认今天
+            adjust: 复权方式 'qfq' / 'hfq' / ''
+
+        返回:
+            与 ak.stock_zh_a_hist 列一致的 DataFrame
+        """
+        raise NotImplementedError
+
+    def get_minute_bars(
+        self,
+        symbol: str,
+        start=EARLIEST_DATE,
+        end=None,
+        period: str = '1',
+        adjust: str = ''
+    ) -> pd.DataFrame:
+        """
+        获取分钟线行情
+
+        参数:
+            symbol: 股票代码，如 '000001'
+            start: 开始时间 ('YYYY-MM-DD HH:MM:SS' 或日期)
+            end: 结束时间，只给日期时包含当天，默认现在
+            period: 分钟周期 '1' / '5' / '15' / '30' / '60'
+            adjust: 复权方式 '' / 'qfq' / 'hfq' (1 分钟线只有不复权)
+
+        返回:
+            与 ak.stock_zh_a_hist_min_em 列一致的 DataFrame ('时间' 列为分钟结束时刻)
+        """
+        raise NotImplementedError
+
+    def get_adjust_factors(self, symbol: str) -> pd.DataFrame:
+        """
+        获取后复权因子
+
+        参数:
+            symbol: 股票代码
+
+        返回:
+            DataFrame[日期, 复权因子]，按日期升序，每行表示自该日起生效的因子
+            (后复权价 = 不复权价 × 因子)
+        """
+        raise NotImplementedError
+
+    def get_trade_dates(self) -> pd.DataFrame:
+        """获取沪深交易日历 (ak.tool_trade_date_hist_sina，trade_date 列)"""
+        raise NotImplementedError
+
+    def get_spot(self) -> pd.DataFrame:
+        """获取全市场实时快照 (ak.stock_zh_a_spot_em)"""
+        raise NotImplementedError
+
+    def get_financial_abstract(self, symbol: str, indicator: str = '按报告期') -> pd.DataFrame:
+        """获取财务摘要 (ak.stock_financial_abstract_ths)"""
+        raise NotImplementedError
+
+    def get_announcements(self, symbol: str) -> pd.DataFrame:
+        """获取公司公告 (ak.stock_notice_report)"""
+        raise NotImplementedError
+
+
+class AkshareProvider(MarketDataProvider):
+    """直接调用 akshare 的数据源"""
+
+    def get_bars(self, symbol, start_date=EARLIEST_DATE, end_date=None, adjust='qfq'):
+        import akshare as ak
+
+        start, end = _date_range(start_date, end_date)
+        return ak.stock_zh_a_hist(
+            symbol=symbol,
+            period="daily",
+            start_date=start.strftime('%Y%m%d'),
+            end_date=end.strftime('%Y%m%d'),
+            adjust=adjust
+        )
+
+    def get_minute_bars(self, symbol, start=EARLIEST_DATE, end=None, period='1', adjust=''):
+        import akshare as ak
+
+        start, end = _time_range(start, end)
+        return ak.stock_zh_a_hist_min_em(
+            symbol=symbol,
+            start_date=start.strftime('%Y-%m-%d %H:%M:%S'),
+            end_date=end.strftime('%Y-%m-%d %H:%M:%S'),
+            period=period,
+            adjust=adjust
+        )
+
+    def get_adjust_factors(self, symbol):
+        import akshare as ak
+
+        df = ak.stock_zh_a_daily(symbol=exchange_prefix(symbol) + symbol, adjust='hfq-factor')
+        df = pd.DataFrame({
+            DATE_COL: pd.to_datetime(df['date']),
+            FACTOR_COL: pd.to_numeric(df['hfq_factor'], errors='coerce'),
+        })
+        return df.sort_values(DATE_COL).reset_index(drop=True)
+
+    def get_trade_dates(self):
+        import akshare as ak
+
+        return ak.tool_trade_date_hist_sina()
+
+    def get_spot(self):
+        import akshare as ak
+
+        return ak.stock_zh_a_spot_em()
+
+    def get_financial_abstract(self, symbol, indicator='按报告期'):
+        import akshare as ak
+
+        return ak.stock_financial_abstract_ths(symbol=symbol, indicator=indicator)
+
+    def get_announcements(self, symbol):
+        import akshare as ak
+
+        return ak.stock_notice_report(symbol=symbol)
+
+
+# ==================== 录制与回放 ====================
+
+def _bars_path(fixture_dir: str, symbol: str, adjust: str) -> str:
+    return os.path.join(fixture_dir, 'bars', adjust or 'none', f'{symbol}.parquet')
+
+
+def _minute_path(fixture_dir: str, symbol: str, period: str, adjust: str) -> str:
+    return os.path.join(fixture_dir, 'minute', f'{period}m', adjust or 'none', f'{symbol}.parquet')
+
+
+def _factors_path(fixture_dir: str, symbol: str) -> str:
+    return os.path.join(fixture_dir, 'factors', f'{symbol}.parquet')
+
+
+def _trade_dates_path(fixture_dir: str) -> str:
+    return os.path.join(fixture_dir, 'trade_dates.parquet')
+
+
+def _spot_path(fixture_dir: str) -> str:
+    return os.path.join(fixture_dir, 'spot.parquet')
+
+
+def _financial_path(fixture_dir: str, symbol: str, indicator: str) -> str:
+    return os.path.join(fixture_dir, 'financial', indicator, f'{symbol}.parquet')
+
+
+def _announcements_path(fixture_dir: str, symbol: str) -> str:
+    return os.path.join(fixture_dir, 'announcements', f'{symbol}.parquet')
+
+
+def _save_fixture(df: pd.DataFrame, path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + '.tmp'
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+
+class RecordingProvider(MarketDataProvider):
+    """
+    录制数据源
+
+    透传上游数据源的返回结果，并写入 fixture 目录，供 ReplayProvider 回放。
+    同一只股票多次录制的日线会按日期合并。
+    """
+
+    def __init__(self, upstream: MarketDataProvider, fixture_dir: str):
+        """
+        参数:
+            upstream: 真实数据源，如 AkshareProvider()
+            fixture_dir: fixture 输出目录
+        """
+        self.upstream = upstream
+        self.fixture_dir = fixture_dir
+
+    def get_bars(self, symbol, start_date=EARLIEST_DATE, end_date=None, adjust='qfq'):
+        df = self.upstream.get_bars(symbol, start_date, end_date, adjust)
+        if df is None or df.empty:
+            return df
+
+        recorded = df.copy()
+        recorded[DATE_COL] = pd.to_datetime(recorded[DATE_COL])
+        path = _bars_path(self.fixture_dir, symbol, adjust)
+        if os.path.exists(path):
+            recorded = pd.concat([pd.read_parquet(path), recorded], ignore_index=True)
+            recorded = recorded.drop_duplicates(subset=DATE_COL, keep='last')
+        _save_fixture(recorded.sort_values(DATE_COL).reset_index(drop=True), path)
+        return df
+
+    def get_minute_bars(self, symbol, start=EARLIEST_DATE, end=None, period='1', adjust=''):
+        df = self.upstream.get_minute_bars(symbol, start, end, period, adjust)
+        if df is None or df.empty:
+            return df
+
+        recorded = df.copy()
+        recorded[TIME_COL] = pd.to_datetime(recorded[TIME_COL])
+        path = _minute_path(self.fixture_dir, symbol, period, adjust)
+        if os.path.exists(path):
+            recorded = pd.concat([pd.read_parquet(path), recorded], ignore_index=True)
+            recorded = recorded.drop_duplicates(subset=TIME_COL, keep='last')
+        _save_fixture(recorded.sort_values(TIME_COL).reset_index(drop=True), path)
+        return df
+
+    def get_adjust_factors(self, symbol):
+        df = self.upstream.get_adjust_factors(symbol)
+        _save_fixture(df, _factors_path(self.fixture_dir, symbol))
+        return df
+
+    def get_trade_dates(self):
+        df = self.upstream.get_trade_dates()
+        _save_fixture(df, _trade_dates_path(self.fixture_dir))
+        return df
+
+    def get_spot(self):
+        df = self.upstream.get_spot()
+        _save_fixture(df, _spot_path(self.fixture_dir))
+        return df
+
+    def get_financial_abstract(self, symbol, indicator='按报告期'):
+        df = self.upstream.get_financial_abstract(symbol, indicator)
+        _save_fixture(df, _financial_path(self.fixture_dir, symbol, indicator))
+        return df
+
+    def get_announcements(self, symbol):
+        df = self.upstream.get_announcements(symbol)
+        _save_fixture(df, _announcements_path(self.fixture_dir, symbol))
+        return df
+
+
+class ReplayProvider(MarketDataProvider):
+    """
+    回放数据源
+
+    从 fixture 目录读取录制好的数据，首次访问后常驻内存，
+    之后的请求只做内存切片，不访问网络也不再读盘。
+    未录制的数据会抛出 KeyError。
+    """
+
+    def __init__(self, fixture_dir: str):
+        """
+        参数:
+            fixture_dir: RecordingProvider 录制的 fixture 目录
+        """
+        self.fixture_dir = fixture_dir
+        self._cache: Dict[str, pd.DataFrame] = {}
+
+    def _load(self, path: str) -> pd.DataFrame:
+        df = self._cache.get(path)
+        if df is None:
+            if not os.path.exists(path):
+                raise KeyError(f"fixture 不存在: {path}")
+            df = pd.read_parquet(path)
+            self._cache[path] = df
+        return df
+
+    def get_bars(self, symbol, start_date=EARLIEST_DATE, end_date=None, adjust='qfq'):
+        df = self._load(_bars_path(self.fixture_dir, symbol, adjust))
+        start, end = _date_range(start_date, end_date)
+        dates = df[DATE_COL].values
+        lo = dates.searchsorted(start.to_datetime64(), side='left')
+        hi = dates.searchsorted(end.to_datetime64(), side='right')
+        return df.iloc[lo:hi].reset_index(drop=True)
+
+    def get_minute_bars(self, symbol, start=EARLIEST_DATE, end=None, period='1', adjust=''):
+        df = self._load(_minute_path(self.fixture_dir, symbol, period, adjust))
+        start, end = _time_range(start, end)
+        times = df[TIME_COL].values
+        lo = times.searchsorted(start.to_datetime64(), side='left')
+        hi = times.searchsorted(end.to_datetime64(), side='right')
+        return df.iloc[lo:hi].reset_index(drop=True)
+
+    def get_adjust_factors(self, symbol):
+        return self._load(_factors_path(self.fixture_dir, symbol)).copy()
+
+    def get_trade_dates(self):
+        return self._load(_trade_dates_path(self.fixture_dir)).copy()
+
+    def get_spot(self):
+        return self._load(_spot_path(self.fixture_dir)).copy()
+
+    def get_financial_abstract(self, symbol, indicator='按报告期'):
+        return self._load(_financial_path(self.fixture_dir, symbol, indicator)).copy()
+
+    def get_announcements(self, symbol):
+        return self._load(_announcements_path(self.fixture_dir, symbol)).copy()
+
+
+# ==================== 全局默认数据源 ====================
+
+_default_provider: Optional[MarketDataProvider] = None
+
+
+def get_provider() -> MarketDataProvider:
+    """获取全局默认数据源，未设置时使用 akshare"""
+    global _default_provider
+    if _default_provider is None:
+        _default_provider = AkshareProvider()
+    return _default_provider
+
+
+def set_provider(provider: MarketDataProvider):
+    """
+    替换全局默认数据源
+
+    例如整体切换到离线回放:
+        set_provider(ReplayProvider('fixtures/2024-11'))
+    """
+    global _default_provider
+    _default_provider = provider
@@ -0,0 +1,267 @@
+"""
+resample.py - 多周期 K 线合成 (Bar Resampling)
+
+由日线面板 (或分钟线) 合成周线、月线、季线、年线以及 N 分钟线:
+
+    bars, dates = resample_panel({'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}, panel_dates, 'W')
+
+- 每根高周期 K 线是连续交易日的一个分段，分段归约用 ufunc.reduceat 一次完成全部股票:
+  开盘取分段内第一个有效值，收盘取最后一个有效值，最高/最低取极值 (忽略停牌 NaN)，
+  成交量/成交额求和；整段停牌的股票为 NaN
+- 高周期 K 线的日期为分段内最后一个交易日 (本周/本月未结束时即最新交易日)
+- BarResampler 在每日新增日线后增量更新: 只合并最后一根未完成的 K 线并追加新 K 线
+- 周线、月线是普通的 (股票数, K 线数) 数组，直接传给 panel_* 指标函数；
+  指标缓存按内容寻址，高周期指标与日线指标共用同一个缓存且互不冲突
+
+周期:
+    'W' 周 (周一至周日) / 'M' 月 / 'Q' 季 / 'Y' 年
+    '5min' / '15min' / '30min' / '60min' 等 N 分钟 (按交易时段计时，
+    上午 9:30-11:30、下午 13:00-15:00，分钟线时间戳为该分钟结束时刻)
+"""
+import re
+from typing import Dict, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .provider import DATE_COL, TIME_COL
+
+# 字段 -> 分段归约方式，未列出的字段取最后一个有效值
+AGGREGATIONS = {
+    'open': 'first',
+    'high': 'max',
+    'low': 'min',
+    'close': 'last',
+    'volume': 'sum',
+    'amount': 'sum',
+    '开盘': 'first',
+    '最高': 'max',
+    '最低': 'min',
+    '收盘': 'last',
+    '成交量': 'sum',
+    '成交额': 'sum',
+}
+
+_MINUTES = re.compile(r'^(\d+)\s*min$')
+
+# 交易时段 (自 0 点起的分钟数)
+_MORNING_OPEN, _MORNING_CLOSE = 9 * 60 + 30, 11 * 60 + 30
+_AFTERNOON_OPEN = 13 * 60
+
+
+# ==================== 分段 ====================
+
+def period_labels(dates, freq: str) -> np.ndarray:
+    """
+    每个时间点所属的周期编号
+
+    参数:
+        dates: 升序的日期或分钟时间戳
+        freq: 'W' / 'M' / 'Q' / 'Y' / 'Nmin'
+
+    返回:
+        int64 数组，同一周期内相同，周期递增时编号递增
+    """
+    dates = np.asarray(pd.to_datetime(np.asarray(dates)).values)
+    freq = freq.upper() if len(freq) == 1 else freq.lower()
+    if freq == 'W':
+        # 1970-01-01 为周四，加 3 后按 7 天整除即以周一为一周的开始
+        days = dates.astype('datetime64[D]').astype(np.int64)
+        return (days + 3) // 7
+    if freq in ('M', 'Q', 'Y'):
+        months = dates.astype('datetime64[M]').astype(np.int64)
+        return months // {'M': 1, 'Q': 3, 'Y': 12}[freq]
+    match = _MINUTES.match(freq)
+    if match is None:
+        raise ValueError(f"不支持的周期: {freq}")
+    size = int(match.group(1))
+    minutes = dates.astype('datetime64[m]').astype(np.int64)
+    days = minutes // 1440
+    clock = minutes % 1440
+    # 当日已交易的分钟数: 9:31 -> 1，11:30 -> 120，13:01 -> 121，15:00 -> 240
+    elapsed = np.where(clock <= _MORNING_CLOSE, clock - _MORNING_OPEN, clock - _AFTERNOON_OPEN + 120)
+    elapsed = np.maximum(elapsed, 1)  # 集合竞价归入第一根
+    return days * 1440 + (elapsed - 1) // size
+
+
+def segment_starts(labels: np.ndarray) -> np.ndarray:
+    """相同编号的连续分段的起始位置"""
+    labels = np.asarray(labels)
+    if len(labels) == 0:
+        return np.array([], dtype=np.int64)
+    return np.flatnonzero(np.r_[True, labels[1:] != labels[:-1]])
+
+
+def segment_reduce(values: np.ndarray, starts: np.ndarray, how: str) -> np.ndarray:
+    """
+    沿最后一维按分段归约，忽略 NaN，整段为 NaN 时结果为 NaN
+
+    参数:
+        values: (股票数, 时间点数) 数组
+        starts: 分段起始位置 (升序，第一个为 0)
+        how: 'first' / 'last' / 'max' / 'min' / 'sum'
+
+    返回:
+        (股票数, 分段数) 数组
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n, t = values.shape
+    if len(starts) == 0:
+        return np.empty((n, 0))
+    valid = ~np.isnan(values)
+    if how in ('first', 'last'):
+        positions = np.arange(t)
+        if how == 'first':
+            pos = np.minimum.reduceat(np.where(valid, positions, t), starts, axis=1)
+            missing = pos == t
+        else:
+            pos = np.maximum.reduceat(np.where(valid, positions, -1), starts, axis=1)
+            missing = pos < 0
+        out = np.take_along_axis(values, np.clip(pos, 0, t - 1), axis=1)
+        out[missing] = np.nan
+        return out
+    if how == 'max':
+        return np.fmax.reduceat(values, starts, axis=1)
+    if how == 'min':
+        return np.fmin.reduceat(values, starts, axis=1)
+    if how == 'sum':
+        out = np.add.reduceat(np.where(valid, values, 0.0), starts, axis=1)
+        out[np.add.reduceat(valid, starts, axis=1) == 0] = np.nan
+        return out
+    raise ValueError(f"未知的归约方式: {how}")
+
+
+def _combine(old: np.ndarray, new: np.ndarray, how: str) -> np.ndarray:
+    """同一周期的两部分 (已有的 K 线 + 新增部分) 合并"""
+    if how == 'first':
+        return np.where(np.isnan(old), new, old)
+    if how == 'last':
+        return np.where(np.isnan(new), old, new)
+    if how == 'max':
+        return np.fmax(old, new)
+    if how == 'min':
+        return np.fmin(old, new)
+    total = np.where(np.isnan(old), 0.0, old) + np.where(np.isnan(new), 0.0, new)
+    return np.where(np.isnan(old) & np.isnan(new), np.nan, total)
+
+
+# ==================== 面板 ====================
+
+def resample_panel(
+    fields: Mapping[str, np.ndarray],
+    dates,
+    freq: str,
+    how: Optional[Mapping[str, str]] = None
+) -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """
+    日线面板合成高周期 K 线
+
+    参数:
+        fields: {字段: (股票数, 交易日数) 数组}，一维数组视为单只股票
+        dates: 交易日 (升序)，长度与数组的时间维一致
+        freq: 周期，见模块说明
+        how: 覆盖默认的归约方式，如 {'turnover_rate': 'sum'}
+
+    返回:
+        ({字段: (股票数, K 线数) 数组}, 每根 K 线的日期 (分段内最后一个时间点))
+    """
+    rules = {**AGGREGATIONS, **(how or {})}
+    dates = np.asarray(pd.to_datetime(np.asarray(dates)).values)
+    starts = segment_starts(period_labels(dates, freq))
+    ends = np.r_[starts[1:], len(dates)] - 1 if len(starts) else starts
+    bars = {}
+    for name, values in fields.items():
+        values = np.asarray(values, dtype=np.float64)
+        reduced = segment_reduce(values[np.newaxis, :] if values.ndim == 1 else values, starts, rules.get(name, 'last'))
+        bars[name] = reduced[0] if values.ndim == 1 else reduced
+    return bars, dates[ends]
+
+
+def resample_bars(df: pd.DataFrame, freq: str, how: Optional[Mapping[str, str]] = None) -> pd.DataFrame:
+    """
+    单只股票的日线 DataFrame 合成高周期 K 线
+
+    参数:
+        df: 日线 (中文列名 '日期' 或规范列名 'date')，或分钟线 ('时间')
+        freq: 周期，见模块说明
+        how: 覆盖默认的归约方式
+
+    返回:
+        同样列名的 DataFrame，只保留开高低收、成交量、成交额 (以及 how 中指定的列)
+    """
+    date_col = next((column for column in (DATE_COL, TIME_COL) if column in df.columns), 'date')
+    rules = {**AGGREGATIONS, **(how or {})}
+    columns = [column for column in df.columns if column in rules and column != date_col]
+    fields = {column: pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=np.float64) for column in columns}
+    bars, dates = resample_panel(fields, df[date_col].to_numpy(), freq, how)
+    result = pd.DataFrame({date_col: pd.to_datetime(dates)})
+    for column in columns:
+        result[column] = bars[column]
+    return result
+
+
+class BarResampler:
+    """
+    增量合成高周期 K 线
+
+    用法:
+        weekly = BarResampler('W')
+        weekly.update(panel_fields, panel_dates)     # 首次: 全部历史
+        weekly.update(today_fields, [today])         # 每日: 只合并/追加最后一根
+        panel_macd(weekly.bars['close'])
+
+    属性:
+        bars: {字段: (股票数, K 线数) 数组}
+        dates: 每根 K 线的日期 (分段内最后一个时间点)
+        labels: 每根 K 线的周期编号
+    """
+
+    def __init__(self, freq: str, how: Optional[Mapping[str, str]] = None):
+        self.freq = freq
+        self.rules = {**AGGREGATIONS, **(how or {})}
+        self.bars: Dict[str, np.ndarray] = {}
+        self.dates = np.array([], dtype='datetime64[ns]')
+        self.labels = np.array([], dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def update(self, fields: Mapping[str, np.ndarray], dates) -> int:
+        """
+        追加新的日线
+
+        参数:
+            fields: {字段: (股票数, 新增交易日数) 数组}，股票顺序与之前一致
+            dates: 新增交易日 (升序，晚于已处理的最后一天)
+
+        返回:
+            第一根发生变化的 K 线下标 (此后的 K 线需要重新计算指标)
+        """
+        dates = np.asarray(pd.to_datetime(np.asarray(dates)).values)
+        if len(dates) == 0:
+            return len(self.dates)
+        if len(self.dates) and dates[0] <= self.dates[-1]:
+            raise ValueError(f"新增日期 {dates[0]} 不晚于已处理的 {self.dates[-1]}")
+
+        new_bars, new_dates = resample_panel(fields, dates, self.freq, self.rules)
+        new_labels = period_labels(new_dates, self.freq)
+        if not self.bars:
+            self.bars, self.dates, self.labels = new_bars, new_dates, new_labels
+            return 0
+        if set(new_bars) != set(self.bars):
+            raise ValueError(f"字段不一致: {sorted(new_bars)} != {sorted(self.bars)}")
+
+        changed = len(self.dates)
+        if new_labels[0] == self.labels[-1]:
+            # 新数据的第一段属于最后一根未完成的 K 线
+            changed -= 1
+            for name, values in self.bars.items():
+                values[..., -1] = _combine(values[..., -1], new_bars[name][..., 0], self.rules.get(name, 'last'))
+                new_bars[name] = new_bars[name][..., 1:]
+            self.dates[-1] = new_dates[0]
+            new_dates, new_labels = new_dates[1:], new_labels[1:]
+        for name in self.bars:
+            self.bars[name] = np.concatenate([self.bars[name], new_bars[name]], axis=-1)
+        self.dates = np.concatenate([self.dates, new_dates])
+        self.labels = np.concatenate([self.labels, new_labels])
+        return changed
@@ -0,0 +1,143 @@
+"""
+schema.py - 规范日线格式 (Canonical Bar Schema)
+
+数据源返回的日线列名为中文、数值多为 float64/object。
+normalize_bars 只做一次转换，得到统一的英文列名和紧凑类型:
+
+    date           int32   日序号 (自 1970-01-01 起的天数)，也可选 datetime64
+    symbol         category 股票代码
+    open/high/low/close    float32
+    volume         int64   成交量 (手)
+    amount         float64 成交额 (元)
+    amplitude / pct_change / change / turnover_rate    float32
+
+indicators / strategy 直接使用 close、high 等列名，不需要再次重命名；
+bar_arrays 返回各列的 numpy 视图，下游计算不复制数据。
+"""
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from .trading_calendar import from_ordinal, to_ordinal
+
+# 数据源列名 -> 规范列名
+BAR_COLUMNS = {
+    '日期': 'date',
+    '股票代码': 'symbol',
+    '开盘': 'open',
+    '收盘': 'close',
+    '最高': 'high',
+    '最低': 'low',
+    '成交量': 'volume',
+    '成交额': 'amount',
+    '振幅': 'amplitude',
+    '涨跌幅': 'pct_change',
+    '涨跌额': 'change',
+    '换手率': 'turnover_rate',
+}
+
+# 规范列名 -> 数值类型 (date / symbol 单独处理)
+BAR_DTYPES = {
+    'open': np.float32,
+    'close': np.float32,
+    'high': np.float32,
+    'low': np.float32,
+    'volume': np.int64,
+    'amount': np.float64,
+    'amplitude': np.float32,
+    'pct_change': np.float32,
+    'change': np.float32,
+    'turnover_rate': np.float32,
+}
+
+PRICE_FIELDS = ('open', 'high', 'low', 'close')
+
+
+def _convert(values: pd.Series, dtype) -> pd.Series:
+    if values.dtype == dtype:
+        return values
+    numeric = pd.to_numeric(values, errors='coerce')
+    if np.issubdtype(dtype, np.integer):
+        numeric = numeric.fillna(0)
+    return numeric.astype(dtype)
+
+
+def normalize_bars(
+    df: pd.DataFrame,
+    symbol: Optional[str] = None,
+    date_format: str = 'ordinal'
+) -> pd.DataFrame:
+    """
+    把数据源日线转换为规范格式 (已是规范格式的列不会再复制)
+
+    参数:
+        df: ak.stock_zh_a_hist 格式或已规范化的日线
+        symbol: 股票代码，数据中没有股票代码列时补充为分类列
+        date_format: 'ordinal' 输出 int32 日序号 / 'datetime' 输出 datetime64
+
+    返回:
+        规范列名、紧凑类型的 DataFrame，未知列原样保留
+    """
+    columns = {}
+    for name in df.columns:
+        canonical = BAR_COLUMNS.get(name, name)
+        values = df[name]
+        if canonical == 'date':
+            if date_format == 'ordinal':
+                values = values if values.dtype == np.int32 else pd.Series(
+                    to_ordinal(values.to_numpy()).astype(np.int32), index=df.index)
+            elif values.dtype.kind in 'iu':
+                values = pd.Series(from_ordinal(values.to_numpy()), index=df.index)
+            else:
+                values = pd.to_datetime(values)
+        elif canonical == 'symbol':
+            values = values if isinstance(values.dtype, pd.CategoricalDtype) else values.astype(str).astype('category')
+        elif canonical in BAR_DTYPES:
+            values = _convert(values, BAR_DTYPES[canonical])
+        columns[canonical] = values
+
+    if symbol is not None and 'symbol' not in columns:
+        columns['symbol'] = pd.Series(pd.Categorical.from_codes(
+            np.zeros(len(df), dtype=np.int8), categories=[str(symbol)]), index=df.index)
+
+    return pd.DataFrame(columns, index=df.index, copy=False)
+
+
+def to_source_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """把规范列名改回数据源的中文列名 (只改列名，不复制数据)"""
+    reverse = {canonical: name for name, canonical in BAR_COLUMNS.items()}
+    return df.rename(columns=reverse)
+
+
+def bar_arrays(df: pd.DataFrame, fields: Iterable[str] = PRICE_FIELDS + ('volume',)) -> Dict[str, np.ndarray]:
+    """
+    取规范日线各列的 numpy 数组
+
+    参数:
+        df: normalize_bars 的结果
+        fields: 需要的列
+
+    返回:
+        {列名: ndarray}，数组为 DataFrame 内部数据的只读视图
+    """
+    return {field: df[field].to_numpy(copy=False) for field in fields if field in df.columns}
+
+
+def concat_bars(frames: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    """
+    合并多只股票的规范日线，股票代码保持为分类列
+
+    参数:
+        frames: normalize_bars 的结果列表 (需包含 symbol 列)
+
+    返回:
+        合并后的 DataFrame
+    """
+    frames = [df for df in frames if df is not None and not df.empty]
+    if not frames:
+        return pd.DataFrame(columns=list(BAR_COLUMNS.values()))
+    symbols = pd.api.types.union_categoricals([df['symbol'] for df in frames])
+    merged = pd.concat([df.drop(columns='symbol') for df in frames], ignore_index=True)
+    merged.insert(0, 'symbol', symbols)
+    return merged
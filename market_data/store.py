@@ -0,0 +1,534 @@
+"""
+store.py - 本地列式日线存储 (Bar Store)
+
+每只股票一个目录，按年份分区保存为 parquet 列式文件:
+
+    {root}/{adjust}/{symbol}/{year}.parquet
+    {root}/{adjust}/{symbol}/meta.json      # 已覆盖的日期区间与水位线
+
+读取时只加载与请求区间相交的年份文件；只有本地尚未覆盖的
+日期区间才会请求网络，返回的数据列与 ak.stock_zh_a_hist 保持一致。
+每只股票 (按复权方式) 记录最后一根已收盘 K 线的日期作为水位线，
+日常更新只请求水位线之后的尾部数据。
+
+前复权 / 后复权数据由不复权日线乘以复权因子在读取时计算:
+
+    {root}/none/{symbol}/{year}.parquet     # 不复权日线，除权除息后也不会变化
+    {root}/factors/{symbol}.parquet         # 后复权因子 [日期, 复权因子]
+
+除权除息只会新增一条因子记录，本地日线永远有效，不再需要重新拉取全部历史；
+拉取日线时从 收盘 - 涨跌额 (除权参考价) 识别除权除息日，只有出现时才刷新因子。
+数据源不提供复权因子时，退回按复权方式分别缓存。
+"""
+import json
+import os
+import shutil
+from datetime import datetime, time
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .provider import DATE_COL, EARLIEST_DATE, FACTOR_COL, MarketDataProvider, get_provider, to_timestamp
+from .schema import normalize_bars
+from .trading_calendar import TradingCalendar, get_calendar, load_calendar
+
+DEFAULT_ROOT = os.path.join('data', 'store', 'bars')
+
+# 收盘数据发布时间，此前拉到的当日 K 线视为盘中数据
+SETTLE_TIME = time(15, 30)
+
+# 复权时需要乘以因子的价格列 (涨跌额跨两天，由复权后的收盘价重新计算)
+PRICE_COLS = ['开盘', '收盘', '最高', '最低']
+
+CHANGE_COL = '涨跌额'
+
+
+def settled_date(now: Optional[datetime] = None) -> pd.Timestamp:
+    """返回最近一个已收盘的自然日 (收盘数据发布前为昨天)"""
+    now = now or datetime.now()
+    today = pd.Timestamp(now.date())
+    return today if now.time() >= SETTLE_TIME else today - pd.Timedelta(days=1)
+
+
+def apply_adjustment(raw: pd.DataFrame, factors: pd.DataFrame, adjust: str) -> pd.DataFrame:
+    """
+    用后复权因子计算复权价格
+
+    后复权价 = 不复权价 × 当日因子
+    前复权价 = 不复权价 × 当日因子 / 最新因子
+
+    参数:
+        raw: 不复权日线
+        factors: DataFrame[日期, 复权因子]，按日期升序
+        adjust: 'qfq' / 'hfq'
+
+    返回:
+        复权后的日线 (成交量、成交额、涨跌幅等比例列不变)
+    """
+    if raw.empty or factors is None or factors.empty or adjust not in ('qfq', 'hfq'):
+        return raw
+
+    values = factors[FACTOR_COL].to_numpy(dtype=float)
+    pos = factors[DATE_COL].values.searchsorted(raw[DATE_COL].values, side='right') - 1
+    # 早于第一条因子的日期按第一条因子处理
+    scale = values[np.maximum(pos, 0)]
+    if adjust == 'qfq':
+        scale = scale / values[-1]
+
+    cols = [col for col in PRICE_COLS if col in raw.columns]
+    adjusted = raw.copy()
+    adjusted[cols] = raw[cols].to_numpy(dtype=float) * scale[:, None]
+    if CHANGE_COL in raw.columns and '收盘' in raw.columns:
+        # 除权除息日前后两天的因子不同，涨跌额 = 复权后的今收 - 复权后的昨收；
+        # 区间第一天的昨收不在 raw 中，仍按当日因子缩放
+        change = raw[CHANGE_COL].to_numpy(dtype=float) * scale
+        change[1:] = np.diff(adjusted['收盘'].to_numpy(dtype=float))
+        adjusted[CHANGE_COL] = change
+    return adjusted
+
+
+def corporate_action_dates(raw: pd.DataFrame) -> pd.Series:
+    """
+    从不复权日线中找出除权除息日
+
+    除权除息日的涨跌额相对交易所的除权参考价计算，收盘 - 涨跌额 与前一根 K 线的收盘价不一致
+
+    参数:
+        raw: 按日期升序的不复权日线，需要 收盘 / 涨跌额 列
+
+    返回:
+        除权除息日的日期 (第一根 K 线无法判断，不包含在内)
+    """
+    if raw is None or len(raw) < 2 or CHANGE_COL not in raw.columns:
+        return pd.Series([], dtype='datetime64[ns]')
+    close = raw['收盘'].to_numpy(dtype=float)
+    reference = close[1:] - raw[CHANGE_COL].to_numpy(dtype=float)[1:]
+    # 价格精确到分，涨跌额的舍入误差不超过 0.01
+    changed = ~np.isclose(reference, close[:-1], rtol=1e-4, atol=0.011) & ~np.isnan(reference)
+    return pd.to_datetime(raw[DATE_COL]).iloc[1:][changed]
+
+
+class BarStore:
+    """
+    本地日线存储
+
+    功能:
+    - 按 (复权方式, 股票, 年份) 分区的 parquet 存储
+    - 区间读取只访问相关年份文件
+    - 缺失区间自动回源并合并入库
+    """
+
+    def __init__(
+        self,
+        root: str = DEFAULT_ROOT,
+        provider: Optional[MarketDataProvider] = None,
+        calendar: Optional[TradingCalendar] = None
+    ):
+        """
+        初始化存储
+
+        参数:
+            root: 存储根目录
+            provider: 回源使用的数据源，默认使用全局数据源 (akshare)
+            calendar: 交易日历，默认使用数据源的日历
+        """
+        self.root = root
+        self._provider = provider
+        self._calendar = calendar
+        self.stats = {'disk_reads': 0, 'network_requests': 0}
+        # 数据源不支持复权因子时置为 False，复权数据按复权方式分别缓存
+        self.local_adjust = True
+        self._factors = {}
+
+    @property
+    def provider(self) -> MarketDataProvider:
+        return self._provider or get_provider()
+
+    @property
+    def calendar(self) -> TradingCalendar:
+        if self._calendar is None:
+            self._calendar = get_calendar() if self._provider is None else load_calendar(self._provider, path=None)
+        return self._calendar
+
+    # ==================== 路径与元数据 ====================
+
+    def _symbol_dir(self, symbol: str, adjust: str) -> str:
+        return os.path.join(self.root, adjust or 'none', symbol)
+
+    def _year_path(self, symbol: str, adjust: str, year: int) -> str:
+        return os.path.join(self._symbol_dir(symbol, adjust), f'{year}.parquet')
+
+    def _meta_path(self, symbol: str, adjust: str) -> str:
+        return os.path.join(self._symbol_dir(symbol, adjust), 'meta.json')
+
+    def load_meta(self, symbol: str, adjust: str = 'qfq') -> Optional[dict]:
+        """读取已覆盖的日期区间，不存在时返回 None"""
+        path = self._meta_path(symbol, adjust)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_meta(self, symbol: str, adjust: str, meta: dict):
+        path = self._meta_path(symbol, adjust)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def coverage(self, symbol: str, adjust: str = 'qfq') -> Optional[Tuple[pd.Timestamp, pd.Timestamp]]:
+        """返回本地已覆盖的 (起始日, 结束日)，没有数据时返回 None"""
+        meta = self.load_meta(symbol, adjust)
+        if meta is None:
+            return None
+        return pd.Timestamp(meta['start']), pd.Timestamp(meta['end'])
+
+    # ==================== 读写 ====================
+
+    def read(
+        self,
+        symbol: str,
+        start,
+        end,
+        adjust: str = 'qfq'
+    ) -> pd.DataFrame:
+        """
+        从本地读取区间数据 (不访问网络)
+
+        参数:
+            symbol: 股票代码
+            start: 开始日期
+            end: 结束日期
+            adjust: 复权方式 'qfq' / 'hfq' / ''
+
+        返回:
+            按日期升序排列的 DataFrame
+        """
+        start, end = to_timestamp(start), to_timestamp(end)
+        frames = []
+        for year in range(start.year, end.year + 1):
+            path = self._year_path(symbol, adjust, year)
+            if os.path.exists(path):
+                frames.append(pd.read_parquet(path))
+                self.stats['disk_reads'] += 1
+
+        if not frames:
+            return pd.DataFrame()
+
+        df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        mask = (df[DATE_COL] >= start) & (df[DATE_COL] <= end)
+        return df.loc[mask].reset_index(drop=True)
+
+    def write(self, symbol: str, df: pd.DataFrame, adjust: str = 'qfq'):
+        """
+        将数据按年份合并写入本地 (同日期以新数据为准)
+
+        参数:
+            symbol: 股票代码
+            df: ak.stock_zh_a_hist 格式的日线数据
+            adjust: 复权方式
+        """
+        if df is None or df.empty:
+            return
+
+        df = df.copy()
+        df[DATE_COL] = pd.to_datetime(df[DATE_COL])
+        os.makedirs(self._symbol_dir(symbol, adjust), exist_ok=True)
+
+        for year, part in df.groupby(df[DATE_COL].dt.year):
+            path = self._year_path(symbol, adjust, year)
+            if os.path.exists(path):
+                part = pd.concat([pd.read_parquet(path), part], ignore_index=True)
+                part = part.drop_duplicates(subset=DATE_COL, keep='last')
+            part = part.sort_values(DATE_COL).reset_index(drop=True)
+
+            tmp_path = path + '.tmp'
+            part.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+
+    # ==================== 复权因子 ====================
+
+    def _factor_path(self, symbol: str) -> str:
+        return os.path.join(self.root, 'factors', f'{symbol}.parquet')
+
+    def _factor_meta_path(self, symbol: str) -> str:
+        return os.path.join(self.root, 'factors', f'{symbol}.json')
+
+    def _factor_checked(self, symbol: str) -> Optional[pd.Timestamp]:
+        """本地因子已确认有效的截止日期，没有本地因子时返回 None"""
+        if symbol in self._factors:
+            return self._factors[symbol][1]
+        if not os.path.exists(self._factor_meta_path(symbol)):
+            return None
+        with open(self._factor_meta_path(symbol), 'r', encoding='utf-8') as f:
+            checked = pd.Timestamp(json.load(f)['checked'])
+        self._factors[symbol] = (pd.read_parquet(self._factor_path(symbol)), checked)
+        self.stats['disk_reads'] += 1
+        return checked
+
+    def _set_factor_checked(self, symbol: str, checked: pd.Timestamp):
+        with open(self._factor_meta_path(symbol), 'w', encoding='utf-8') as f:
+            json.dump({'checked': checked.strftime('%Y-%m-%d')}, f)
+        if symbol in self._factors:
+            self._factors[symbol] = (self._factors[symbol][0], checked)
+
+    def factors(self, symbol: str, end=None, refresh: bool = False) -> pd.DataFrame:
+        """
+        获取后复权因子
+
+        本地因子记录了确认有效的截止日期 (checked)。每次拉取不复权日线时都会检查新 K 线中
+        是否出现除权除息 (见 corporate_action_dates)，没有时直接推进 checked，
+        所以日常更新不会请求因子，只有出现除权除息或 end 超出 checked 时才回源
+
+        参数:
+            symbol: 股票代码
+            end: 需要覆盖到的日期，默认今天
+            refresh: 强制回源刷新
+
+        返回:
+            DataFrame[日期, 复权因子]
+        """
+        today = pd.Timestamp(datetime.now().date())
+        end = min(to_timestamp(end), today) if end is not None else today
+        # 当天未收盘的 K 线在拉取时同样会检查除权除息
+        end = min(end, settled_date())
+
+        checked = self._factor_checked(symbol)
+        # checked 之后只有周末或节假日时仍然有效: 这些日期没有新 K 线，也不会经过 _update 推进 checked
+        if checked is not None and not refresh and (
+            end <= checked or self.calendar.count(checked + pd.Timedelta(days=1), end) == 0
+        ):
+            return self._factors[symbol][0]
+
+        self.stats['network_requests'] += 1
+        df = self.provider.get_adjust_factors(symbol)
+        df = pd.DataFrame({
+            DATE_COL: pd.to_datetime(df[DATE_COL]),
+            FACTOR_COL: df[FACTOR_COL].astype(float),
+        }).sort_values(DATE_COL).reset_index(drop=True)
+
+        os.makedirs(os.path.dirname(self._factor_path(symbol)), exist_ok=True)
+        tmp_path = self._factor_path(symbol) + '.tmp'
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, self._factor_path(symbol))
+        self._factors[symbol] = (df, today)
+        self._set_factor_checked(symbol, today)
+        return df
+
+    def _verify_factors(self, symbol: str, fetched: List[pd.DataFrame], verified_end: pd.Timestamp):
+        """
+        用新拉取的不复权日线校验本地因子: checked 之后出现除权除息时回源刷新，
+        否则把 checked 推进到 verified_end
+        """
+        checked = self._factor_checked(symbol)
+        if checked is None:
+            return
+        frames = [df for df in fetched if df is not None and not df.empty]
+        if any(CHANGE_COL not in df.columns for df in frames):
+            return   # 数据源没有涨跌额，无法判断，读取时按 checked 刷新
+        actions = [date for df in frames for date in corporate_action_dates(df)]
+        if any(date > checked for date in actions):
+            print(f"股票 {symbol} 出现除权除息，刷新复权因子")
+            self.factors(symbol, refresh=True)
+        elif verified_end > checked:
+            self._set_factor_checked(symbol, verified_end)
+
+    def _storage_adjust(self, adjust: str) -> str:
+        """本地实际缓存的复权方式 (使用复权因子时只缓存不复权数据)"""
+        return '' if self.local_adjust and adjust in ('qfq', 'hfq') else adjust
+
+    def _local_factors(self, symbol: str, end, adjust: str) -> Optional[pd.DataFrame]:
+        """需要本地复权时返回复权因子，否则返回 None"""
+        if self._storage_adjust(adjust) == adjust:
+            return None
+        try:
+            return self.factors(symbol, end)
+        except NotImplementedError:
+            print("数据源不提供复权因子，按复权方式分别缓存日线")
+            self.local_adjust = False
+            return None
+
+    # ==================== 增量回源 ====================
+
+    def watermark(self, symbol: str, adjust: str = 'qfq') -> Optional[pd.Timestamp]:
+        """返回本地最后一根已收盘 K 线的日期 (水位线)，没有数据时返回 None"""
+        meta = self.load_meta(symbol, adjust)
+        if meta is None or not meta.get('last_bar'):
+            return None
+        return pd.Timestamp(meta['last_bar'])
+
+    def clear(self, symbol: str, adjust: str = 'qfq'):
+        """删除某只股票的本地数据"""
+        shutil.rmtree(self._symbol_dir(symbol, adjust), ignore_errors=True)
+
+    def _fetch(self, symbol: str, start: pd.Timestamp, end: pd.Timestamp, adjust: str) -> pd.DataFrame:
+        self.stats['network_requests'] += 1
+        df = self.provider.get_bars(symbol, start, end, adjust)
+        if df is not None and not df.empty:
+            df = df.copy()
+            df[DATE_COL] = pd.to_datetime(df[DATE_COL])
+        return df
+
+    def _is_consistent(self, symbol: str, fetched: pd.DataFrame, last_bar: pd.Timestamp, adjust: str) -> bool:
+        """比较回源数据与本地在水位线当天的收盘价，不一致说明复权历史已变化"""
+        if fetched is None or fetched.empty:
+            return True
+        overlap = fetched.loc[fetched[DATE_COL] == last_bar, '收盘']
+        stored = self.read(symbol, last_bar, last_bar, adjust)
+        if overlap.empty or stored.empty:
+            return True
+        return bool(np.isclose(float(overlap.iloc[0]), float(stored['收盘'].iloc[0]), rtol=1e-6))
+
+    def _update(self, symbol: str, start: pd.Timestamp, end: pd.Timestamp, adjust: str):
+        """
+        回源补齐 [start, end] 内本地缺失的部分，并推进水位线
+
+        尾部只请求 [水位线, end]，水位线当天的 K 线用于校验复权是否变化:
+        前复权数据在除权除息后会整体改变，校验不一致时清空本地数据重新拉取。
+        """
+        meta = self.load_meta(symbol, adjust)
+        settled = settled_date()
+        fetched = []
+
+        if meta is None:
+            cov_start, cov_end, last_bar = start, None, None
+            fetched.append(self._fetch(symbol, start, end, adjust))
+        else:
+            cov_start, cov_end = pd.Timestamp(meta['start']), pd.Timestamp(meta['end'])
+            last_bar = pd.Timestamp(meta['last_bar']) if meta.get('last_bar') else None
+
+            if start < cov_start:
+                fetched.append(self._fetch(symbol, start, cov_start - pd.Timedelta(days=1), adjust))
+                cov_start = start
+
+            if end > cov_end:
+                tail_start = last_bar if last_bar is not None else cov_end + pd.Timedelta(days=1)
+                tail = self._fetch(symbol, tail_start, end, adjust)
+                if last_bar is not None and not self._is_consistent(symbol, tail, last_bar, adjust):
+                    print(f"股票 {symbol} 复权数据已变化，重新拉取全部历史")
+                    self.clear(symbol, adjust)
+                    fetched = [self._fetch(symbol, cov_start, end, adjust)]
+                    last_bar = None
+                else:
+                    fetched.append(tail)
+
+        for df in fetched:
+            self.write(symbol, df, adjust)
+            if df is not None and not df.empty:
+                # 盘中返回的当日 K 线尚未收盘，不计入水位线
+                closed = df.loc[df[DATE_COL] <= settled, DATE_COL]
+                if not closed.empty:
+                    last_bar = closed.max() if last_bar is None else max(last_bar, closed.max())
+
+        checked_end = min(end, settled)
+        if adjust == '' and self.local_adjust:
+            self._verify_factors(symbol, fetched, checked_end)
+        cov_end = checked_end if cov_end is None else max(cov_end, checked_end)
+        self._save_meta(symbol, adjust, {
+            'start': cov_start.strftime('%Y-%m-%d'),
+            'end': cov_end.strftime('%Y-%m-%d'),
+            'last_bar': last_bar.strftime('%Y-%m-%d') if last_bar is not None else None,
+        })
+
+    # ==================== 对外接口 ====================
+
+    def get_bars(
+        self,
+        symbol: str,
+        start_date=EARLIEST_DATE,
+        end_date=None,
+        adjust: str = 'qfq',
+        canonical: bool = False
+    ) -> pd.DataFrame:
+        """
+        获取日线数据，优先读取本地，缺失部分回源后入库
+
+        参数:
+            symbol: 股票代码，如 '000001'
+            start_date: 开始日期，默认全历史
+            end_date: 结束日期，默认今天
+            adjust: 复权方式 'qfq' / 'hfq' / ''
+            canonical: 是否返回规范格式 (英文列名、紧凑类型，见 schema.py)
+
+        返回:
+            与 ak.stock_zh_a_hist 列一致的 DataFrame，canonical=True 时为规范格式
+        """
+        today = pd.Timestamp(datetime.now().date())
+        start = to_timestamp(start_date)
+        end = min(to_timestamp(end_date), today) if end_date is not None else today
+
+        if self._storage_adjust(adjust) != adjust and self._factor_checked(symbol) is None:
+            # 首次本地复权: 先取因子，确认数据源是否提供
+            self._local_factors(symbol, end, adjust)
+        # 先补齐日线 (同时校验复权因子)，再取因子
+        stored_adjust = self._storage_adjust(adjust)
+        self._ensure_covered(symbol, start, end, stored_adjust)
+        factors = self._local_factors(symbol, end, adjust)
+
+        df = self.read(symbol, start, end, stored_adjust)
+        if factors is not None:
+            df = apply_adjustment(df, factors, adjust)
+        return normalize_bars(df, symbol=symbol) if canonical else df
+
+    def _ensure_covered(self, symbol: str, start: pd.Timestamp, end: pd.Timestamp, stored_adjust: str):
+        covered = self.coverage(symbol, stored_adjust)
+        # 已覆盖区间之后只有周末或节假日时不需要回源
+        if covered is None or start < covered[0] or (
+            end > covered[1] and self.calendar.count(covered[1] + pd.Timedelta(days=1), end) > 0
+        ):
+            self._update(symbol, start, end, stored_adjust)
+
+    def refresh(self, symbol: str, adjust: str = 'qfq') -> bool:
+        """
+        将已入库股票的数据增量更新到今天 (只请求水位线之后的尾部，出现除权除息时刷新复权因子)
+
+        参数:
+            symbol: 股票代码
+            adjust: 复权方式
+
+        返回:
+            是否发生了回源请求
+        """
+        today = pd.Timestamp(datetime.now().date())
+        stored_adjust = self._storage_adjust(adjust)
+        covered = self.coverage(symbol, stored_adjust)
+        if covered is None or covered[1] >= today:
+            return False
+        self._update(symbol, covered[0], today, stored_adjust)
+        self._local_factors(symbol, today, adjust)
+        return True
+
+    def refresh_all(self, symbols: List[str], adjust: str = 'qfq') -> dict:
+        """
+        批量增量更新 (每日收盘后运行)
+
+        参数:
+            symbols: 股票代码列表
+            adjust: 复权方式
+
+        返回:
+            {'updated': 回源股票数, 'skipped': 已是最新的股票数, 'failed': 失败股票列表}
+        """
+        result = {'updated': 0, 'skipped': 0, 'failed': []}
+        for symbol in symbols:
+            try:
+                if self.refresh(symbol, adjust):
+                    result['updated'] += 1
+                else:
+                    result['skipped'] += 1
+            except Exception as e:
+                print(f"更新股票 {symbol} 数据失败: {str(e)}")
+                result['failed'].append(symbol)
+        return result
+
+
+_default_store: Optional[BarStore] = None
+
+
+def get_bar_store() -> BarStore:
+    """获取全局共享的默认存储实例"""
+    global _default_store
+    if _default_store is None:
+        _default_store = BarStore()
+    return _default_store
@@ -0,0 +1,213 @@
+"""
+trading_calendar.py - 沪深交易日历 (Trading Calendar)
+
+交易日以 int32 日序号 (自 1970-01-01 起的天数) 升序保存，
+另外按自然日预先展开两张稠密表:
+- 是否交易日
+- 截至当天 (含) 的累计交易日数
+
+is_trading_day / next / prev / offset 都是 O(1) 的数组下标访问，
+区间查询与批量判断直接在数组上向量化完成。
+
+日历来自数据源 (ak.tool_trade_date_hist_sina)，缓存于 data/store/calendar.npy；
+数据源不提供交易日历时按周一至周五处理 (不含节假日)。
+"""
+import os
+from datetime import datetime
+from typing import Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from .provider import MarketDataProvider, get_provider, to_timestamp
+
+DEFAULT_PATH = os.path.join('data', 'store', 'calendar.npy')
+
+_EPOCH = np.datetime64('1970-01-01', 'D')
+
+
+def to_ordinal(dates) -> Union[int, np.ndarray]:
+    """
+    日期 -> 日序号 (自 1970-01-01 起的天数)
+
+    参数:
+        dates: 单个日期或日期数组
+
+    返回:
+        int 或 int64 数组
+    """
+    if not isinstance(dates, (list, tuple, np.ndarray, pd.Index, pd.Series)):
+        return int((to_timestamp(dates).to_datetime64().astype('datetime64[D]') - _EPOCH).astype(np.int64))
+    values = pd.to_datetime(np.asarray(dates)).values.astype('datetime64[D]')
+    return (values - _EPOCH).astype(np.int64)
+
+
+def from_ordinal(ordinals) -> Union[pd.Timestamp, pd.DatetimeIndex]:
+    """日序号 -> Timestamp (数组时返回 DatetimeIndex)"""
+    if np.isscalar(ordinals):
+        return pd.Timestamp(_EPOCH + np.timedelta64(int(ordinals), 'D'))
+    days = _EPOCH + np.asarray(ordinals, dtype=np.int64).astype('timedelta64[D]')
+    return pd.DatetimeIndex(days.astype('datetime64[ns]'))
+
+
+class TradingCalendar:
+    """
+    交易日历
+
+    offset / next / prev 超出日历范围时抛出 IndexError
+    """
+
+    def __init__(self, days):
+        """
+        参数:
+            days: 交易日 (日期数组或 int 日序号数组)
+        """
+        days = np.asarray(days)
+        ordinals = days.astype(np.int64) if days.dtype.kind in 'iu' else to_ordinal(days)
+        self.days = np.unique(ordinals).astype(np.int32)
+        if len(self.days) == 0:
+            raise ValueError("交易日历为空")
+
+        self.first = int(self.days[0])
+        self.last = int(self.days[-1])
+        self._is_trading = np.zeros(self.last - self.first + 1, dtype=bool)
+        self._is_trading[self.days - self.first] = True
+        # 截至每个自然日 (含) 的累计交易日数
+        self._cum = np.cumsum(self._is_trading, dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    # ==================== 内部定位 ====================
+
+    def _floor_index(self, ordinal: int) -> int:
+        """当天或之前最近一个交易日的下标 (-1 表示早于日历)"""
+        if ordinal < self.first:
+            return -1
+        if ordinal > self.last:
+            return len(self.days) - 1
+        return int(self._cum[ordinal - self.first]) - 1
+
+    def _day(self, index: int) -> pd.Timestamp:
+        if index < 0 or index >= len(self.days):
+            raise IndexError("超出交易日历范围")
+        return from_ordinal(self.days[index])
+
+    # ==================== 单日查询 ====================
+
+    def is_trading_day(self, date) -> bool:
+        """是否交易日"""
+        ordinal = to_ordinal(date)
+        if ordinal < self.first or ordinal > self.last:
+            return False
+        return bool(self._is_trading[ordinal - self.first])
+
+    def rollback(self, date) -> pd.Timestamp:
+        """当天或之前最近一个交易日"""
+        return self._day(self._floor_index(to_ordinal(date)))
+
+    def rollforward(self, date) -> pd.Timestamp:
+        """当天或之后最近一个交易日"""
+        ordinal = to_ordinal(date)
+        index = self._floor_index(ordinal)
+        if not self.is_trading_day(date):
+            index += 1
+        return self._day(index)
+
+    def next(self, date) -> pd.Timestamp:
+        """之后 (不含当天) 的第一个交易日"""
+        return self._day(self._floor_index(to_ordinal(date)) + 1)
+
+    def prev(self, date) -> pd.Timestamp:
+        """之前 (不含当天) 的最后一个交易日"""
+        index = self._floor_index(to_ordinal(date))
+        if self.is_trading_day(date):
+            index -= 1
+        return self._day(index)
+
+    def offset(self, date, n: int) -> pd.Timestamp:
+        """
+        从当天或之前最近的交易日起偏移 n 个交易日
+
+        例如 offset(end, -19) 是以 end 结尾的 20 个交易日窗口的第一天
+        """
+        return self._day(self._floor_index(to_ordinal(date)) + n)
+
+    # ==================== 区间查询 ====================
+
+    def range(self, start, end) -> pd.DatetimeIndex:
+        """[start, end] 内的全部交易日"""
+        lo = int(self.days.searchsorted(to_ordinal(start), side='left'))
+        hi = int(self.days.searchsorted(to_ordinal(end), side='right'))
+        return from_ordinal(self.days[lo:hi])
+
+    def count(self, start, end) -> int:
+        """[start, end] 内的交易日数"""
+        return max(self._floor_index(to_ordinal(end)) - self._floor_index(to_ordinal(start) - 1), 0)
+
+    def is_trading_days(self, dates) -> np.ndarray:
+        """批量判断是否交易日"""
+        ordinals = np.atleast_1d(to_ordinal(dates)) - self.first
+        inside = (ordinals >= 0) & (ordinals < len(self._is_trading))
+        result = np.zeros(len(ordinals), dtype=bool)
+        result[inside] = self._is_trading[ordinals[inside]]
+        return result
+
+    def offsets(self, dates, n: int) -> pd.DatetimeIndex:
+        """批量 offset"""
+        ordinals = np.clip(np.atleast_1d(to_ordinal(dates)), self.first - 1, self.last)
+        floor = np.where(ordinals < self.first, -1, self._cum[np.maximum(ordinals - self.first, 0)] - 1)
+        index = floor + n
+        if (index < 0).any() or (index >= len(self.days)).any():
+            raise IndexError("超出交易日历范围")
+        return from_ordinal(self.days[index])
+
+
+def weekday_calendar(start='1990-12-19', end=None) -> TradingCalendar:
+    """周一至周五的近似日历 (不含节假日)"""
+    end = end or pd.Timestamp(datetime.now().date()) + pd.Timedelta(days=366)
+    return TradingCalendar(pd.bdate_range(start, end).values)
+
+
+def load_calendar(provider: Optional[MarketDataProvider] = None, path: Optional[str] = DEFAULT_PATH) -> TradingCalendar:
+    """
+    加载交易日历，本地缓存不覆盖今天时回源
+
+    参数:
+        provider: 数据源，默认全局数据源
+        path: 本地缓存路径，None 表示不落盘
+
+    返回:
+        TradingCalendar
+    """
+    today = to_ordinal(datetime.now().date())
+    if path is not None and os.path.exists(path):
+        days = np.load(path)
+        if len(days) and days[-1] > today:
+            return TradingCalendar(days)
+
+    provider = provider or get_provider()
+    try:
+        df = provider.get_trade_dates()
+    except (NotImplementedError, KeyError):
+        print("数据源不提供交易日历，按周一至周五处理")
+        return weekday_calendar()
+
+    calendar = TradingCalendar(pd.to_datetime(df['trade_date']).values)
+    if path is not None:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        tmp_path = path + '.tmp.npy'
+        np.save(tmp_path, calendar.days)
+        os.replace(tmp_path, path)
+    return calendar
+
+
+_default_calendar: Optional[TradingCalendar] = None
+
+
+def get_calendar() -> TradingCalendar:
+    """获取全局共享的交易日历"""
+    global _default_calendar
+    if _default_calendar is None:
+        _default_calendar = load_calendar()
+    return _default_calendar
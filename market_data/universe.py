@@ -0,0 +1,315 @@
+"""
+universe.py - 每日股票池快照 (Universe)
+
+每个交易日保存一份 ak.stock_zh_a_spot_em 快照:
+
+    {root}/{YYYY-MM-DD}.parquet
+
+快照加载时一次性预计算:
+- 板块代码 (整数，见 BOARD_NAMES)
+- 代码前三位 (整数，用于前缀过滤)
+- ST/退市标记
+- 流通市值降序排列
+
+之后任意日期的股票池查询都是一次字典查找加一个布尔掩码，
+不再重复拉取全市场快照、也不再重复做字符串过滤。
+"""
+import os
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .provider import MarketDataProvider, get_provider, to_timestamp
+
+DEFAULT_ROOT = os.path.join('data', 'store', 'universe')
+
+# 板块代码
+BOARD_UNKNOWN = 0
+BOARD_SH_MAIN = 1
+BOARD_SZ_MAIN = 2
+BOARD_CYB = 3
+BOARD_KCB = 4
+BOARD_BJ = 5
+
+BOARD_NAMES = ['未知', '上海主板', '深圳主板', '创业板', '科创板', '北京市场']
+
+# 代码前三位 -> 板块代码
+BOARD_PREFIXES = {
+    688: BOARD_KCB,
+    300: BOARD_CYB,
+    600: BOARD_SH_MAIN,
+    601: BOARD_SH_MAIN,
+    602: BOARD_SH_MAIN,
+    603: BOARD_SH_MAIN,
+    605: BOARD_SH_MAIN,
+    0: BOARD_SZ_MAIN,
+    2: BOARD_SZ_MAIN,
+    800: BOARD_BJ,
+}
+
+_BOARD_LOOKUP = np.zeros(1000, dtype=np.int8)
+for _prefix, _board in BOARD_PREFIXES.items():
+    _BOARD_LOOKUP[_prefix] = _board
+
+
+def code_prefix3(codes: Iterable[str]) -> np.ndarray:
+    """
+    计算股票代码前三位对应的整数
+
+    参数:
+        codes: 股票代码序列
+
+    返回:
+        int16 数组，无法解析的代码为 -1
+    """
+    prefix = pd.to_numeric(pd.Series(list(codes), dtype=object).astype(str).str.strip().str[:3], errors='coerce')
+    return prefix.fillna(-1).astype(np.int16).to_numpy()
+
+
+def _boards_from_prefix(prefix3: np.ndarray) -> np.ndarray:
+    boards = np.zeros(len(prefix3), dtype=np.int8)
+    valid = prefix3 >= 0
+    boards[valid] = _BOARD_LOOKUP[prefix3[valid]]
+    return boards
+
+
+def classify_boards(codes: Iterable[str]) -> np.ndarray:
+    """
+    批量判断股票板块
+
+    参数:
+        codes: 股票代码序列
+
+    返回:
+        int8 板块代码数组，对应名称见 BOARD_NAMES
+    """
+    return _boards_from_prefix(code_prefix3(codes))
+
+
+def prefix_mask(prefix3: np.ndarray, prefixes: Iterable[str]) -> np.ndarray:
+    """
+    用整数前三位判断代码是否以给定前缀开头
+
+    参数:
+        prefix3: code_prefix3 的结果
+        prefixes: 前缀列表，如 ('300', '688', '8')，长度 1~3
+
+    返回:
+        布尔数组
+    """
+    mask = np.zeros(len(prefix3), dtype=bool)
+    for prefix in prefixes:
+        scale = 10 ** (3 - len(prefix))
+        mask |= (prefix3 >= 0) & (prefix3 // scale == int(prefix))
+    return mask
+
+
+class UniverseSnapshot:
+    """
+    某一天的股票池快照
+
+    属性:
+        date: 快照日期
+        frame: 原始快照 DataFrame
+        codes / is_st / prefix3 / board / float_mv: 预计算的列数组
+        mv_order: 按流通市值降序排列的行号 (缺失值排在最后)
+        mv_rank: 每行的流通市值排名 (0 为最大)
+    """
+
+    def __init__(self, date: pd.Timestamp, frame: pd.DataFrame):
+        self.date = date
+        self.frame = frame.reset_index(drop=True)
+
+        self.codes = self.frame['代码'].astype(str).str.strip().to_numpy()
+        self.is_st = self.frame['名称'].astype(str).str.contains('ST|退').to_numpy()
+        self.prefix3 = code_prefix3(self.codes)
+        self.board = _boards_from_prefix(self.prefix3)
+
+        self.float_mv = pd.to_numeric(self.frame['流通市值'], errors='coerce').to_numpy(dtype=float)
+        self.mv_order = np.argsort(-self.float_mv, kind='stable')
+        self.mv_rank = np.empty(len(self.codes), dtype=np.int32)
+        self.mv_rank[self.mv_order] = np.arange(len(self.codes), dtype=np.int32)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def mask(
+        self,
+        exclude_st: bool = True,
+        exclude_prefixes: Iterable[str] = (),
+        boards: Optional[Iterable[int]] = None
+    ) -> np.ndarray:
+        """
+        构造股票池过滤掩码
+
+        参数:
+            exclude_st: 是否剔除 ST 和退市股票
+            exclude_prefixes: 需要剔除的代码前缀，如 ('300', '688')
+            boards: 只保留的板块代码，None 表示不限制
+
+        返回:
+            布尔数组
+        """
+        mask = ~self.is_st if exclude_st else np.ones(len(self.codes), dtype=bool)
+        if exclude_prefixes:
+            mask &= ~prefix_mask(self.prefix3, exclude_prefixes)
+        if boards is not None:
+            mask &= np.isin(self.board, list(boards))
+        return mask
+
+    def rows(self, mask: Optional[np.ndarray] = None, top_n: Optional[int] = None) -> np.ndarray:
+        """
+        按掩码选取行号
+
+        参数:
+            mask: 过滤掩码，None 表示全部
+            top_n: 只保留流通市值最大的 N 只 (按市值降序返回，剔除市值缺失)
+
+        返回:
+            行号数组
+        """
+        if mask is None:
+            mask = np.ones(len(self.codes), dtype=bool)
+        if top_n is None:
+            return np.flatnonzero(mask)
+        order = self.mv_order[mask[self.mv_order] & ~np.isnan(self.float_mv[self.mv_order])]
+        return order[:top_n]
+
+    def select(
+        self,
+        mask: Optional[np.ndarray] = None,
+        top_n: Optional[int] = None,
+        columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """
+        按掩码选取股票
+
+        参数:
+            mask: 过滤掩码，None 表示全部
+            top_n: 只保留流通市值最大的 N 只 (按市值降序返回)
+            columns: 返回的列，None 表示全部列
+
+        返回:
+            选中的快照行
+        """
+        df = self.frame.iloc[self.rows(mask, top_n)]
+        if columns is not None:
+            df = df[columns]
+        return df.reset_index(drop=True)
+
+    def board_names(self) -> np.ndarray:
+        """返回每行的板块名称"""
+        return np.asarray(BOARD_NAMES, dtype=object)[self.board]
+
+
+class UniverseStore:
+    """
+    股票池快照存储
+
+    功能:
+    - 每天一份全市场快照，当天首次查询时拉取
+    - 历史日期没有快照时使用该日之前最近的一份 (都没有时使用今天的快照)
+    - 已加载的快照常驻内存
+    """
+
+    def __init__(self, root: Optional[str] = DEFAULT_ROOT, provider: Optional[MarketDataProvider] = None):
+        """
+        初始化存储
+
+        参数:
+            root: 存储根目录，None 表示只缓存在内存中
+            provider: 拉取快照使用的数据源，默认使用全局数据源
+        """
+        self.root = root
+        self._provider = provider
+        self._snapshots: Dict[str, UniverseSnapshot] = {}
+        # 没有当日快照的日期 -> 实际使用的快照日期 (不计入 dates)
+        self._resolved: Dict[str, str] = {}
+        self.stats = {'network_requests': 0}
+
+    @property
+    def provider(self) -> MarketDataProvider:
+        return self._provider or get_provider()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, f'{key}.parquet')
+
+    def dates(self) -> List[str]:
+        """返回本地已保存快照的日期 (升序)"""
+        keys = set(self._snapshots)
+        if self.root is not None and os.path.isdir(self.root):
+            keys.update(name[:-len('.parquet')] for name in os.listdir(self.root) if name.endswith('.parquet'))
+        return sorted(keys)
+
+    def _load(self, key: str) -> Optional[UniverseSnapshot]:
+        if key in self._snapshots:
+            return self._snapshots[key]
+        if self.root is None or not os.path.exists(self._path(key)):
+            return None
+        snapshot = UniverseSnapshot(pd.Timestamp(key), pd.read_parquet(self._path(key)))
+        self._snapshots[key] = snapshot
+        return snapshot
+
+    def _fetch_today(self) -> UniverseSnapshot:
+        key = datetime.now().strftime('%Y-%m-%d')
+        self.stats['network_requests'] += 1
+        frame = self.provider.get_spot()
+        if self.root is not None:
+            os.makedirs(self.root, exist_ok=True)
+            tmp_path = self._path(key) + '.tmp'
+            frame.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, self._path(key))
+        snapshot = UniverseSnapshot(pd.Timestamp(key), frame)
+        self._snapshots[key] = snapshot
+        return snapshot
+
+    def get(self, date=None) -> UniverseSnapshot:
+        """
+        获取某日的股票池快照
+
+        参数:
+            date: 日期，默认今天
+
+        返回:
+            UniverseSnapshot
+        """
+        today = datetime.now().strftime('%Y-%m-%d')
+        key = to_timestamp(date).strftime('%Y-%m-%d') if date is not None else today
+
+        snapshot = self._load(key)
+        if snapshot is not None:
+            return snapshot
+        if key in self._resolved:
+            resolved = self._resolved[key]
+            if resolved > key:
+                print(f"无 {key} 的股票池快照，使用 {resolved} 的快照")
+            snapshot = self._load(resolved)
+            if snapshot is not None:
+                return snapshot
+
+        if key < today:
+            earlier = [d for d in self.dates() if d <= key]
+            if earlier:
+                snapshot = self._load(earlier[-1])
+            else:
+                print(f"无 {key} 的股票池快照，使用 {today} 的快照")
+
+        if snapshot is None:
+            snapshot = self._load(today) or self._fetch_today()
+
+        # 记住本次解析到的快照日期，同一日期再次查询直接命中
+        self._resolved[key] = snapshot.date.strftime('%Y-%m-%d')
+        return snapshot
+
+
+_default_store: Optional[UniverseStore] = None
+
+
+def get_universe_store() -> UniverseStore:
+    """获取全局共享的默认股票池快照存储"""
+    global _default_store
+    if _default_store is None:
+        _default_store = UniverseStore()
+    return _default_store
@@ -8,7 +8,9 @@ import pandas as pd
 from typing import Tuple
 import sys
 sys.path.insert(0, '..')
-from indicators.boll import calculate_boll, detect_breakout
+from indicators.boll import detect_breakout
+from indicators.graph import IndicatorGraph
+from indicators.precision import to_precision
 
 
 class BollStrategy:
@@ -26,10 +28,13 @@ class BollStrategy:
         self.name = f"Boll({window}/{num_std})"
     
     def generate_signals(self, df: pd.DataFrame) -> pd.DataFrame:
-        df = df.copy()
+        df = to_precision(df, copy=True)
         close = df['close']
         
-        middle, upper, lower, _ = calculate_boll(close, self.window, self.num_std)
+        graph = IndicatorGraph()
+        nodes = graph.boll(graph.source('close'), self.window, self.num_std)
+        values = graph.evaluate(df, dict(zip(('middle', 'upper', 'lower'), nodes)))
+        middle, upper, lower = values['middle'], values['upper'], values['lower']
         
         df['boll_upper'] = upper
         df['boll_lower'] = lower
@@ -47,7 +52,7 @@ class BollStrategy:
     def backtest(self, df: pd.DataFrame, commission: float = 0.001) -> Tuple[pd.DataFrame, dict]:
         df = self.generate_signals(df)
         
-        df['return'] = df['close'].pct_change()
+        df['return'] = df['close'].astype(np.float64).pct_change()
         df['strategy_return'] = df['position'].shift(1) * df['return'] - df['position'].diff().abs() * commission
         df['cum_strategy_return'] = (1 + df['strategy_return']).cumprod() - 1
         
@@ -9,6 +9,7 @@ from typing import Tuple
 import sys
 sys.path.insert(0, '..')
 from indicators.ma import calculate_sma, detect_golden_cross, detect_death_cross
+from indicators.precision import to_precision
 
 
 class DualMAStrategy:
@@ -46,7 +47,7 @@ class DualMAStrategy:
         返回:
             包含信号列的 DataFrame
         """
-        df = df.copy()
+        df = to_precision(df, copy=True)
         close = df['close']
         
         # 计算均线
@@ -86,7 +87,7 @@ class DualMAStrategy:
         df = self.generate_signals(df)
         
         # 计算策略收益
-        df['return'] = df['close'].pct_change()
+        df['return'] = df['close'].astype(np.float64).pct_change()
         df['strategy_return'] = df['position'].shift(1) * df['return']
         
         # 扣除手续费
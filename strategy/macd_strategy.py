@@ -9,6 +9,7 @@ from typing import Tuple
 import sys
 sys.path.insert(0, '..')
 from indicators.macd import calculate_macd, detect_macd_golden_cross, detect_macd_death_cross
+from indicators.precision import to_precision
 
 
 class MACDStrategy:
@@ -56,7 +57,7 @@ class MACDStrategy:
         返回:
             包含信号列的 DataFrame
         """
-        df = df.copy()
+        df = to_precision(df, copy=True)
         close = df['close']
         
         # 计算 MACD
@@ -102,7 +103,7 @@ class MACDStrategy:
         """简单回测"""
         df = self.generate_signals(df)
         
-        df['return'] = df['close'].pct_change()
+        df['return'] = df['close'].astype(np.float64).pct_change()
         df['strategy_return'] = df['position'].shift(1) * df['return']
         df['turnover'] = df['position'].diff().abs()
         df['strategy_return'] = df['strategy_return'] - df['turnover'] * commission
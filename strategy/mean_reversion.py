@@ -8,7 +8,8 @@ import pandas as pd
 from typing import Tuple
 import sys
 sys.path.insert(0, '..')
-from indicators.ma import calculate_sma
+from indicators.graph import IndicatorGraph
+from indicators.precision import to_precision
 
 
 class MeanReversionStrategy:
@@ -26,15 +27,17 @@ class MeanReversionStrategy:
         self.name = f"MeanReversion({window}/{num_std})"
     
     def generate_signals(self, df: pd.DataFrame) -> pd.DataFrame:
-        df = df.copy()
+        df = to_precision(df, copy=True)
         close = df['close']
         
-        ma = calculate_sma(close, self.window)
-        std = close.rolling(self.window).std()
+        # 均线与标准差来自指标依赖图，与布林带等共享同一窗口的计算
+        graph = IndicatorGraph()
+        ma, upper, lower, _ = graph.boll(graph.source('close'), self.window, self.num_std)
+        values = graph.evaluate(df, {'ma': ma, 'upper': upper, 'lower': lower})
         
-        df['ma'] = ma
-        df['upper'] = ma + self.num_std * std
-        df['lower'] = ma - self.num_std * std
+        df['ma'] = values['ma']
+        df['upper'] = values['upper']
+        df['lower'] = values['lower']
         
         df['position'] = 0
         df.loc[close < df['lower'], 'position'] = 1
@@ -46,7 +49,7 @@ class MeanReversionStrategy:
     def backtest(self, df: pd.DataFrame, commission: float = 0.001) -> Tuple[pd.DataFrame, dict]:
         df = self.generate_signals(df)
         
-        df['return'] = df['close'].pct_change()
+        df['return'] = df['close'].astype(np.float64).pct_change()
         df['strategy_return'] = df['position'].shift(1) * df['return'] - df['position'].diff().abs() * commission
         df['cum_strategy_return'] = (1 + df['strategy_return']).cumprod() - 1
         
@@ -6,6 +6,9 @@ momentum_strategy.py - 动量策略
 import numpy as np
 import pandas as pd
 from typing import Tuple
+import sys
+sys.path.insert(0, '..')
+from indicators.precision import to_precision
 
 
 class MomentumStrategy:
@@ -27,7 +30,7 @@ class MomentumStrategy:
         return close.pct_change(self.lookback)
     
     def generate_signals(self, df: pd.DataFrame) -> pd.DataFrame:
-        df = df.copy()
+        df = to_precision(df, copy=True)
         
         momentum = self.calculate_momentum(df['close'])
         df['momentum'] = momentum
@@ -42,7 +45,7 @@ class MomentumStrategy:
     def backtest(self, df: pd.DataFrame, commission: float = 0.001) -> Tuple[pd.DataFrame, dict]:
         df = self.generate_signals(df)
         
-        df['return'] = df['close'].pct_change()
+        df['return'] = df['close'].astype(np.float64).pct_change()
         df['strategy_return'] = df['position'].shift(1) * df['return'] - df['position'].diff().abs() * commission
         df['cum_strategy_return'] = (1 + df['strategy_return']).cumprod() - 1
         
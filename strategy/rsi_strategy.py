@@ -9,6 +9,7 @@ from typing import Tuple
 import sys
 sys.path.insert(0, '..')
 from indicators.rsi import calculate_rsi, detect_oversold, detect_overbought
+from indicators.precision import to_precision
 
 
 class RSIStrategy:
@@ -34,7 +35,7 @@ class RSIStrategy:
         self.name = f"RSI({rsi_period})"
     
     def generate_signals(self, df: pd.DataFrame) -> pd.DataFrame:
-        df = df.copy()
+        df = to_precision(df, copy=True)
         close = df['close']
         
         df['rsi'] = calculate_rsi(close, self.rsi_period)
@@ -52,7 +53,7 @@ class RSIStrategy:
     def backtest(self, df: pd.DataFrame, initial_capital: float = 100000.0, commission: float = 0.001) -> Tuple[pd.DataFrame, dict]:
         df = self.generate_signals(df)
         
-        df['return'] = df['close'].pct_change()
+        df['return'] = df['close'].astype(np.float64).pct_change()
         df['strategy_return'] = df['position'].shift(1) * df['return']
         df['turnover'] = df['position'].diff().abs()
         df['strategy_return'] = df['strategy_return'] - df['turnover'] * commission
@@ -9,6 +9,7 @@ from typing import Tuple
 import sys
 sys.path.insert(0, '..')
 from indicators.volume import calculate_volume_ratio, detect_volume_spike
+from indicators.precision import to_precision
 
 
 class VolumeStrategy:
@@ -26,7 +27,7 @@ class VolumeStrategy:
         self.name = f"Volume({volume_window}/{volume_threshold})"
     
     def generate_signals(self, df: pd.DataFrame) -> pd.DataFrame:
-        df = df.copy()
+        df = to_precision(df, copy=True)
         
         vol_ratio = calculate_volume_ratio(df['volume'], self.volume_window)
         df['volume_ratio'] = vol_ratio
@@ -43,7 +44,7 @@ class VolumeStrategy:
     def backtest(self, df: pd.DataFrame, commission: float = 0.001) -> Tuple[pd.DataFrame, dict]:
         df = self.generate_signals(df)
         
-        df['return'] = df['close'].pct_change()
+        df['return'] = df['close'].astype(np.float64).pct_change()
         df['strategy_return'] = df['position'].shift(1) * df['return'] - df['position'].diff().abs() * commission
         df['cum_strategy_return'] = (1 + df['strategy_return']).cumprod() - 1
         
@@ -2,9 +2,10 @@ import pandas as pd
 import json
 import numpy as np
 import os
+from market_data import get_calendar
 
 class Backtest:
-    def __init__(self, strategy, initial_capital=1000000, position_size=0.1, benchmark_code='000300.SH'):
+    def __init__(self, strategy, initial_capital=1000000, position_size=0.1, benchmark_code='000300.SH', calendar=None):
         """
         回测框架初始化
         Args:
@@ -12,11 +13,13 @@ class Backtest:
             initial_capital: 初始资金
             position_size: 每个持仓的资金比例
             benchmark_code: 基准指数代码，默认沪深300
+            calendar: 交易日历，默认使用沪深交易日历
         """
         self.strategy = strategy
         self.initial_capital = initial_capital
         self.position_size = position_size
         self.benchmark_code = benchmark_code
+        self.calendar = calendar or get_calendar()
         
     def run(self, start_date: str, end_date: str) -> tuple:
         """
@@ -48,7 +51,8 @@ class Backtest:
         current_capital = self.initial_capital
         max_position = 0
         
-        trading_dates = pd.date_range(start=start_date, end=end_date, freq='B')
+        # 只在交易日运行策略，节假日不再调用
+        trading_dates = self.calendar.range(start_date, end_date)
         try:
             
             for date in trading_dates:
@@ -1,11 +1,14 @@
 import pandas as pd
 import numpy as np
 from datetime import datetime
-import akshare as ak
 from typing import List, Dict
+from indicators.streaming import StreamingBOLL, StreamingIndicator, load_states, save_states
+from market_data import BulkFetcher, FinancialStore, UniverseStore, get_bar_store, get_calendar, get_financial_store, get_provider, get_universe_store, load_calendar
 
 class StockScorer:
-    def __init__(self):
+    def __init__(self, provider=None):
+        # 按时点财务数据；显式传入数据源时只缓存在内存中
+        self.financial_store = FinancialStore(root=None, provider=provider) if provider else get_financial_store()
         # 定义财务指标权重
         self.weights = {
             'ROE': 0.2,              # 净资产收益率
@@ -18,22 +21,14 @@ class StockScorer:
             'cash_ratio': 0.1         # 现金比率
         }
         
-    def get_financial_data(self, stock_code: str) -> Dict:
-        """获取股票财务指标"""
+    def get_financial_data(self, stock_code: str, trade_date: str = None) -> Dict:
+        """获取股票财务指标 (trade_date 当天已公开的最新一期报告，默认今天)"""
         try:
-            # 获取主要财务指标
-            financial = ak.stock_financial_abstract_ths(symbol=stock_code)
-            if financial is None or financial.empty or len(financial) == 0:
+            latest = self.financial_store.as_of(stock_code, trade_date)
+            if latest is None:
                 print(f"股票 {stock_code} 无财务数据")
                 return None
             
-            try:
-                # 获取最新一期的财务数据
-                latest = financial.iloc[0]
-            except IndexError:
-                print(f"股票 {stock_code} 无法获取最新财务数据")
-                return None
-            
             def safe_float(value, default=0.0):
                 """安全地转换字符串到浮点数，处理空值和异常情况"""
                 if pd.isna(value) or value == '' or value == '-':
@@ -86,57 +81,117 @@ class StockScorer:
 # 单纯使用布林带选股，效果不佳，需要结合其他指标进行综合分析。
 # 经过测试，在A股市场，选择大市值股票，结合财务指标得分，效果较好。
 class BollScreener:
-    def __init__(self, period=20, std_dev=2, include_cyb=False, include_kcb=False, top_n=10):
+    def __init__(self, period=20, std_dev=2, include_cyb=False, include_kcb=False, top_n=10, store=None, provider=None, max_concurrency=8, state_path=None):
         self.period = period
         self.std_dev = std_dev
         self.include_cyb = include_cyb
         self.include_kcb = include_kcb
         self.top_n = top_n  # 最终选取的股票数量
-        self.scorer = StockScorer()
+        self.provider = provider or get_provider()
+        self.scorer = StockScorer(self.provider)
+        # 本地日线存储；显式传入数据源 (如 ReplayProvider) 时直接从数据源读取
+        self.store = store or provider or get_bar_store()
+        # 并发拉取日线
+        self.fetcher = BulkFetcher(self.store, max_concurrency=max_concurrency)
+        # 每日股票池快照；显式传入数据源时只缓存在内存中
+        self.universe = UniverseStore(root=None, provider=provider) if provider else get_universe_store()
+        self.calendar = load_calendar(provider, path=None) if provider else get_calendar()
+        self.lookback = 100  # 计算布林带所需的交易日数 (含余量)
+        # 每只股票的增量布林带状态 {代码: {'date', 'boll', 'bars'}}；
+        # 状态截至前一交易日时只需拉取并推进新增的 K 线。state_path 为 None 时只保存在内存中
+        self.state_path = state_path
+        self.states = load_states(state_path)
         
-    def get_stock_list(self):
+    def get_stock_list(self, trade_date: str = None):
         """获取符合条件的股票列表"""
         print("正在获取股票列表...")
         
-        # 获取所有A股基本信息
-        stock_info = ak.stock_zh_a_spot_em()
-        
-        # 基础过滤：剔除ST和退市股票
-        df = stock_info[~stock_info['名称'].str.contains('ST|退')]
+        # 当日股票池快照 (每天只拉取一次)
+        snapshot = self.universe.get(trade_date)
         
-        # 板块过滤
+        # 剔除ST和退市股票，板块过滤
+        excluded = []
         if not self.include_cyb:
-            df = df[~df['代码'].str.startswith('300')]
+            excluded.append('300')
         if not self.include_kcb:
-            df = df[~df['代码'].str.startswith('688')]
+            excluded.append('688')
+        mask = snapshot.mask(exclude_st=True, exclude_prefixes=excluded)
             
-        # 获取流通市值数据并排序，选取最大的300只股票
-        df['流通市值'] = df['流通市值'].astype(float)
-        df = df.nlargest(300, '流通市值')
+        # 选取流通市值最大的300只股票
+        df = snapshot.select(mask, top_n=300, columns=['代码', '名称', '最新价'])
         
-        return df[['代码', '名称', '最新价']].to_dict('records')
+        return df.to_dict('records')
+
+    def check_signals(self, data: pd.DataFrame, code: str = None) -> str:
+        """
+        检查布林带买卖信号
+
+        参数:
+            data: 截至交易日的日线
+            code: 股票代码；已有该股票的增量状态时只推进状态日期之后的 K 线
+        """
+        dates = pd.to_datetime(data['日期']).to_numpy()
+        closes = data['收盘'].to_numpy(dtype=np.float64)
+
+        start = self.resume_position(code, dates, closes) if code else None
+        entry = None if start is None else self.states[code]
+        start = start or 0
+
+        if entry is None:
+            boll = StreamingBOLL(self.period, self.std_dev)
+            bars = [[np.nan, np.nan, np.nan], [np.nan, np.nan, np.nan]]
+        else:
+            boll = StreamingIndicator.from_state(entry['boll'])
+            bars = entry['bars']
+        for close in closes[start:]:
+            _, upper, lower, _ = boll.update(float(close))
+            bars = [bars[-1], [float(close), upper, lower]]
+
+        if code and len(dates) > 0:
+            self.states[code] = {
+                'date': pd.Timestamp(dates[-1]).strftime('%Y-%m-%d'),
+                'boll': boll.to_state(),
+                'bars': bars,
+            }
 
-    def check_signals(self, data: pd.DataFrame) -> str:
-        """检查布林带买卖信号"""
-        # 计算布林带指标
-        data['MA'] = data['收盘'].rolling(window=self.period).mean()
-        data['STD'] = data['收盘'].rolling(window=self.period).std()
-        data['Upper'] = data['MA'] + (self.std_dev * data['STD'])
-        data['Lower'] = data['MA'] - (self.std_dev * data['STD'])
-        
-        # 获取最新数据
-        latest = data.iloc[-1]
-        prev = data.iloc[-2]
+        # [收盘, 上轨, 下轨]
+        prev, latest = bars
         
         # 买入信号：价格从下轨上穿
-        if latest['收盘'] > latest['Lower'] and prev['收盘'] <= prev['Lower']:
+        if latest[0] > latest[2] and prev[0] <= prev[2]:
             return 'BUY'
         # 卖出信号：价格从上轨下穿
-        elif latest['收盘'] < latest['Upper'] and prev['收盘'] >= prev['Upper']:
+        elif latest[0] < latest[1] and prev[0] >= prev[1]:
             return 'SELL'
         else:
             return 'HOLD'
 
+    def resume_position(self, code: str, dates: np.ndarray, closes: np.ndarray):
+        """
+        增量状态之后第一根 K 线的位置
+
+        返回:
+            位置；没有状态、数据不含状态日期或状态日收盘价不一致 (除权除息后复权价格变化) 时返回 None
+        """
+        entry = self.states.get(code)
+        if entry is None:
+            return None
+        last = np.datetime64(pd.Timestamp(entry['date']))
+        start = int(dates.searchsorted(last, side='right'))
+        if start == 0 or dates[start - 1] != last:
+            return None
+        if not np.isclose(closes[start - 1], entry['bars'][-1][0], rtol=1e-9):
+            return None
+        return start
+
+    def fetch_start(self, code: str, start_date: str, end_date: str) -> str:
+        """增量状态覆盖的股票只需从状态日期开始拉取 (状态日当天用于校验复权价格)"""
+        entry = self.states.get(code)
+        if entry is None:
+            return start_date
+        state_date = entry['date'].replace('-', '')
+        return state_date if start_date <= state_date <= end_date.replace('-', '') else start_date
+
     def run(self, trade_date: str = None) -> tuple:
         """
         运行布林带筛选策略
@@ -150,37 +205,50 @@ class BollScreener:
         print(f"开始布林带选股 - {datetime.now()} (交易日期: {end_date})")
         
         # 获取初始股票池
-        stock_list = self.get_stock_list()
+        stock_list = self.get_stock_list(trade_date)
         print(f"初始股票池数量: {len(stock_list)} (交易日期: {end_date})")
         
         # 获取前100个交易日的数据以确保有足够数据计算布林带
-        start_date = (datetime.strptime(end_date, "%Y-%m-%d") - pd.Timedelta(days=150)).strftime("%Y%m%d")
+        start_date = self.calendar.offset(end_date, -(self.lookback - 1)).strftime("%Y%m%d")
         
         # 存储买卖信号的股票
         buy_signals = []
         sell_signals = []
         
+        # 并发拉取股票池日线 (前复权)
+        all_bars = self.fetcher.fetch([
+            (stock['代码'], self.fetch_start(stock['代码'], start_date, end_date), end_date.replace('-', ''), "qfq")
+            for stock in stock_list
+        ])
+        
+        # 只拉取了增量区间但状态已失效的股票，重新拉取完整区间
+        stale = [
+            i for i, (stock, df) in enumerate(zip(stock_list, all_bars))
+            if df is not None and not df.empty and self.fetch_start(stock['代码'], start_date, end_date) != start_date
+            and self.resume_position(stock['代码'], pd.to_datetime(df['日期']).to_numpy(), df['收盘'].to_numpy(dtype=np.float64)) is None
+        ]
+        if stale:
+            for i in stale:
+                self.states.pop(stock_list[i]['代码'], None)
+            refetched = self.fetcher.fetch([
+                (stock_list[i]['代码'], start_date, end_date.replace('-', ''), "qfq") for i in stale
+            ])
+            for i, df in zip(stale, refetched):
+                all_bars[i] = df
+        
         # 布林带筛选
-        for i, stock in enumerate(stock_list, 1):
+        for i, (stock, stock_data) in enumerate(zip(stock_list, all_bars), 1):
             try:
                 # print(f"布林带筛选进度: {i}/{len(stock_list)} - {stock['代码']}")
-                stock_data = ak.stock_zh_a_hist(
-                    symbol=stock['代码'], 
-                    period="daily",
-                    start_date=start_date,
-                    end_date=end_date.replace('-', ''),  # Convert YYYY-MM-DD to YYYYMMDD
-                    adjust="qfq"  # 前复权
-                )
-                
                 # 确保数据不为空且包含指定日期
-                if stock_data.empty:
+                if stock_data is None or stock_data.empty:
                     continue
                 latest = stock_data.iloc[-1]
-                signal = self.check_signals(stock_data)
+                signal = self.check_signals(stock_data, stock['代码'])
                 stock['latest_price'] = latest['收盘']
                 if signal == 'BUY':
                     # 获取财务数据并计算得分
-                    financial_data = self.scorer.get_financial_data(stock['代码'])
+                    financial_data = self.scorer.get_financial_data(stock['代码'], end_date)
                     if financial_data:
                         score = self.scorer.normalize_score(financial_data)
                         buy_signals.append({
@@ -201,6 +269,9 @@ class BollScreener:
                 print(f"处理股票 {stock['代码']} 时出错: {str(e)}")
                 continue
         
+        if self.state_path:
+            save_states(self.state_path, self.states)
+        
         # 按得分排序买入信号
         buy_signals.sort(key=lambda x: x['score'], reverse=True)
         buy_signals = buy_signals[:self.top_n]  # 只保留得分最高的 top_n 只股票
@@ -211,5 +282,6 @@ class BollScreener:
         return buy_signals, sell_signals, stock_list
 
 if __name__ == "__main__":
-    screener = BollScreener(include_cyb=False, include_kcb=False, top_n=10)
+    screener = BollScreener(include_cyb=False, include_kcb=False, top_n=10,
+                            state_path='data/store/state/boll_screener.json')
     buy_signals, sell_signals = screener.run() 
\ No newline at end of file
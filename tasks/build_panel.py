@@ -0,0 +1,26 @@
+import time
+from datetime import datetime
+from market_data import PricePanel, get_calendar, get_universe_store
+
+# 每日收盘后 (refresh_bars 之后) 运行：把股票池日线打包成内存映射面板
+# 选股和因子计算进程直接映射 data/store/panel，多个进程共享同一份页缓存
+
+def build_panel(symbols=None, days=250, adjust="qfq"):
+    if symbols is None:
+        symbols = get_universe_store().get().codes.tolist()
+    # 面板的日期轴为最近 days 个交易日
+    calendar = get_calendar()
+    today = datetime.now().strftime("%Y%m%d")
+    dates = calendar.range(calendar.offset(today, -(days - 1)), today)
+    start_date = dates[0].strftime("%Y%m%d")
+
+    print(f"开始构建价格面板 - {datetime.now()} (股票数量: {len(symbols)}, 起始日期: {start_date})")
+    started = time.time()
+    panel = PricePanel.build_from_store(symbols, start_date, adjust=adjust, dates=dates)
+    elapsed = time.time() - started
+
+    print(f"面板构建完成: {panel.shape[0]} 只股票 × {panel.shape[1]} 个交易日 × {panel.shape[2]} 个字段, 耗时 {elapsed:.1f} 秒")
+    return panel
+
+if __name__ == "__main__":
+    build_panel()
@@ -1,8 +1,8 @@
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-import akshare as ak
+from datetime import datetime
 from typing import List, Dict
+from market_data import BulkFetcher, UniverseStore, get_bar_store, get_calendar, get_provider, get_universe_store, load_calendar, resample_bars
 
 # https://github.com/z1041950008/deyide_quant
 # 如果需要定制化开发，可以私信我
@@ -15,33 +15,52 @@ class JTMomentumScreener:
                  holding_period=3,      # 持有期（月）
                  include_cyb=False, 
                  include_kcb=False, 
-                 top_n=10):
+                 top_n=10,
+                 store=None,
+                 provider=None,
+                 max_concurrency=8,
+                 timeframe='D'):     # 'D' 按日收益率计算动量，'M' 按月线 (形成期内每月收益率) 计算
         self.formation_period = formation_period
         self.holding_period = holding_period
         self.include_cyb = include_cyb
         self.include_kcb = include_kcb
         self.top_n = top_n
+        self.timeframe = timeframe
+        self.provider = provider or get_provider()
+        # 本地日线存储；显式传入数据源 (如 ReplayProvider) 时直接从数据源读取
+        self.store = store or provider or get_bar_store()
+        # 并发拉取日线
+        self.fetcher = BulkFetcher(self.store, max_concurrency=max_concurrency)
+        # 每日股票池快照；显式传入数据源时只缓存在内存中
+        self.universe = UniverseStore(root=None, provider=provider) if provider else get_universe_store()
+        self.calendar = load_calendar(provider, path=None) if provider else get_calendar()
         
-    def get_stock_list(self):
+    def get_stock_list(self, trade_date: str = None):
         print("正在获取股票列表...")
         
-        stock_info = ak.stock_zh_a_spot_em()
+        # 当日股票池快照 (每天只拉取一次)
+        snapshot = self.universe.get(trade_date)
         
-        df = stock_info[~stock_info['名称'].str.contains('ST|退')]
+        # 剔除ST和退市股票，板块过滤
+        excluded = []
         if not self.include_cyb:
-            df = df[~df['代码'].str.startswith('300')]
+            excluded.append('300')
         if not self.include_kcb:
-            df = df[~df['代码'].str.startswith('688')]
+            excluded.append('688')
+        mask = snapshot.mask(exclude_st=True, exclude_prefixes=excluded)
             
-        # 获取流通市值数据并排序，选取最大的300只股票
-        df['流通市值'] = df['流通市值'].astype(float)
-        df = df.nlargest(300, '流通市值')
+        # 选取流通市值最大的300只股票
+        df = snapshot.select(mask, top_n=300, columns=['代码', '名称', '最新价'])
         
-        return df[['代码', '名称', '最新价']].to_dict('records')
+        return df.to_dict('records')
     """计算动量分数"""
     def calculate_momentum(self, data: pd.DataFrame) -> float:
 
         try:
+            if self.timeframe == 'M':
+                # 日线合成月线，取形成期内的月收盘价
+                data = resample_bars(data, 'M').tail(self.formation_period + 1)
+
             # 计算收益率
             returns = (data['收盘'] - data['收盘'].shift(1)) / data['收盘'].shift(1)
             
@@ -62,27 +81,27 @@ class JTMomentumScreener:
         print(f"开始JT动量选股 - {datetime.now()} (交易日期: {end_date})")
         
         # 获取初始股票池
-        stock_list = self.get_stock_list()
+        stock_list = self.get_stock_list(trade_date)
         print(f"初始股票池数量: {len(stock_list)}")
         
-        # 计算回看期起始日期（形成期）
-        start_date = (datetime.strptime(end_date, "%Y-%m-%d") - 
-                     timedelta(days=self.formation_period * 30 + 30)).strftime("%Y%m%d")
+        if self.timeframe == 'M':
+            # 按自然月回看: 形成期之前一个月的月初起，月线多一根作为收益率的基准
+            start_date = (pd.Timestamp(end_date).to_period('M') - self.formation_period).start_time.strftime("%Y%m%d")
+        else:
+            # 计算回看期起始日期（形成期，每月按21个交易日计，多取一个月）
+            start_date = self.calendar.offset(end_date, -(self.formation_period + 1) * 21).strftime("%Y%m%d")
         
         momentum_signals = []
         
+        # 并发拉取股票池日线
+        all_bars = self.fetcher.fetch([
+            (stock['代码'], start_date, end_date.replace('-', ''), "qfq") for stock in stock_list
+        ])
+        
         # 动量策略筛选
-        for i, stock in enumerate(stock_list, 1):
+        for i, (stock, stock_data) in enumerate(zip(stock_list, all_bars), 1):
             try:
-                stock_data = ak.stock_zh_a_hist(
-                    symbol=stock['代码'],
-                    period="daily",
-                    start_date=start_date,
-                    end_date=end_date.replace('-', ''),
-                    adjust="qfq"
-                )
-                
-                if stock_data.empty:
+                if stock_data is None or stock_data.empty:
                     continue
                     
                 # 计算动量得分
@@ -0,0 +1,131 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from indicators.patterns import PATTERNS, locate_patterns
+from market_data import PricePanel
+
+# 每日收盘后 (build_panel 之后) 运行：对全市场扫描 pattern_analyser 的全部形态
+# 股票按面板中连续的行区间分片，进程池中每个进程映射同一份面板 (只传路径)，
+# 一次向量化扫描整个分片；结果合并为一张按置信度、日期排序的表，保存为 parquet
+
+OUTPUT_ROOT = os.path.join('data', 'store', 'patterns')
+
+PATTERN_NAMES = list(PATTERNS)
+
+
+def _scan_shard(panel, lo, hi, cols):
+    """子进程: 扫描面板第 lo ~ hi 行，返回 (行号, 形态编号, 位置) 与耗时"""
+    started = time.perf_counter()
+    block = np.asarray(panel._block(slice(lo, hi), cols, ('high', 'low', 'close')), dtype=np.float64)
+    loaded = time.perf_counter()
+    positions = locate_patterns(block[:, :, 0], block[:, :, 1], block[:, :, 2])
+    rows, codes, found = [], [], []
+    for code, name in enumerate(PATTERN_NAMES):
+        hit = np.flatnonzero(positions[name] >= 0)
+        rows.append(hit + lo)
+        codes.append(np.full(len(hit), code, dtype=np.int64))
+        found.append(positions[name][hit])
+    finished = time.perf_counter()
+    timing = {'pid': os.getpid(), 'symbols': hi - lo, 'read': loaded - started, 'scan': finished - loaded}
+    return np.concatenate(rows), np.concatenate(codes), np.concatenate(found), timing
+
+
+def screen_patterns(panel=None, symbols=None, days=250, end_date=None, workers=None, shard_size=256, output=OUTPUT_ROOT):
+    """
+    全市场形态扫描
+
+    参数:
+        panel: PricePanel 或面板目录，默认 data/store/panel
+        symbols: 股票代码列表，默认面板中的全部股票
+        days: 回看交易日数
+        end_date: 截止日期，默认面板最后一天
+        workers: 进程数，默认 CPU 核数；1 表示在当前进程中运行
+        shard_size: 每个分片的股票数
+        output: parquet 输出目录，None 表示不保存
+
+    返回:
+        (形态表, 耗时统计)
+        形态表列为 rank / code / pattern / type / confidence / date，按置信度、日期从高到低排序
+    """
+    timings = {}
+    started = time.perf_counter()
+    if panel is None or isinstance(panel, str):
+        panel = PricePanel(panel) if panel else PricePanel()
+    cols = panel.window_slice(days, end_date)
+    if symbols is None:
+        rows = np.arange(len(panel))
+    else:
+        rows = panel.rows(symbols)
+        rows = np.unique(rows[rows >= 0])
+    # 连续的行区间是面板的视图，子进程读取时不复制其余股票
+    breaks = np.flatnonzero(np.diff(rows) != 1) + 1
+    shards = []
+    for run in np.split(rows, breaks):
+        for offset in range(0, len(run), shard_size):
+            part = run[offset:offset + shard_size]
+            shards.append((int(part[0]), int(part[-1]) + 1))
+    timings['prepare'] = time.perf_counter() - started
+
+    print(f"开始形态扫描 - {datetime.now()} (股票数量: {len(rows)}, 分片: {len(shards)}, 交易日: {cols.stop - cols.start})")
+    started = time.perf_counter()
+    if workers == 1:
+        results = [_scan_shard(panel, lo, hi, cols) for lo, hi in shards]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_scan_shard, panel, lo, hi, cols) for lo, hi in shards]
+            results = [future.result() for future in futures]
+    timings['scan'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    hit_rows = np.concatenate([r[0] for r in results]) if results else np.array([], dtype=np.int64)
+    hit_codes = np.concatenate([r[1] for r in results]) if results else np.array([], dtype=np.int64)
+    hit_positions = np.concatenate([r[2] for r in results]) if results else np.array([], dtype=np.int64)
+    table = pd.DataFrame({
+        'code': panel.symbols[hit_rows].astype(str),
+        'pattern': np.array(PATTERN_NAMES, dtype=object)[hit_codes],
+        'type': np.array([PATTERNS[name]['type'] for name in PATTERN_NAMES], dtype=object)[hit_codes],
+        'confidence': np.array([PATTERNS[name]['confidence'] for name in PATTERN_NAMES])[hit_codes],
+        'date': panel.dates[cols][hit_positions].astype('datetime64[ns]'),
+    })
+    table = table.sort_values(['confidence', 'date', 'code'], ascending=[False, False, True], kind='stable')
+    table.insert(0, 'rank', np.arange(1, len(table) + 1))
+    table = table.reset_index(drop=True)
+    timings['merge'] = time.perf_counter() - started
+
+    path = None
+    if output:
+        started = time.perf_counter()
+        os.makedirs(output, exist_ok=True)
+        as_of = pd.Timestamp(panel.dates[cols.stop - 1]).strftime('%Y%m%d') if cols.stop > cols.start else 'empty'
+        path = os.path.join(output, f'{as_of}.parquet')
+        tmp_path = path + '.tmp'
+        table.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        timings['write'] = time.perf_counter() - started
+
+    # 每个进程的分片数、股票数与吞吐量
+    per_worker = {}
+    for _, _, _, timing in results:
+        stats = per_worker.setdefault(timing['pid'], {'shards': 0, 'symbols': 0, 'read': 0.0, 'scan': 0.0})
+        stats['shards'] += 1
+        stats['symbols'] += timing['symbols']
+        stats['read'] += timing['read']
+        stats['scan'] += timing['scan']
+    for stats in per_worker.values():
+        busy = stats['read'] + stats['scan']
+        stats['symbols_per_sec'] = stats['symbols'] / busy if busy > 0 else float('inf')
+
+    print(f"形态扫描完成: {len(table)} 条形态, 输出 {path}")
+    for stage, seconds in timings.items():
+        print(f"  {stage:<8} {seconds:.3f} 秒")
+    for pid, stats in sorted(per_worker.items()):
+        print(f"  进程 {pid}: {stats['shards']} 个分片, {stats['symbols']} 只股票, "
+              f"读取 {stats['read']:.3f} 秒, 扫描 {stats['scan']:.3f} 秒, {stats['symbols_per_sec']:.0f} 只/秒")
+    return table, {'stages': timings, 'workers': per_worker, 'path': path}
+
+
+if __name__ == "__main__":
+    screen_patterns()
@@ -0,0 +1,24 @@
+import time
+from datetime import datetime
+from market_data import get_bar_store, get_universe_store
+
+# 每日收盘后运行：将本地已入库股票的日线增量更新到今天
+# 每只股票只请求水位线之后的尾部数据，新股票首次选股时才会拉取完整区间
+# 同时保存当天的股票池快照
+
+def refresh_bars(symbols=None, adjust="qfq"):
+    store = get_bar_store()
+    if symbols is None:
+        symbols = get_universe_store().get().codes.tolist()
+
+    print(f"开始增量更新日线 - {datetime.now()} (股票数量: {len(symbols)})")
+    started = time.time()
+    result = store.refresh_all(symbols, adjust=adjust)
+    elapsed = time.time() - started
+
+    print(f"更新完成: 回源 {result['updated']} 只, 已是最新 {result['skipped']} 只, 失败 {len(result['failed'])} 只")
+    print(f"网络请求 {store.stats['network_requests']} 次, 耗时 {elapsed:.1f} 秒")
+    return result
+
+if __name__ == "__main__":
+    refresh_bars()
@@ -1,24 +1,19 @@
-import akshare as ak
 import pandas as pd
 import talib
 import numpy as np
 import traceback
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from market_data import BulkFetcher, get_bar_store, get_financial_store, get_provider, get_universe_store
 # https://github.com/z1041950008/deyide_quant
 # 如果需要定制化开发，可以私信我
 # 如果觉得不错，可以点个star，谢谢
 # 后续会更新更多指标，敬请期待
 # 获取A股股票列表
-stock_list = ak.stock_zh_a_spot_em()
-stock_list = stock_list[~stock_list['名称'].str.contains('ST|退')]
-# 板块过滤
-stock_list = stock_list[~stock_list['代码'].str.startswith('300')]
-stock_list = stock_list[~stock_list['代码'].str.startswith('301')]
-stock_list = stock_list[~stock_list['代码'].str.startswith('688')]
-stock_list = stock_list[~stock_list['代码'].str.startswith('8')]
-stock_list = stock_list[~stock_list['代码'].str.startswith('9')]
-stock_list = stock_list[~stock_list['代码'].str.startswith('4')]
-stock_list = stock_list[~stock_list['代码'].str.contains('ST')]
+universe = get_universe_store().get()
+# 剔除ST和退市股票，板块过滤
+stock_list = universe.select(universe.mask(exclude_st=True, exclude_prefixes=('300', '301', '688', '8', '9', '4')))
 
 stock_codes = stock_list['代码'].tolist() # 示例：前50只股票
 
@@ -34,7 +29,7 @@ def get_technical_indicators(stock_data):
 def get_fundamental_data(stock_code):
     """获取基本面参数"""
     try:
-        financial_data = ak.stock_financial_abstract_ths(symbol=stock_code).iloc[0]
+        financial_data = get_financial_store().latest(stock_code)
 
         # 如果值为空或无效，设置为0
         roe = float(financial_data['净资产收益率'].replace('%', '') ) if financial_data['净资产收益率'] else 0
@@ -48,13 +43,13 @@ def get_fundamental_data(stock_code):
 
 def check_company_announcements(stock_code):
     """检查公司公告是否有重大消息"""
-    announcements = ak.stock_notice_report(symbol=stock_code)
+    announcements = get_provider().get_announcements(stock_code)
     return not any("重大" in row['公告标题'] for _, row in announcements.iterrows())
 
 def process_stock(code):
     try:
         # 获取股票日线数据
-        stock_data = ak.stock_zh_a_hist(symbol=code, period="daily", adjust="qfq")
+        stock_data = get_bar_store().get_bars(code, adjust="qfq")
         stock_data['收盘'] = stock_data['收盘'].astype(float)
         stock_data['布林下轨'] = stock_data['布林下轨'].astype(float)
 
@@ -101,17 +96,16 @@ def filter_stocks(stock_codes):
     
     print(f"开始处理共 {total} 只股票...")
     
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        futures = {executor.submit(process_stock, code): code for code in stock_codes}
-        for future in as_completed(futures):
-            completed += 1
-            code = futures[future]
-            print(f"进度: {completed}/{total} ({(completed/total*100):.1f}%) - 处理股票: {code}")
-            
-            result = future.result()
-            if result:
-                results.append(result)
-                print(f"股票 {code} 符合筛选条件！")
+    # 回调在事件循环线程中依次执行，计数无需加锁
+    def on_done(code, result, error):
+        nonlocal completed
+        completed += 1
+        print(f"进度: {completed}/{total} ({(completed/total*100):.1f}%) - 处理股票: {code}")
+        if result:
+            results.append(result)
+            print(f"股票 {code} 符合筛选条件！")
+    
+    BulkFetcher(max_concurrency=5).map(process_stock, stock_codes, on_done=on_done)
     
     print(f"\n筛选完成！共找到 {len(results)} 只符合条件的股票")
     return pd.DataFrame(results)
@@ -126,16 +120,14 @@ def save_all_stock_indicators(stock_codes):
     
     print(f"开始收集 {total} 只股票的详细指标...")
     
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        futures = {executor.submit(process_stock_all_indicators, code): code for code in stock_codes}
-        for future in as_completed(futures):
-            completed += 1
-            code = futures[future]
-            print(f"进度: {completed}/{total} ({(completed/total*100):.1f}%) - 处理股票: {code}")
-            
-            result = future.result()
-            if result:
-                all_results.append(result)
+    def on_done(code, result, error):
+        nonlocal completed
+        completed += 1
+        print(f"进度: {completed}/{total} ({(completed/total*100):.1f}%) - 处理股票: {code}")
+        if result:
+            all_results.append(result)
+    
+    BulkFetcher(max_concurrency=5).map(process_stock_all_indicators, stock_codes, on_done=on_done)
     
     print(f"\n数据收集完成！共收集了 {len(all_results)} 只股票的指标")
     all_stocks_df = pd.DataFrame(all_results)
@@ -146,7 +138,7 @@ def process_stock_all_indicators(code):
     """处理单个股票的所有指标，不做筛选"""
     try:
         # 获取股票日线数据
-        stock_data = ak.stock_zh_a_hist(symbol=code, period="daily", adjust="qfq")
+        stock_data = get_bar_store().get_bars(code, adjust="qfq")
         stock_data['收盘'] = stock_data['收盘'].astype(float)
         stock_data['最高'] = stock_data['最高'].astype(float)
         stock_data['最低'] = stock_data['最低'].astype(float)
@@ -1,8 +1,10 @@
-import akshare as ak
 import pandas as pd
 import numpy as np
 from datetime import datetime, timedelta
-from concurrent.futures import ThreadPoolExecutor
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from market_data import BulkFetcher, get_bar_store, get_universe_store
 
 # https://github.com/z1041950008/deyide_quant
 # 如果需要定制化开发，可以私信我
@@ -12,7 +14,7 @@ from concurrent.futures import ThreadPoolExecutor
 def get_stock_data(stock_code, start_date, end_date):
     """获取股票在指定日期范围内的日线数据"""
     try:
-        stock_data = ak.stock_zh_a_hist(symbol=stock_code, period="daily", start_date=start_date, end_date=end_date, adjust="qfq")
+        stock_data = get_bar_store().get_bars(stock_code, start_date=start_date, end_date=end_date, adjust="qfq")
         stock_data['收盘'] = stock_data['收盘'].astype(float)
         return stock_data
     except Exception as e:
@@ -29,30 +31,30 @@ def is_stable(stock_data, threshold=2):
     return std_dev / mean_price < threshold
 
 def filter_stocks(stock_codes, start_date, end_date, threshold=0.05):
-    stable_stocks = []
     total = len(stock_codes)
     processed = 0
 
-    def process_stock(code):
+    # 回调在事件循环线程中依次执行，计数无需加锁
+    def on_done(request, stock_data, error):
         nonlocal processed
-        stock_data = get_stock_data(code, start_date, end_date)
         processed += 1
         print(f"处理进度: {processed}/{total} ({processed/total*100:.2f}%)")
-        if stock_data is not None and is_stable(stock_data, threshold):
-            return code
-        return None
 
-    with ThreadPoolExecutor() as executor:
-        results = executor.map(process_stock, stock_codes)
+    results = BulkFetcher(get_bar_store()).fetch(
+        [(code, start_date, end_date, "qfq") for code in stock_codes], on_done=on_done
+    )
 
-    stable_stocks = [code for code in results if code is not None]
+    stable_stocks = [
+        code for code, stock_data in zip(stock_codes, results)
+        if stock_data is not None and not stock_data.empty and is_stable(stock_data, threshold)
+    ]
     return stable_stocks
 
 def record_stock_metrics(stock_codes, start_date, end_date, threshold=0.05, output_file='stock_metrics.xlsx'):
     """记录所有股票的方差、平均值及其比值到Excel"""
     metrics = []
     total = len(stock_codes)
-    stock_info = ak.stock_zh_a_spot_em()
+    stock_info = get_universe_store().get().frame
 
     for i, code in enumerate(stock_codes, 1):
         print(f"处理进度: {i}/{total} ({i/total*100:.2f}%)")
@@ -87,15 +89,9 @@ def record_stock_metrics(stock_codes, start_date, end_date, threshold=0.05, outp
 
 def main():
     # 获取A股股票列表
-    stock_list = ak.stock_zh_a_spot_em()
-    stock_list = stock_list[~stock_list['名称'].str.contains('ST|退')]
-    # 板块过滤
-    stock_list = stock_list[~stock_list['代码'].str.startswith('300')]
-    stock_list = stock_list[~stock_list['代码'].str.startswith('301')]
-    stock_list = stock_list[~stock_list['代码'].str.startswith('688')]
-    stock_list = stock_list[~stock_list['代码'].str.startswith('8')]
-    stock_list = stock_list[~stock_list['代码'].str.startswith('9')]
-    stock_list = stock_list[~stock_list['代码'].str.startswith('4')]
+    universe = get_universe_store().get()
+    # 剔除ST和退市股票，板块过滤
+    stock_list = universe.select(universe.mask(exclude_st=True, exclude_prefixes=('300', '301', '688', '8', '9', '4')))
 
     stock_codes = stock_list['代码'].tolist()
     # stock_codes = stock_codes[:200]
@@ -93,20 +93,21 @@ def is_volatile_stock(stock_data, rsi_period=14, kdj_period=9):
     return stock_type, analysis
 
 
+import os
+import sys
 import pandas as pd
-import akshare as ak
 from datetime import datetime, timedelta
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from market_data import get_bar_store, get_universe_store
 
 def analyze_all_stocks():
   
 
 
     # 获取A股股票列表
-    stock_list = ak.stock_zh_a_spot_em()
-    # 过滤ST和退市股票
-    stock_list = stock_list[~stock_list['名称'].str.contains('ST|退')]
-    # 过滤科创板、创业板等
-    stock_list = stock_list[~stock_list['代码'].str.startswith(('300', '301', '688', '8', '9', '4'))]
+    universe = get_universe_store().get()
+    # 过滤ST和退市股票，以及科创板、创业板等
+    stock_list = universe.select(universe.mask(exclude_st=True, exclude_prefixes=('300', '301', '688', '8', '9', '4')))
     # stock_list = stock_list.head(10)
     end_date = datetime.now().strftime('%Y%m%d')
     start_date = (datetime.now() - timedelta(days=3*365)).strftime('%Y%m%d')
@@ -119,8 +120,8 @@ def analyze_all_stocks():
             print(f"处理进度: {idx+1}/{total} ({(idx+1)/total*100:.2f}%)")
             
             # 获取股票数据
-            df = ak.stock_zh_a_hist(
-                symbol=stock['代码'],
+            df = get_bar_store().get_bars(
+                stock['代码'],
                 start_date=start_date,
                 end_date=end_date,
                 adjust="qfq"
@@ -7,9 +7,44 @@ import pandas as pd
 import sys
 sys.path.insert(0, '..')
 
-from indicators.ma import calculate_sma, calculate_ema
+from indicators.ma import calculate_sma, calculate_ema, calculate_sma_grid
 from indicators.macd import calculate_macd
 from indicators.rsi import calculate_rsi
+from indicators.kdj import calculate_kdj
+from indicators.boll import calculate_boll, calculate_boll_grid
+from indicators.atr import calculate_atr
+from indicators.cci import calculate_cci
+from indicators.obv import calculate_obv, detect_divergence
+from indicators.macd import detect_bullish_divergence, detect_bearish_divergence
+from indicators.streaming import (
+    StreamingIndicator, StreamingSMA, StreamingEMA, StreamingMACD, StreamingRSI,
+    StreamingKDJ, StreamingBOLL, StreamingATR, StreamingCCI, StreamingOBV,
+)
+from indicators.cache import IndicatorCache, get_indicator_cache, set_indicator_cache
+from indicators.composite import CompositeIndicator
+from indicators.cross_section import cs_rank, cs_zscore, top_k
+from indicators.factor import compute_factors, parse_factor
+from indicators.precision import compare_precision, use_precision
+from indicators.graph import IndicatorGraph
+from indicators.chunked import ChunkedIndicators
+from indicators.panel import (
+    panel_obv, panel_divergence, panel_macd_divergence, panel_sma, panel_ema, panel_macd, panel_rsi, panel_kdj, panel_boll, panel_atr, panel_cci
+)
+from indicators.rolling import rolling_min, rolling_max, rolling_mean, rolling_std, rolling_var, rolling_mean_std, rolling_mad, rolling_rank, rolling_slope
+from indicators.patterns import local_extrema, head_and_shoulders, scan_patterns
+
+
+def make_panel(n=6, t=200, seed=0):
+    """随机 OHLC 面板，包含次新股前导 NaN、停牌 NaN 和一字横盘"""
+    rng = np.random.default_rng(seed)
+    close = 100 + rng.standard_normal((n, t)).cumsum(axis=1)
+    high = close + rng.random((n, t))
+    low = close - rng.random((n, t))
+    for arr in (close, high, low):
+        arr[1, :30] = np.nan
+        arr[2, 50:55] = np.nan
+    close[3, 100:] = high[3, 100:] = low[3, 100:] = close[3, 99]
+    return high, low, close
 
 
 def test_sma():
@@ -56,9 +91,508 @@ def test_rsi():
     print("✅ RSI 测试通过")
 
 
+def test_window_grid():
+    """测试多周期均线/布林带 (共用前缀和) 与逐个周期计算一致"""
+    high, low, close = make_panel(t=300)
+    windows = list(range(2, 260, 3)) + [300, 400]
+    for row in (0, 1, 2, 3):
+        c = pd.Series(close[row])
+        sma = calculate_sma_grid(c, windows)
+        middle, upper, lower, bandwidth = calculate_boll_grid(c, windows)
+        assert sma.shape == (len(windows), len(c))
+        for k, window in enumerate(windows):
+            np.testing.assert_allclose(sma[k], calculate_sma(c, window), rtol=1e-10, atol=1e-9, equal_nan=True)
+            if row == 3:
+                continue  # pandas 在横盘窗口的标准差残留 1e-6 量级的舍入误差，网格结果为 0，单独检查
+            for got, want in zip((middle[k], upper[k], lower[k], bandwidth[k]), calculate_boll(c, window)):
+                np.testing.assert_allclose(got, want, rtol=1e-7, atol=1e-6, equal_nan=True)
+
+    # 横盘区间标准差严格为 0，上下轨与中轨重合
+    _, upper, lower, _ = calculate_boll_grid(close[3], [5, 20])
+    assert (upper[:, 130:] == lower[:, 130:]).all()
+    print("✅ 多周期网格测试通过")
+
+
+def test_panel_matches_single_series():
+    """测试面板指标与单序列函数结果一致"""
+    high, low, close = make_panel()
+    panel = {
+        'sma': [panel_sma(close, 20)],
+        'ema': [panel_ema(close, 12)],
+        'macd': list(panel_macd(close)),
+        'rsi': [panel_rsi(close, 14)],
+        'kdj': list(panel_kdj(high, low, close)),
+        'boll': list(panel_boll(close)),
+        'atr': [panel_atr(high, low, close)],
+        'cci': [panel_cci(high, low, close)],
+    }
+    for i in range(close.shape[0]):
+        h, l, c = pd.Series(high[i]), pd.Series(low[i]), pd.Series(close[i])
+        single = {
+            'sma': [calculate_sma(c, 20)],
+            'ema': [calculate_ema(c, 12)],
+            'macd': list(calculate_macd(c)),
+            'rsi': [calculate_rsi(c, 14)],
+            'kdj': list(calculate_kdj(h, l, c)),
+            'boll': list(calculate_boll(c)),
+            'atr': [calculate_atr(h, l, c)],
+            'cci': [calculate_cci(h, l, c)],
+        }
+        for name, expected in single.items():
+            for got, want in zip(panel[name], expected):
+                np.testing.assert_allclose(got[i], want.to_numpy(), rtol=1e-9, atol=1e-9, equal_nan=True, err_msg=name)
+    print("✅ 面板指标测试通过")
+
+
+def test_panel_wide_dataframe():
+    """测试宽表输入 (行为交易日、列为股票) 返回同样形状的 DataFrame"""
+    _, _, close = make_panel()
+    wide = pd.DataFrame(close.T, index=pd.bdate_range('2024-01-01', periods=close.shape[1]),
+                        columns=[f'{i:06d}' for i in range(close.shape[0])])
+    dif, dea, hist = panel_macd(wide)
+
+    assert isinstance(dif, pd.DataFrame)
+    assert dif.shape == wide.shape
+    assert list(dif.columns) == list(wide.columns)
+    np.testing.assert_allclose(dif.to_numpy(), panel_macd(close)[0].T, equal_nan=True)
+    np.testing.assert_allclose(panel_sma(close[0], 5), calculate_sma(pd.Series(close[0]), 5), equal_nan=True)
+    print("✅ 面板宽表测试通过")
+
+
+def test_rolling_kernels():
+    """测试滚动算子与 pandas rolling 一致 (含 NaN、横盘和超长窗口)"""
+    _, _, close = make_panel(t=300)
+    frame = pd.DataFrame(close.T)
+    for window in (1, 5, 20, 250, 400):
+        rolling = frame.rolling(window)
+        checks = [
+            (rolling_min(close, window), rolling.min()),
+            (rolling_max(close, window), rolling.max()),
+            (rolling_mean(close, window), rolling.mean()),
+            (rolling_std(close, window), rolling.std()),
+            (rolling_var(close, window, ddof=0), rolling.var(ddof=0)),
+        ]
+        for got, want in checks:
+            assert got.shape == close.shape
+            np.testing.assert_allclose(got, want.to_numpy().T, rtol=1e-9, atol=1e-6, equal_nan=True)
+
+        # 横盘窗口的标准差严格为 0
+        if 1 < window <= 200:
+            assert (rolling_std(close[3], window)[100 + window:] == 0).all()
+
+        mean, std = rolling_mean_std(close, window)
+        np.testing.assert_array_equal(mean, rolling_mean(close, window))
+        np.testing.assert_array_equal(std, rolling_std(close, window))
+
+        mad = rolling_mad(close, window)
+        brute = rolling.apply(lambda x: np.abs(x - x.mean()).mean(), raw=True)
+        np.testing.assert_allclose(mad, brute.to_numpy().T, rtol=1e-9, atol=1e-9, equal_nan=True)
+
+    # 一维输入按单只股票处理
+    np.testing.assert_array_equal(rolling_max(close[0], 20), rolling_max(close, 20)[0])
+    print("✅ 滚动算子测试通过")
+
+
+def test_streaming_matches_batch():
+    """测试增量指标逐根推进 (中途导出并恢复状态) 与一次性计算结果一致"""
+    import json
+
+    high, low, close = make_panel()
+    volume = np.random.default_rng(1).integers(100, 1000, close.shape).astype(float)
+    for i in range(close.shape[0]):
+        df = pd.DataFrame({'high': high[i], 'low': low[i], 'close': close[i], 'volume': volume[i]})
+        h, l, c, v = df['high'], df['low'], df['close'], df['volume']
+        cases = [
+            (StreamingSMA(20), [calculate_sma(c, 20)]),
+            (StreamingEMA(12), [calculate_ema(c, 12)]),
+            (StreamingMACD(), calculate_macd(c)),
+            (StreamingRSI(14), [calculate_rsi(c, 14)]),
+            (StreamingKDJ(), calculate_kdj(h, l, c)),
+            (StreamingBOLL(), calculate_boll(c)),
+            (StreamingATR(), [calculate_atr(h, l, c)]),
+            (StreamingCCI(), [calculate_cci(h, l, c)]),
+            (StreamingOBV(), [calculate_obv(c, v)]),
+        ]
+        for indicator, expected in cases:
+            values = indicator.update_many(df.iloc[:120])
+            restored = StreamingIndicator.from_state(json.loads(json.dumps(indicator.to_state())))
+            values += [restored.update(row) for _, row in df.iloc[120:].iterrows()]
+            got = np.array(values, dtype=float).reshape(len(df), -1)
+            for j, want in enumerate(expected):
+                np.testing.assert_allclose(got[:, j], want.to_numpy(dtype=float), rtol=1e-8, atol=1e-8,
+                                           equal_nan=True, err_msg=type(indicator).__name__)
+    print("✅ 增量指标测试通过")
+
+
+def test_obv_and_divergence_vectorized():
+    """测试向量化 OBV / 背离与逐行定义一致，面板版本与单序列版本一致"""
+    rng = np.random.default_rng(3)
+    close = pd.Series(np.round(10 + rng.standard_normal(120).cumsum() * 0.3, 1))
+    volume = pd.Series(rng.integers(1, 100, 120).astype(float))
+    close.iloc[[7, 40, 41]] = np.nan
+    window = 10
+
+    # 逐行定义
+    obv = [0.0]
+    for i in range(1, len(close)):
+        step = volume[i] if close[i] > close[i-1] else -volume[i] if close[i] < close[i-1] else 0.0
+        obv.append(obv[-1] + step)
+    bullish = [int(i >= window and close[i] < close[i-window:i].min() and obv[i] > min(obv[i-window:i]))
+               for i in range(len(close))]
+    dif = close.diff().fillna(0) - 0.05
+    macd_bull = [int(i >= window and close[i] < close[i-5] and dif[i] > dif[i-5] and dif[i] > 0)
+                 for i in range(len(close))]
+
+    got_obv = calculate_obv(close, volume)
+    np.testing.assert_array_equal(got_obv.to_numpy(), obv)
+    assert detect_divergence(close, got_obv, window)[0].tolist() == bullish
+    assert detect_bullish_divergence(close, dif, window).tolist() == macd_bull
+
+    # 面板版本逐行与单序列版本一致
+    high, low, closes = make_panel()
+    volumes = rng.integers(100, 1000, closes.shape).astype(float)
+    obvs = panel_obv(closes, volumes)
+    bull, bear = panel_divergence(closes, obvs, 20)
+    difs = panel_macd(closes)[0]
+    macd_bulls, macd_bears = panel_macd_divergence(closes, difs, 20)
+    for i in range(closes.shape[0]):
+        c = pd.Series(closes[i])
+        single_obv = calculate_obv(c, pd.Series(volumes[i]))
+        np.testing.assert_array_equal(obvs[i], single_obv.to_numpy())
+        single_bull, single_bear = detect_divergence(c, single_obv, 20)
+        np.testing.assert_array_equal(bull[i], single_bull.to_numpy())
+        np.testing.assert_array_equal(bear[i], single_bear.to_numpy())
+        np.testing.assert_array_equal(macd_bulls[i], detect_bullish_divergence(c, pd.Series(difs[i]), 20).to_numpy())
+        np.testing.assert_array_equal(macd_bears[i], detect_bearish_divergence(c, pd.Series(difs[i]), 20).to_numpy())
+    print("✅ OBV 与背离测试通过")
+
+
+def test_indicator_graph_shares_nodes():
+    """测试指标依赖图去重共享节点、只计算请求的输出，结果与单独计算一致"""
+    high, low, close = make_panel()
+    df = pd.DataFrame({'high': high[0], 'low': low[0], 'close': close[0], 'volume': 1000.0})
+
+    graph = IndicatorGraph()
+    names = CompositeIndicator.INDICATORS
+    plan = graph.plan(names)
+    ops = [node.op for node in plan]
+    # ema12/ema26 只出现一次 (与 MACD 共享)，sma20 与布林带中轨共享
+    assert ops.count('ema') == 3
+    assert ops.count('sma') == 2
+    assert ops.count('std') == 1
+    assert 'obv' not in ops and 'atr' not in ops
+
+    values = graph.evaluate(df, names)
+    assert graph.stats['evaluated'] == sum(1 for node in plan if node.op != 'source')
+    assert values['sma20'] is values['boll_middle']
+
+    expected = {'sma20': calculate_sma(df['close'], 20), 'ema12': calculate_ema(df['close'], 12), 'rsi14': calculate_rsi(df['close'], 14)}
+    expected.update(zip(('dif', 'dea', 'macd_hist'), calculate_macd(df['close'])))
+    expected.update(zip(('kdj_k', 'kdj_d', 'kdj_j'), calculate_kdj(df['high'], df['low'], df['close'])))
+    expected.update(zip(('boll_middle', 'boll_upper', 'boll_lower'), calculate_boll(df['close'])))
+    for name, want in expected.items():
+        pd.testing.assert_series_equal(values[name], want, check_names=False)
+
+    result = CompositeIndicator().calculate_all_indicators(df.copy())
+    assert set(names) <= set(result.columns)
+
+    # 面板输入使用面板算子
+    panel_values = graph.evaluate({'high': high, 'low': low, 'close': close}, ['dif', 'boll_upper'])
+    np.testing.assert_allclose(panel_values['dif'], panel_macd(close)[0], equal_nan=True)
+    np.testing.assert_allclose(panel_values['boll_upper'], panel_boll(close)[1], equal_nan=True)
+    print("✅ 指标依赖图测试通过")
+
+
+def test_indicator_cache(tmp_path):
+    """测试指标缓存: 按内容命中、默认参数归一、LRU 淘汰、磁盘层跨实例复用"""
+    previous = get_indicator_cache()
+    try:
+        cache = IndicatorCache(maxsize=2)
+        set_indicator_cache(cache)
+        close = pd.Series(np.random.default_rng(0).random(100).cumsum())
+
+        first = calculate_boll(close, 20, 2.0)
+        again = calculate_boll(close.copy())  # 内容相同、默认参数相同
+        assert cache.stats['misses'] == 1 and cache.stats['hits'] == 1
+        pd.testing.assert_series_equal(first[1], again[1])
+
+        # 修改返回值不影响缓存
+        again[0].iloc[-1] = -1.0
+        assert calculate_boll(close)[0].iloc[-1] == first[0].iloc[-1]
+
+        # 内容或参数不同则未命中，超过容量时淘汰最久未使用的结果
+        calculate_boll(close + 1)
+        calculate_boll(close, 30)
+        assert cache.stats['misses'] == 3 and cache.stats['evictions'] == 1 and len(cache) == 2
+
+        # 磁盘层: 新的缓存实例 (模拟下一次运行) 直接读盘
+        set_indicator_cache(IndicatorCache(root=str(tmp_path)))
+        calculate_macd(close)
+        disk = IndicatorCache(root=str(tmp_path))
+        set_indicator_cache(disk)
+        dif, dea, hist = calculate_macd(close)
+        assert disk.stats['disk_hits'] == 1 and disk.stats['misses'] == 0
+        pd.testing.assert_series_equal(dif, calculate_macd.uncached(close)[0])
+
+        # 面板结果以只读视图返回
+        closes = np.vstack([close.to_numpy()] * 3)
+        panel_sma(closes, 5)
+        assert not panel_sma(closes, 5).flags.writeable
+        assert disk.stats['hits'] >= 1
+
+        # 未开启写时复制 (pandas 2 默认) 时返回深拷贝，原地修改不影响缓存
+        import indicators.cache as cache_module
+        original = cache_module._copy_on_write
+        cache_module._copy_on_write = lambda: False
+        try:
+            set_indicator_cache(IndicatorCache())
+            first_hit, second_hit = calculate_sma(close, 5), calculate_sma(close, 5)
+            assert not np.shares_memory(first_hit.to_numpy(), second_hit.to_numpy())
+        finally:
+            cache_module._copy_on_write = original
+        assert np.shares_memory(calculate_sma(close, 5).to_numpy(), calculate_sma(close, 5).to_numpy())
+
+        # 内存层按字节数限制: 超出时淘汰最旧的结果，单个结果超过上限时不进入内存层
+        row = closes[:1]
+        bounded = IndicatorCache(max_bytes=3 * row.nbytes)
+        set_indicator_cache(bounded)
+        for window in (2, 3, 4, 5):
+            panel_sma(row, window)
+        assert len(bounded) == 3 and bounded.nbytes == 3 * row.nbytes and bounded.stats['evictions'] == 1
+        panel_sma(np.vstack([row] * 4), 5)
+        assert bounded.stats['oversized'] == 1 and len(bounded) == 3
+
+        # 磁盘层按大小限制，删除最久未使用的文件
+        pruned = IndicatorCache(root=str(tmp_path / 'bounded'))
+        set_indicator_cache(pruned)
+        panel_sma(row, 2)
+        (_, file_size, _), = pruned._disk_files()
+        pruned.max_disk_bytes = int(2.5 * file_size)       # 最多容纳两个文件
+        for window in (3, 4):
+            panel_sma(row, window)
+        files = [path for _, _, path in pruned._disk_files()]
+        assert len(files) == 2 and pruned.stats['disk_evictions'] == 1
+    finally:
+        set_indicator_cache(previous)
+    print("✅ 指标缓存测试通过")
+
+
+def test_float32_precision():
+    """测试 float32 精度: 输出为 float32，与 float64 的差异在容差内，缓存按精度区分"""
+    high, low, close = make_panel()
+    h, l, c = pd.Series(high[0]), pd.Series(low[0]), pd.Series(close[0])
+    cases = [
+        (calculate_sma, (c, 20)), (calculate_ema, (c, 12)), (calculate_macd, (c,)),
+        (calculate_rsi, (c, 14)), (calculate_kdj, (h, l, c)), (calculate_boll, (c,)),
+        (calculate_atr, (h, l, c)), (calculate_cci, (h, l, c)),
+        (panel_macd, (close,)), (panel_kdj, (high, low, close)), (panel_boll, (close,)), (panel_cci, (high, low, close)),
+    ]
+    for fn, args in cases:
+        report = compare_precision(fn, *args)
+        assert report['ok'], (fn.__name__, report)
+
+    with use_precision('float32'):
+        assert calculate_boll(c)[1].dtype == np.float32
+        assert panel_rsi(close).dtype == np.float32
+        values = IndicatorGraph().evaluate({'close': close, 'high': high, 'low': low}, ['dif', 'kdj_k', 'boll_upper'])
+        assert all(value.dtype == np.float32 for value in values.values())
+    assert calculate_boll(c)[1].dtype == np.float64
+    print("✅ float32 精度测试通过")
+
+
+def test_chunked_matches_full_history():
+    """测试分块计算: 依次传入各块的结果与一次性计算全部历史相同"""
+    high, low, close = make_panel(t=300)
+    volume = np.abs(np.random.default_rng(1).standard_normal(close.shape)) * 1000
+    data = {'high': high, 'low': low, 'close': close, 'volume': volume}
+    names = ['sma20', 'std20', 'ema12', 'dif', 'dea', 'macd_hist', 'rsi14', 'atr14', 'cci20',
+             'kdj_k', 'kdj_d', 'kdj_j', 'boll_upper', 'boll_bandwidth', 'obv']
+    expected = IndicatorGraph().evaluate(data, names)
+
+    for size in (1, 7, 37, 300):
+        chunked = ChunkedIndicators(names, graph=IndicatorGraph())
+        parts = [chunked.update({k: v[:, i:i + size] for k, v in data.items()}) for i in range(0, 300, size)]
+        assert chunked.bars == 300
+        for name in names:
+            got = np.concatenate([part[name] for part in parts], axis=1)
+            np.testing.assert_allclose(got, expected[name], atol=1e-8, err_msg=f"{name} @ {size}")
+
+    assert ChunkedIndicators(['sma5']).update({'close': close[:, :0]})['sma5'].shape == (6, 0)
+    print("✅ 分块指标测试通过")
+
+
+def test_pattern_engine():
+    """测试向量化形态扫描: 滚动斜率与 polyfit 一致，头肩顶与逐窗口搜索一致，面板与单序列一致"""
+    high, low, close = make_panel(n=8, t=150)
+    slope = rolling_slope(close, 20)
+    for i in (0, 2):
+        for end in range(19, 150, 13):
+            window = close[i, end - 19:end + 1]
+            if np.isnan(window).any():
+                assert np.isnan(slope[i, end])
+            else:
+                assert slope[i, end] == pytest.approx(np.polyfit(range(20), window, 1)[0], abs=1e-9)
+
+    peaks, troughs = local_extrema(close)
+    inner = close[:, 1:-1]
+    with np.errstate(invalid='ignore'):
+        assert np.array_equal(peaks[:, 1:-1], (inner > close[:, :-2]) & (inner > close[:, 2:]))
+        assert np.array_equal(troughs[:, 1:-1], (inner < close[:, :-2]) & (inner < close[:, 2:]))
+
+    def brute_force(prices, top=True, window=40):
+        """原 PatternAnalyser 的逐窗口搜索 (头肩底在局部低点上对称判断)"""
+        sign = 1 if top else -1
+        last = -1
+        for i in range(len(prices) - window):
+            segment = sign * prices[i:i + window]
+            found = [j for j in range(1, window - 1) if segment[j] > segment[j - 1] and segment[j] > segment[j + 1]]
+            if len(found) >= 3:
+                left, head, right = prices[i + found[0]], prices[i + found[1]], prices[i + found[2]]
+                if top:
+                    neckline = min(prices[i + found[0]:i + found[1]].min(), prices[i + found[1]:i + found[2]].min())
+                    ok = head > left and head > right and abs(left - right) / head < 0.1 and left > neckline and right > neckline
+                else:
+                    neckline = max(prices[i + found[0]:i + found[1]].max(), prices[i + found[1]:i + found[2]].max())
+                    ok = head < left and head < right and abs(left - right) / left < 0.1 and left < neckline and right < neckline
+                if ok:
+                    last = max(last, i + found[2])
+        return last
+
+    top, bottom = head_and_shoulders(close)
+    assert top.tolist() == [brute_force(row) for row in close]
+    assert bottom.tolist() == [brute_force(row, top=False) for row in close]
+    assert head_and_shoulders(close[0]) == (top[0], bottom[0])
+
+    found = scan_patterns(high, low, close)
+    for i in range(len(close)):
+        single = scan_patterns(high[i], low[i], close[i])
+        assert all(bool(single[name]) == bool(found[name][i]) for name in found)
+    print("✅ 形态扫描测试通过")
+
+
+def test_panel_composite_ranking():
+    """测试面板综合评分与逐只评分一致，截面排名与 pandas 一致，top_k 与完整排序一致"""
+    high, low, close = make_panel(n=8, t=150)
+    analyzer = CompositeIndicator()
+    score = analyzer.panel_composite_signal({'high': high, 'low': low, 'close': close})
+    assert score.shape == close.shape
+
+    for i in range(len(close)):
+        df = pd.DataFrame({'high': high[i], 'low': low[i], 'close': close[i]})
+        df = analyzer.calculate_all_indicators(df)
+        single = analyzer.generate_composite_signal(df).to_numpy()
+        # 原来的逐项布尔赋值
+        expected = np.zeros(len(df))
+        for bull, bear in (('sma20', 'sma60'), ('dif', 'dea'), ('kdj_k', 'kdj_d')):
+            expected += 0.2 * ((df[bull] > df[bear]).astype(int) - (df[bull] < df[bear]).astype(int)).to_numpy()
+        expected += 0.2 * ((df['rsi14'] < 30).astype(int) - (df['rsi14'] > 70).astype(int)).to_numpy()
+        expected += 0.2 * ((df['close'] < df['boll_lower']).astype(int) - (df['close'] > df['boll_upper']).astype(int)).to_numpy()
+        np.testing.assert_allclose(single, expected)
+        suspended = np.isnan(close[i])
+        assert np.isnan(score[i, suspended]).all()
+        np.testing.assert_allclose(score[i, ~suspended], single[~suspended])
+
+    ranks = cs_rank(score, ascending=False, pct=True)
+    np.testing.assert_allclose(ranks, pd.DataFrame(score).rank(axis=0, ascending=False, pct=True).to_numpy())
+
+    best = top_k(score, 3)
+    for day in range(score.shape[1]):
+        column = score[:, day]
+        order = [i for i in np.lexsort((np.arange(len(column)), -np.nan_to_num(column, nan=-np.inf))) if not np.isnan(column[i])]
+        assert best[:, day].tolist() == (order + [-1] * 3)[:3]
+    assert (top_k(score[:, -1], 20)[len(close):] == -1).all()    # 股票数不足 k 时补 -1
+    print("✅ 面板综合评分测试通过")
+
+
+def test_factor_expressions(tmp_path):
+    """测试因子表达式: 结果与 pandas 逐列计算一致，公共子表达式只算一次，PricePanel 与分块计算结果相同"""
+    from market_data.panel import PricePanel
+
+    high, low, close = make_panel(t=120)
+    volume = np.round(np.abs(np.random.default_rng(2).standard_normal(close.shape)) * 10)   # 含大量同值
+    data = {'high': high, 'low': low, 'close': close, 'volume': volume}
+    factors = {
+        'volatility': 'ts_std(close / delay(close, 1) - 1, 20)',
+        'deviation': '(close - ts_mean(close, 20)) / ts_mean(close, 20)',
+        'volume_rank': 'ts_rank(volume, 10)',
+        'score': 'cs_rank(-(ts_mean(close, 20) / close))',
+        'rsi_z': 'cs_zscore(rsi14) * 2 + abs(delay(close, 3) - close)',
+    }
+    graph = IndicatorGraph()
+    before = graph.stats['evaluated']
+    values = compute_factors(data, factors, graph=graph)
+
+    wide = pd.DataFrame(close.T)
+    sma20 = wide.rolling(20).mean()
+    rsi = pd.DataFrame(panel_rsi(close, 14).T)
+    expected = {
+        'volatility': (wide / wide.shift(1) - 1).rolling(20).std(),
+        'deviation': (wide - sma20) / sma20,
+        'volume_rank': pd.DataFrame(volume.T).rolling(10).rank(pct=True),
+        'score': (-(sma20 / wide)).rank(axis=1, pct=True),
+        'rsi_z': rsi.sub(rsi.mean(axis=1), axis=0).div(rsi.std(axis=1, ddof=0), axis=0) * 2 + (wide.shift(3) - wide).abs(),
+    }
+    for name, frame in expected.items():
+        np.testing.assert_allclose(values[name], frame.to_numpy().T, atol=1e-10, err_msg=name)
+
+    # ts_mean(close, 20) 与 sma20 是同一个节点，在 deviation 和 score 中只算一次
+    assert parse_factor('ts_mean(close, 20)', graph) is graph.resolve('sma20')
+    assert parse_factor('2 * close', graph) is parse_factor('close * 2.0', graph) is parse_factor('close * (1 + 1)', graph)
+    order = graph.plan({name: parse_factor(expression, graph) for name, expression in factors.items()})
+    assert graph.stats['evaluated'] - before == sum(node.op != 'source' for node in order)
+
+    for bad in ('foo(close)', 'close.real', 'ts_mean(close, 2.5)', 'ts_mean(close)', 'delay(close, -1)',
+                'unknown + 1', 'close +', 'ts_mean(5, 3)', '__import__("os")'):
+        with pytest.raises(ValueError):
+            parse_factor(bad, graph)
+    with pytest.raises(ValueError):
+        compute_factors(pd.DataFrame({'close': close[0]}), ['cs_rank(close)'])
+    single = compute_factors(pd.DataFrame({'close': close[0]}), ['ts_rank(close, 5)'])['ts_rank(close, 5)']
+    np.testing.assert_allclose(single.to_numpy(), rolling_rank(close[0], 5))
+
+    # 内存映射面板: 只读取用到的字段，结果与传入数组相同
+    dates = pd.bdate_range('2024-01-01', periods=close.shape[1])
+    bars = {f'{i:06d}': pd.DataFrame({'日期': dates, '最高': high[i], '最低': low[i], '收盘': close[i], '成交量': volume[i]})
+            for i in range(len(close))}
+    panel = PricePanel.build(bars, root=str(tmp_path / 'panel'))
+    from_panel = compute_factors(panel, factors, symbols=['000001', '000003', '000004'], start=dates[10])
+    subset = {k: v[[1, 3, 4], 10:] for k, v in data.items()}
+    for name, value in compute_factors(subset, factors).items():
+        np.testing.assert_allclose(from_panel[name], value, atol=1e-10, err_msg=name)
+
+    # 未传入依赖图时每次调用新建，全局依赖图不会随表达式增长
+    from indicators.graph import compute_indicators, get_indicator_graph
+    nodes_before = get_indicator_graph().stats['nodes']
+    compute_factors(subset, {'extra': 'ts_mean(close, 7) / ts_std(close, 11)'})
+    compute_indicators(pd.DataFrame({'close': close[0]}), ['sma33', 'ema44'])
+    assert get_indicator_graph().stats['nodes'] == nodes_before
+
+    # 时间序列部分可以分块计算
+    nodes = {name: parse_factor(factors[name], graph) for name in ('volatility', 'deviation', 'volume_rank')}
+    chunked = ChunkedIndicators(nodes, graph=graph)
+    parts = [chunked.update({k: v[:, i:i + 13] for k, v in data.items()}) for i in range(0, 120, 13)]
+    for name in nodes:
+        np.testing.assert_allclose(np.concatenate([p[name] for p in parts], axis=1), values[name], atol=1e-10, err_msg=name)
+    print("✅ 因子表达式测试通过")
+
+
 if __name__ == "__main__":
     test_sma()
     test_ema()
     test_macd()
     test_rsi()
+    test_window_grid()
+    test_panel_matches_single_series()
+    test_panel_wide_dataframe()
+    test_rolling_kernels()
+    test_streaming_matches_batch()
+    test_obv_and_divergence_vectorized()
+    test_indicator_graph_shares_nodes()
+    test_float32_precision()
+    test_chunked_matches_full_history()
+    test_pattern_engine()
+    test_panel_composite_ranking()
+    import tempfile, pathlib
+    test_indicator_cache(pathlib.Path(tempfile.mkdtemp()))
+    test_factor_expressions(pathlib.Path(tempfile.mkdtemp()))
     print("\n✅ 所有指标测试通过！")
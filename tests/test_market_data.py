@@ -0,0 +1,674 @@
+"""
+test_market_data.py - 行情数据模块单元测试
+"""
+import asyncio
+import pickle
+import threading
+import time
+
+import pytest
+import numpy as np
+import pandas as pd
+import sys
+sys.path.insert(0, '..')
+
+from market_data.provider import MarketDataProvider, RecordingProvider, ReplayProvider
+from market_data.store import BarStore, apply_adjustment
+from market_data.minute_store import MinuteBarStore
+from market_data.financial import FinancialStore
+from market_data.fetcher import BulkFetcher
+from market_data.panel import PricePanel
+from market_data.resample import BarResampler, period_labels, resample_bars, resample_panel
+from market_data.schema import bar_arrays, concat_bars, normalize_bars, to_source_columns
+from market_data.trading_calendar import TradingCalendar
+from market_data.universe import BOARD_NAMES, UniverseStore, classify_boards
+
+
+def make_hist(start, end, factor=1.0):
+    """生成 ak.stock_zh_a_hist 格式的模拟日线 (价格只由日期决定)"""
+    dates = pd.bdate_range(start, end)
+    close = (10 + (dates - pd.Timestamp('2020-01-01')).days.values * 0.01) * factor
+    return pd.DataFrame({
+        '日期': dates.date,
+        '开盘': close,
+        '收盘': close,
+        '最高': close + 0.2,
+        '最低': close - 0.2,
+        '成交量': np.full(len(dates), 1000),
+    })
+
+
+class StubProvider(MarketDataProvider):
+    """记录请求区间的模拟数据源"""
+
+    def __init__(self):
+        self.calls = []
+        self.factor = 1.0  # 模拟前复权因子
+
+    def get_bars(self, symbol, start_date=None, end_date=None, adjust='qfq'):
+        self.calls.append((symbol, start_date, end_date, adjust))
+        return make_hist(start_date, end_date, self.factor)
+
+    def get_spot(self):
+        return pd.DataFrame({'代码': ['000001', '600000'], '名称': ['平安银行', '浦发银行']})
+
+    def get_financial_abstract(self, symbol, indicator='按报告期'):
+        self.calls.append((symbol, 'financial'))
+        return pd.DataFrame({
+            '报告期': ['2024-09-30', '2024-06-30', '2024-03-31', '2023-12-31'],
+            '净资产收益率': ['9.1%', '6.2%', '3.0%', '12.5%'],
+        })
+
+
+def test_bar_store_reads_from_disk(tmp_path):
+    """测试已覆盖区间直接读盘"""
+    provider = StubProvider()
+    store = BarStore(root=str(tmp_path), provider=provider)
+
+    first = store.get_bars('000001', '20231201', '20240131')
+    second = store.get_bars('000001', '20231215', '20240115')
+
+    assert len(provider.calls) == 1
+    assert len(first) == len(pd.bdate_range('2023-12-01', '2024-01-31'))
+    assert second['日期'].min() == pd.Timestamp('2023-12-15')
+    assert second['日期'].max() == pd.Timestamp('2024-01-15')
+    assert (tmp_path / 'qfq' / '000001' / '2023.parquet').exists()
+    assert (tmp_path / 'qfq' / '000001' / '2024.parquet').exists()
+    print("✅ 本地读盘测试通过")
+
+
+def test_bar_store_fetches_only_missing(tmp_path):
+    """测试只回源缺失区间"""
+    provider = StubProvider()
+    store = BarStore(root=str(tmp_path), provider=provider)
+
+    store.get_bars('000001', '20240201', '20240229')
+    df = store.get_bars('000001', '20240115', '20240315')
+
+    assert len(provider.calls) == 3
+    assert provider.calls[1][1:3] == (pd.Timestamp('2024-01-15'), pd.Timestamp('2024-01-31'))
+    # 尾部从水位线当天开始请求，用于校验复权
+    assert provider.calls[2][1:3] == (pd.Timestamp('2024-02-29'), pd.Timestamp('2024-03-15'))
+    assert df['日期'].is_monotonic_increasing
+    assert not df['日期'].duplicated().any()
+    print("✅ 缺失区间回源测试通过")
+
+
+def test_bar_store_watermark_refetch_on_adjust_change(tmp_path):
+    """测试水位线推进及复权变化后重新拉取"""
+    provider = StubProvider()
+    store = BarStore(root=str(tmp_path), provider=provider)
+
+    store.get_bars('000001', '20240101', '20240131')
+    assert store.watermark('000001') == pd.Timestamp('2024-01-31')
+
+    store.get_bars('000001', '20240101', '20240209')
+    assert store.watermark('000001') == pd.Timestamp('2024-02-09')
+    assert len(provider.calls) == 2
+
+    # 除权后前复权价格整体变化
+    provider.factor = 0.9
+    df = store.get_bars('000001', '20240101', '20240216')
+    assert len(provider.calls) == 4
+    assert provider.calls[-1][1:3] == (pd.Timestamp('2024-01-01'), pd.Timestamp('2024-02-16'))
+    expected = make_hist('20240101', '20240216', 0.9)['收盘'].values
+    assert np.allclose(df['收盘'].values, expected)
+    print("✅ 水位线与复权校验测试通过")
+
+
+def test_financial_store_as_of(tmp_path):
+    """测试按时点查询财务报告"""
+    provider = StubProvider()
+    store = FinancialStore(root=str(tmp_path), provider=provider)
+
+    # 年报截止日 2024-04-30，一季报同日截止，取报告期更晚的一季报
+    assert store.as_of('000001', '2024-04-29') is None
+    assert store.as_of('000001', '2024-04-30')['报告期'] == '2024-03-31'
+    assert store.as_of('000001', '2024-09-02')['报告期'] == '2024-06-30'
+    assert store.as_of('000001', '2024-11-01')['净资产收益率'] == '9.1%'
+    assert len(provider.calls) == 1
+
+    # 新实例从本地读取，不再回源
+    reloaded = FinancialStore(root=str(tmp_path), provider=provider)
+    assert reloaded.as_of('000001', '2024-09-02')['报告期'] == '2024-06-30'
+    assert len(provider.calls) == 1
+    print("✅ 按时点财务数据测试通过")
+
+
+def test_record_and_replay(tmp_path):
+    """测试录制后离线回放"""
+    upstream = StubProvider()
+    recorder = RecordingProvider(upstream, str(tmp_path))
+    recorder.get_bars('000001', '20240101', '20240131')
+    recorder.get_bars('000001', '20240201', '20240229')
+    spot = recorder.get_spot()
+
+    replay = ReplayProvider(str(tmp_path))
+    bars = replay.get_bars('000001', '20240125', '20240205')
+
+    assert list(bars['日期']) == list(pd.bdate_range('2024-01-25', '2024-02-05'))
+    assert replay.get_spot().equals(spot)
+    with pytest.raises(KeyError):
+        replay.get_bars('600000', '20240101', '20240131')
+    print("✅ 录制回放测试通过")
+
+
+def test_universe_matches_string_filters(tmp_path):
+    """测试股票池预计算过滤与逐行字符串过滤结果一致"""
+    codes = ['600000', '000001', '300750', '688981', '002415', '301236', '830799', '600519', '000002', '601318']
+    spot = pd.DataFrame({
+        '代码': codes,
+        '名称': ['浦发银行', '平安银行', '宁德时代', '中芯国际', '海康威视', '*ST某某', '某某北交', '贵州茅台', '万科A', '退市某某'],
+        '最新价': np.arange(len(codes), dtype=float),
+        '流通市值': [3e11, 2e11, 9e11, 4e11, 3e11, np.nan, 1e9, 2e12, 1e11, 5e11],
+    })
+
+    class SpotProvider(StubProvider):
+        def get_spot(self):
+            self.calls.append('spot')
+            return spot
+
+    provider = SpotProvider()
+    store = UniverseStore(root=str(tmp_path), provider=provider)
+    snapshot = store.get()
+
+    expected = spot[~spot['名称'].str.contains('ST|退')]
+    expected = expected[~expected['代码'].str.startswith(('300', '688'))]
+    expected = expected.nlargest(3, '流通市值')[['代码', '名称', '最新价']].reset_index(drop=True)
+    selected = snapshot.select(snapshot.mask(exclude_prefixes=('300', '688')), top_n=3, columns=['代码', '名称', '最新价'])
+    assert selected.equals(expected)
+
+    mask = snapshot.mask(exclude_prefixes=('300', '301', '688', '8', '9', '4'))
+    assert list(snapshot.select(mask)['代码']) == ['600000', '000001', '002415', '600519', '000002']
+    assert [BOARD_NAMES[b] for b in classify_boards(['688981', '300750', '605001', '002415', '830799', '301236'])] == \
+        ['科创板', '创业板', '上海主板', '深圳主板', '未知', '未知']
+
+    # 同一天只拉取一次，历史日期使用最近一份快照
+    store.get()
+    assert store.get('2000-01-03') is snapshot
+    assert store.get('2000-01-03') is snapshot
+    assert provider.calls == ['spot']
+    # 回退的日期不计入已保存的快照
+    assert store.dates() == [snapshot.date.strftime('%Y-%m-%d')]
+    reloaded = UniverseStore(root=str(tmp_path), provider=provider)
+    assert reloaded.get().select(mask).equals(snapshot.select(mask))
+    assert provider.calls == ['spot']
+    print("✅ 股票池快照测试通过")
+
+
+def test_bulk_fetcher_concurrency_retry_and_coalescing():
+    """测试批量拉取的并发上限、重试、请求合并与限流"""
+
+    class SlowProvider(StubProvider):
+        def __init__(self):
+            super().__init__()
+            self.lock = threading.Lock()
+            self.active = 0
+            self.peak = 0
+            self.failures = {'600000': 2}
+
+        def get_bars(self, symbol, start_date=None, end_date=None, adjust='qfq'):
+            with self.lock:
+                self.calls.append(symbol)
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+                fail = self.failures.get(symbol, 0) > 0
+                if fail:
+                    self.failures[symbol] -= 1
+            try:
+                time.sleep(0.02)
+                if fail:
+                    raise ConnectionError('模拟网络错误')
+                return make_hist(start_date, end_date)
+            finally:
+                with self.lock:
+                    self.active -= 1
+
+    provider = SlowProvider()
+    fetcher = BulkFetcher(provider, max_concurrency=3, retries=2, backoff=0.001)
+    symbols = [f'{i:06d}' for i in range(8)] + ['600000', '000001', '000001']
+    requests = [(s, '20240101', '20240131') for s in symbols]
+    results = fetcher.fetch(requests)
+
+    assert provider.peak <= 3
+    assert provider.calls.count('000001') == 1
+    assert fetcher.stats['coalesced'] == 2
+    assert fetcher.stats['retries'] == 2 and fetcher.stats['failed'] == 0
+    assert all(len(df) == len(pd.bdate_range('2024-01-01', '2024-01-31')) for df in results)
+    # 合并的请求拿到各自的副本
+    assert results[-1] is not results[-2] and results[-1].equals(results[-2])
+
+    # fetch_async 接受生成器，回调拿到原始请求
+    done = []
+    asyncio.run(fetcher.fetch_async(((s, '20240101', '20240131') for s in ['000001', '000002']),
+                                    on_done=lambda request, df, error: done.append(request[0])))
+    assert sorted(done) == ['000001', '000002']
+
+    # 重试次数耗尽后返回 None
+    provider.failures['600000'] = 5
+    failed = BulkFetcher(provider, retries=1, backoff=0.001).fetch([('600000', '20240101', '20240131')])
+    assert failed == [None]
+
+    # 令牌桶: 突发 1 个，之后每秒 50 个
+    limited = BulkFetcher(provider, max_concurrency=8, rate=50, burst=1)
+    started = time.perf_counter()
+    limited.fetch([(f'{i:06d}', '20240101', '20240105') for i in range(6)])
+    assert time.perf_counter() - started >= 5 / 50 * 0.9
+    # 令牌桶在多次拉取间共用，下一批不会重新获得突发量
+    started = time.perf_counter()
+    limited.fetch([(f'{i:06d}', '20240108', '20240112') for i in range(3)])
+    assert time.perf_counter() - started >= 3 / 50 * 0.9
+    print("✅ 批量拉取测试通过")
+
+
+def test_price_panel_views(tmp_path):
+    """测试价格面板的构建、零拷贝切片与跨进程传递"""
+    bars = {
+        '000001': make_hist('20240101', '20240331'),
+        '000002': make_hist('20240201', '20240331', factor=2.0),
+        '600000': make_hist('20240101', '20240229'),
+    }
+    panel = PricePanel.build(bars, root=str(tmp_path / 'panel'))
+
+    assert panel.shape == (3, len(pd.bdate_range('2024-01-01', '2024-03-31')), 6)
+    close = panel.window(20, symbols=['000001', '000002'], fields='close')
+    assert close.shape == (2, 20)
+    assert np.shares_memory(close, panel.data)
+    assert np.allclose(close[1], make_hist('20240201', '20240331', 2.0)['收盘'].values[-20:])
+
+    # 不连续的股票只复制所选部分
+    picked = panel.select(['600000', '000001'], '20240110', '20240131', fields=['open', 'close'])
+    assert picked.shape == (2, len(pd.bdate_range('2024-01-10', '2024-01-31')), 2)
+    cols = panel.date_slice('20240110', '20240131')
+    np.testing.assert_array_equal(picked, panel.data[[2, 0]][:, cols][..., [0, 3]])
+    # 连续的股票和连续的字段都是视图
+    hlc = panel.window(10, symbols=['000001', '000002'], fields=['high', 'low', 'close'])
+    assert np.shares_memory(hlc, panel.data)
+    np.testing.assert_array_equal(hlc[..., 2], panel.window(10, symbols=['000001', '000002'], fields='close'))
+    assert np.isnan(panel.select(['000002'], '20240101', '20240131', fields='close')).all()
+    assert np.isnan(panel.field('amount')).all()
+
+    df = panel.frame('000002')
+    assert df['日期'].min() == pd.Timestamp('2024-02-01')
+    assert np.allclose(df['收盘'].values, bars['000002']['收盘'].values)
+
+    # pickle 只包含路径，反序列化后重新映射同一份文件
+    assert len(pickle.dumps(panel)) < 200
+    reopened = pickle.loads(pickle.dumps(panel))
+    assert np.array_equal(reopened.field('close'), panel.field('close'), equal_nan=True)
+    print("✅ 价格面板测试通过")
+
+
+def test_bar_store_local_adjustment(tmp_path):
+    """测试不复权日线 + 复权因子在读取时计算前/后复权"""
+
+    class FactorProvider(StubProvider):
+        def __init__(self):
+            super().__init__()
+            self.factors = pd.DataFrame({
+                '日期': pd.to_datetime(['2020-01-02', '2024-02-01']),
+                '复权因子': [1.0, 1.1],
+            })
+
+        def get_adjust_factors(self, symbol):
+            self.calls.append((symbol, 'factors'))
+            return self.factors
+
+    provider = FactorProvider()
+    store = BarStore(root=str(tmp_path), provider=provider)
+    raw = make_hist('20240101', '20240229')
+    raw['日期'] = pd.to_datetime(raw['日期'])
+    before = raw['日期'] < pd.Timestamp('2024-02-01')
+
+    qfq = store.get_bars('000001', '20240101', '20240229', adjust='qfq')
+    hfq = store.get_bars('000001', '20240101', '20240229', adjust='hfq')
+    assert np.allclose(qfq['收盘'].values, np.where(before, raw['收盘'] / 1.1, raw['收盘']))
+    assert np.allclose(hfq['收盘'].values, np.where(before, raw['收盘'], raw['收盘'] * 1.1))
+    assert (qfq['成交量'].values == raw['成交量'].values).all()
+    # 只缓存不复权数据，前/后复权共用
+    assert (tmp_path / 'none' / '000001' / '2024.parquet').exists()
+    assert not (tmp_path / 'qfq').exists()
+    assert [c for c in provider.calls if c[1] != 'factors'] == [('000001', pd.Timestamp('2024-01-01'), pd.Timestamp('2024-02-29'), '')]
+
+    # 新的除权除息只新增一条因子，历史日线不重新拉取
+    provider.factors = pd.DataFrame({
+        '日期': pd.to_datetime(['2020-01-02', '2024-02-01', '2024-03-01']),
+        '复权因子': [1.0, 1.1, 1.21],
+    })
+    store._factors.clear()
+    store.factors('000001', '20240229')  # 本地因子仍在有效期内
+    assert provider.calls.count(('000001', 'factors')) == 1
+    adjusted = apply_adjustment(raw, provider.factors, 'qfq')
+    assert np.allclose(adjusted['收盘'].values, np.where(before, raw['收盘'] / 1.21, raw['收盘'] / 1.1))
+    print("✅ 本地复权测试通过")
+
+
+def test_bar_store_factor_refresh_on_corporate_action(tmp_path):
+    """测试只在新 K 线出现除权除息时刷新复权因子，以及复权后的涨跌额"""
+
+    class ActionProvider(StubProvider):
+        def __init__(self):
+            super().__init__()
+            self.ex_dates = pd.to_datetime(['2024-04-01'])
+            self.factors = pd.DataFrame({'日期': pd.to_datetime(['2020-01-02']), '复权因子': [1.0]})
+
+        def get_bars(self, symbol, start_date=None, end_date=None, adjust='qfq'):
+            df = super().get_bars(symbol, start_date, end_date, adjust)
+            dates = pd.DatetimeIndex(df['日期'])
+            prev_close = 10 + ((dates - pd.offsets.BDay(1)) - pd.Timestamp('2020-01-01')).days.values * 0.01
+            # 除权除息日的涨跌额相对除权参考价 (昨收 / 1.1)
+            reference = np.where(dates.isin(self.ex_dates), prev_close / 1.1, prev_close)
+            df['涨跌额'] = df['收盘'].values - reference
+            return df
+
+        def get_adjust_factors(self, symbol):
+            self.calls.append((symbol, 'factors'))
+            return self.factors
+
+    provider = ActionProvider()
+    store = BarStore(root=str(tmp_path), provider=provider)
+    store.get_bars('000001', '20240101', '20240229', adjust='qfq')
+    assert provider.calls.count(('000001', 'factors')) == 1
+    # 模拟因子在 2024-02-29 检查过
+    store._set_factor_checked('000001', pd.Timestamp('2024-02-29'))
+
+    # 新 K 线没有除权除息: 不请求因子，检查日期随日线推进
+    store.get_bars('000001', '20240101', '20240329', adjust='qfq')
+    assert provider.calls.count(('000001', 'factors')) == 1
+    assert store._factor_checked('000001') == pd.Timestamp('2024-03-29')
+    store._factors.clear()
+    assert store._factor_checked('000001') == pd.Timestamp('2024-03-29')
+
+    # 周末读取: 日线已覆盖，之后只有非交易日，不请求因子
+    store.get_bars('000001', '20240101', '20240331', adjust='qfq')
+    assert provider.calls.count(('000001', 'factors')) == 1
+
+    # 2024-04-01 除权除息: 刷新因子
+    provider.factors = pd.DataFrame({'日期': pd.to_datetime(['2020-01-02', '2024-04-01']), '复权因子': [1.0, 1.1]})
+    qfq = store.get_bars('000001', '20240101', '20240430', adjust='qfq')
+    assert provider.calls.count(('000001', 'factors')) == 2
+    raw = store.read('000001', '20240101', '20240430', '')
+    before = (pd.to_datetime(raw['日期']) < pd.Timestamp('2024-04-01')).values
+    assert np.allclose(qfq['收盘'].values, np.where(before, raw['收盘'] / 1.1, raw['收盘']))
+    # 复权后的涨跌额等于复权收盘价的差，除权除息日也一致
+    assert np.allclose(qfq['涨跌额'].values[1:], np.diff(qfq['收盘'].values))
+    assert np.isclose(qfq['涨跌额'].values[0], raw['涨跌额'].values[0] / 1.1)
+    print("✅ 除权除息刷新复权因子测试通过")
+
+
+def test_trading_calendar(tmp_path):
+    """测试交易日历查询与本地存储跳过节假日"""
+    holidays = pd.to_datetime(['2024-02-12', '2024-02-13', '2024-02-14', '2024-02-15', '2024-02-16'])
+    days = pd.bdate_range('2024-01-01', '2024-12-31')
+    days = days[~days.isin(holidays)]
+    calendar = TradingCalendar(days.values)
+
+    assert not calendar.is_trading_day('2024-02-12')
+    assert calendar.is_trading_day('20240219')
+    assert calendar.next('2024-02-09') == pd.Timestamp('2024-02-19')
+    assert calendar.prev('2024-02-19') == pd.Timestamp('2024-02-09')
+    assert calendar.offset('2024-02-14', 0) == pd.Timestamp('2024-02-09')
+    assert calendar.offset('2024-02-19', -19) == days[days.get_loc(pd.Timestamp('2024-02-19')) - 19]
+    assert calendar.rollforward('2024-02-10') == pd.Timestamp('2024-02-19')
+    assert calendar.count('2024-02-01', '2024-02-29') == len(days[(days >= '2024-02-01') & (days <= '2024-02-29')])
+    assert list(calendar.range('2024-02-08', '2024-02-20')) == list(pd.to_datetime(['2024-02-08', '2024-02-09', '2024-02-19', '2024-02-20']))
+    assert list(calendar.is_trading_days(['2024-02-09', '2024-02-12', '2023-06-01'])) == [True, False, False]
+    assert list(calendar.offsets(['2024-02-12', '2024-02-19'], 1)) == list(pd.to_datetime(['2024-02-19', '2024-02-20']))
+    with pytest.raises(IndexError):
+        calendar.offset('2024-01-02', -5)
+
+    # 已覆盖到节前最后一个交易日，整个假期内的请求不再回源
+    provider = StubProvider()
+    store = BarStore(root=str(tmp_path), provider=provider, calendar=calendar)
+    store.get_bars('000001', '20240102', '20240209')
+    store.get_bars('000001', '20240102', '20240218')
+    assert len(provider.calls) == 1
+    store.get_bars('000001', '20240102', '20240219')
+    assert len(provider.calls) == 2
+    print("✅ 交易日历测试通过")
+
+
+def test_canonical_bar_schema():
+    """测试规范日线格式的类型、内存占用与零拷贝"""
+    dates = pd.bdate_range('2015-01-01', '2024-12-31')
+    n = len(dates)
+    rng = np.random.default_rng(0)
+    raw = pd.DataFrame({
+        '日期': dates.strftime('%Y-%m-%d'),
+        '股票代码': ['000001'] * n,
+        '开盘': rng.uniform(10, 11, n),
+        '收盘': rng.uniform(10, 11, n),
+        '最高': rng.uniform(11, 12, n),
+        '最低': rng.uniform(9, 10, n),
+        '成交量': rng.integers(1_000, 1_000_000, n),
+        '成交额': rng.uniform(1e7, 1e9, n),
+        '振幅': rng.uniform(0, 10, n),
+        '涨跌幅': rng.uniform(-10, 10, n),
+        '涨跌额': rng.uniform(-1, 1, n),
+        '换手率': rng.uniform(0, 5, n),
+    })
+
+    bars = normalize_bars(raw)
+    assert bars['date'].dtype == np.int32 and bars['close'].dtype == np.float32
+    assert bars['volume'].dtype == np.int64 and isinstance(bars['symbol'].dtype, pd.CategoricalDtype)
+    assert bars['date'].iloc[0] == (dates[0] - pd.Timestamp('1970-01-01')).days
+    assert np.allclose(bars['close'].values, raw['收盘'].values, rtol=1e-6)
+    assert bars.memory_usage(deep=True).sum() < raw.memory_usage(deep=True).sum() / 2
+
+    # 已规范化的数据再次转换不复制，数组为内部数据的视图
+    again = normalize_bars(bars)
+    assert np.shares_memory(again['close'].to_numpy(), bars['close'].to_numpy())
+    arrays = bar_arrays(bars)
+    assert np.shares_memory(arrays['close'], bars['close'].to_numpy())
+    assert list(to_source_columns(bars).columns[:3]) == ['日期', '股票代码', '开盘']
+
+    other = normalize_bars(raw.drop(columns='股票代码').head(5), symbol='600000', date_format='datetime')
+    assert other['date'].dtype.kind == 'M'
+    merged = concat_bars([bars.head(5), normalize_bars(raw.drop(columns='股票代码').head(5), symbol='600000')])
+    assert list(merged['symbol'].cat.categories) == ['000001', '600000']
+    print("✅ 规范日线格式测试通过")
+
+
+def test_boll_screener_incremental_state(tmp_path):
+    """测试布林带选股的增量状态: 只推进新增 K 线，与完整重算的信号一致"""
+    from tasks.boll_screener import BollScreener
+
+    dates = pd.bdate_range('2024-01-01', periods=160)
+    close = 10 + np.sin(np.arange(160) / 4) + np.random.default_rng(0).normal(0, 0.3, 160)
+    data = pd.DataFrame({'日期': dates, '收盘': close})
+
+    full = BollScreener(provider=StubProvider())
+    state_path = str(tmp_path / 'boll.json')
+    incremental = BollScreener(provider=StubProvider(), state_path=state_path)
+    signals = []
+    for end in range(60, 160):
+        expected = full.check_signals(data.iloc[:end])
+        window = data.iloc[:end] if end == 60 else data.iloc[end - 2:end]
+        got = incremental.check_signals(window, '000001')
+        assert got == expected
+        signals.append(got)
+    assert {'BUY', 'SELL'} <= set(signals)
+
+    # 状态日收盘价变化 (除权除息) 时不能沿用旧状态
+    rescaled = data.iloc[:160].assign(收盘=close * 0.9)
+    assert incremental.resume_position('000001', rescaled['日期'].to_numpy(), rescaled['收盘'].to_numpy()) is None
+    print("✅ 布林带增量状态测试通过")
+
+
+def test_resample_weekly_monthly(tmp_path):
+    """测试周线/月线合成与 pandas resample 一致，增量更新与整体合成一致"""
+    from indicators.cache import IndicatorCache, get_indicator_cache, set_indicator_cache
+    from indicators.panel import panel_sma
+
+    bars = {
+        '000001': make_hist('20240101', '20240630'),
+        '000002': make_hist('20240220', '20240630', factor=2.0),   # 次新股，前段整月缺失
+    }
+    bars['000001'].loc[30:40, '成交量'] = np.nan                  # 停牌
+    panel = PricePanel.build(bars, root=str(tmp_path / 'panel'))
+
+    for freq, rule in (('W', 'W-SUN'), ('M', 'ME')):
+        weekly, dates = panel.resample(freq)
+        for i, symbol in enumerate(panel.symbols):
+            frame = panel.frame(symbol).set_index('日期')
+            expected = frame.resample(rule).agg({'开盘': 'first', '最高': 'max', '最低': 'min', '收盘': 'last'}).dropna()
+            got = weekly['close'][i][~np.isnan(weekly['close'][i])]
+            np.testing.assert_allclose(got, expected['收盘'].to_numpy())
+            np.testing.assert_allclose(weekly['high'][i][~np.isnan(weekly['high'][i])], expected['最高'].to_numpy())
+        assert pd.Timestamp(dates[-1]) == pd.Timestamp('2024-06-28')
+
+        # 每天追加一根日线，与整体合成结果相同
+        fields = {name: panel.field(name) for name in ('open', 'high', 'low', 'close', 'volume')}
+        resampler = BarResampler(freq)
+        resampler.update({k: v[:, :40] for k, v in fields.items()}, panel.dates[:40])
+        for day in range(40, len(panel.dates)):
+            changed = resampler.update({k: v[:, day:day + 1] for k, v in fields.items()}, panel.dates[day:day + 1])
+            assert changed >= len(resampler) - 1
+        expected, _ = resample_panel(fields, panel.dates, freq)
+        for name in fields:
+            np.testing.assert_array_equal(resampler.bars[name], expected[name])
+        with pytest.raises(ValueError):
+            resampler.update({k: v[:, -1:] for k, v in fields.items()}, panel.dates[-1:])
+
+    # 单只股票的 DataFrame
+    monthly = resample_bars(bars['000001'], 'M')
+    assert list(monthly.columns) == ['日期', '开盘', '收盘', '最高', '最低', '成交量']
+    assert len(monthly) == 6 and monthly['成交量'].iloc[0] == 1000 * len(pd.bdate_range('2024-01-01', '2024-01-31'))
+
+    # 分钟线按交易时段分段: 60 分钟线每天 4 根
+    minutes = pd.date_range('2024-01-02 09:31', '2024-01-02 11:30', freq='min').append(
+        pd.date_range('2024-01-02 13:01', '2024-01-02 15:00', freq='min'))
+    assert np.unique(period_labels(minutes, '60min'), return_counts=True)[1].tolist() == [60, 60, 60, 60]
+
+    # 高周期指标与日线指标共用缓存，互不冲突
+    previous = get_indicator_cache()
+    set_indicator_cache(IndicatorCache())
+    try:
+        weekly, _ = panel.resample('W', fields=['close'])
+        daily_sma = panel_sma(panel.field('close'), 5)
+        weekly_sma = panel_sma(weekly['close'], 5)
+        assert weekly_sma.shape == weekly['close'].shape != daily_sma.shape
+        panel_sma(weekly['close'], 5)
+        assert get_indicator_cache().stats['hits'] == 1
+    finally:
+        set_indicator_cache(previous)
+    print("✅ 多周期 K 线测试通过")
+
+
+def test_minute_store_chunks(tmp_path):
+    """测试分钟线按月分区入库、只回源缺失区间、按块产出对齐面板"""
+    from indicators.chunked import ChunkedIndicators
+    from indicators.graph import IndicatorGraph
+
+    class MinuteProvider(MarketDataProvider):
+        def __init__(self):
+            self.calls = []
+
+        def get_minute_bars(self, symbol, start=None, end=None, period='1', adjust=''):
+            self.calls.append((symbol, start, end, period))
+            days = pd.bdate_range(pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize())
+            times = [day + pd.Timedelta(minutes=m) for day in days for m in range(9 * 60 + 35, 15 * 60 + 1, 5)
+                     if m <= 11 * 60 + 30 or m > 13 * 60]
+            times = pd.DatetimeIndex(times)
+            times = times[(times >= start) & (times <= end)]
+            if symbol == '000002':
+                times = times[times >= pd.Timestamp('2024-02-05')]   # 次新股
+            close = 10 + np.sin(np.arange(len(times)) / 7.0) + (times.dayofyear.values * 0.01)
+            return pd.DataFrame({
+                '时间': times.strftime('%Y-%m-%d %H:%M:%S'),
+                '开盘': close, '收盘': close, '最高': close + 0.1, '最低': close - 0.1,
+                '成交量': np.full(len(times), 100.0), '成交额': close * 100,
+            })
+
+    provider = MinuteProvider()
+    store = MinuteBarStore(root=str(tmp_path), provider=provider)
+    first = store.get_bars('000001', '2024-01-22', '2024-02-09', period='5')
+    assert len(first) == 15 * 48 and first['时间'].iloc[-1] == pd.Timestamp('2024-02-09 15:00')
+    assert (tmp_path / '5m' / 'none' / '000001' / '2024-01.parquet').exists()
+    assert (tmp_path / '5m' / 'none' / '000001' / '2024-02.parquet').exists()
+
+    store.get_bars('000001', '2024-01-29', '2024-02-02', period='5')
+    assert len(provider.calls) == 1
+    store.get_bars('000001', '2024-01-15', '2024-02-09', period='5')
+    assert len(provider.calls) == 2 and pd.Timestamp(provider.calls[-1][2]) == pd.Timestamp('2024-01-21 23:59')
+    store.get_bars('000002', '2024-01-15', '2024-02-09', period='5')
+
+    # 每块最多 100 根，分块计算与整段计算一致
+    chunks = list(store.iter_panels(['000001', '000002'], '2024-01-15', '2024-02-09', period='5', chunk_size=100))
+    times = np.concatenate([chunk_times for chunk_times, _ in chunks])
+    assert len(times) == 20 * 48 and max(len(chunk_times) for chunk_times, _ in chunks) == 100
+    close = np.concatenate([fields['close'] for _, fields in chunks], axis=1)
+    assert np.isnan(close[1, times < np.datetime64('2024-02-05')]).all()
+    assert not np.isnan(close[0]).any()
+
+    names = ['ema12', 'rsi14', 'boll_upper', 'obv']
+    chunked = ChunkedIndicators(names, graph=IndicatorGraph())
+    parts = [chunked.update(fields) for _, fields in chunks]
+    full = {field: np.concatenate([fields[field] for _, fields in chunks], axis=1) for field in chunks[0][1]}
+    expected = IndicatorGraph().evaluate(full, names)
+    for name in names:
+        np.testing.assert_allclose(np.concatenate([part[name] for part in parts], axis=1), expected[name], atol=1e-8)
+    print("✅ 分钟线存储测试通过")
+
+
+def test_pattern_screener_process_pool(tmp_path):
+    """测试全市场形态扫描: 多进程分片结果与逐只扫描一致，输出排序后的 parquet 表"""
+    from indicators.patterns import locate_patterns
+    from tasks.pattern_screener import screen_patterns
+
+    rng = np.random.default_rng(7)
+    bars = {}
+    for i in range(12):
+        df = make_hist('20230101', '20240331')
+        close = 20 + 3 * np.sin(np.arange(len(df)) / (3.0 + i)) + rng.standard_normal(len(df)).cumsum() * 0.2
+        df['收盘'] = close
+        df['最高'] = close + rng.random(len(df))
+        df['最低'] = close - rng.random(len(df))
+        bars[f'{600000 + i}'] = df
+    panel = PricePanel.build(bars, root=str(tmp_path / 'panel'))
+
+    symbols = [f'{600000 + i}' for i in (0, 1, 2, 3, 5, 6, 7, 8, 9, 11)]   # 两段连续区间
+    table, report = screen_patterns(panel, symbols=symbols, days=200, workers=2, shard_size=3,
+                                    output=str(tmp_path / 'patterns'))
+
+    expected = set()
+    cols = panel.window_slice(200)
+    for symbol in symbols:
+        row = panel.symbol_index[symbol]
+        fields = {name: panel.field(name)[row, cols] for name in ('high', 'low', 'close')}
+        for name, position in locate_patterns(fields['high'], fields['low'], fields['close']).items():
+            if position >= 0:
+                expected.add((symbol, name, pd.Timestamp(panel.dates[cols][position])))
+    assert set(zip(table['code'], table['pattern'], table['date'])) == expected
+    assert len(expected) > 0
+    assert table['rank'].tolist() == list(range(1, len(table) + 1))
+    assert table['confidence'].is_monotonic_decreasing
+
+    saved = pd.read_parquet(report['path'])
+    assert report['path'].endswith('20240329.parquet')
+    pd.testing.assert_frame_equal(saved, table)
+    assert set(report['stages']) == {'prepare', 'scan', 'merge', 'write'}
+    assert sum(stats['symbols'] for stats in report['workers'].values()) == len(symbols)
+    assert sum(stats['shards'] for stats in report['workers'].values()) == 5   # 0-2 / 3 / 5-7 / 8-9 / 11
+    print("✅ 形态扫描任务测试通过")
+
+
+if __name__ == "__main__":
+    import tempfile, pathlib
+    test_bar_store_reads_from_disk(pathlib.Path(tempfile.mkdtemp()))
+    test_bar_store_fetches_only_missing(pathlib.Path(tempfile.mkdtemp()))
+    test_bar_store_watermark_refetch_on_adjust_change(pathlib.Path(tempfile.mkdtemp()))
+    test_bar_store_local_adjustment(pathlib.Path(tempfile.mkdtemp()))
+    test_bar_store_factor_refresh_on_corporate_action(pathlib.Path(tempfile.mkdtemp()))
+    test_financial_store_as_of(pathlib.Path(tempfile.mkdtemp()))
+    test_record_and_replay(pathlib.Path(tempfile.mkdtemp()))
+    test_universe_matches_string_filters(pathlib.Path(tempfile.mkdtemp()))
+    test_bulk_fetcher_concurrency_retry_and_coalescing()
+    test_trading_calendar(pathlib.Path(tempfile.mkdtemp()))
+    test_price_panel_views(pathlib.Path(tempfile.mkdtemp()))
+    test_resample_weekly_monthly(pathlib.Path(tempfile.mkdtemp()))
+    test_minute_store_chunks(pathlib.Path(tempfile.mkdtemp()))
+    test_canonical_bar_schema()
+    test_boll_screener_incremental_state(pathlib.Path(tempfile.mkdtemp()))
+    test_pattern_screener_process_pool(pathlib.Path(tempfile.mkdtemp()))
+    print("\n✅ 所有行情数据测试通过！")
@@ -9,6 +9,11 @@ sys.path.insert(0, '..')
 
 from strategy.dual_ma import DualMAStrategy
 from strategy.macd_strategy import MACDStrategy
+from strategy.boll_strategy import BollStrategy
+from strategy.rsi_strategy import RSIStrategy
+from backtest.engine import BacktestEngine
+from backtest.factor_analysis import evaluate_factor, forward_returns, information_coefficient, quantile_returns
+from indicators.precision import compare_precision, use_precision
 
 
 def generate_test_data(n=252):
@@ -53,7 +58,90 @@ def test_macd_strategy():
     print("✅ MACD 策略测试通过")
 
 
+def test_float32_precision():
+    """测试 float32 精度下策略与回测结果与 float64 一致"""
+    df = generate_test_data()
+    for strategy in (DualMAStrategy(), MACDStrategy(), RSIStrategy(), BollStrategy()):
+        report = compare_precision(strategy.generate_signals, df)
+        assert report['ok'], (strategy.name, report)
+
+        with use_precision('float32'):
+            signals = strategy.generate_signals(df)
+            _, stats32 = strategy.backtest(df)
+        _, stats64 = strategy.backtest(df)
+        assert signals['close'].dtype == np.float32
+        assert stats32['total_trades'] == stats64['total_trades']
+        assert abs(stats32['total_return'] - stats64['total_return']) < 1e-5
+
+    # float32 行情进入回测引擎，资金仍按 float64 计算
+    df32 = df.astype({'open': np.float32, 'high': np.float32, 'low': np.float32, 'close': np.float32})
+    signals = DualMAStrategy().generate_signals(df)['position'].diff().fillna(0).clip(-1, 1)
+    engine = BacktestEngine()
+    result64 = engine.run(df, signals)['total_value']
+    result32 = engine.run(df32, signals)['total_value']
+    assert result32.dtype == np.float64
+    np.testing.assert_allclose(result32, result64, rtol=1e-5)
+    print("✅ float32 精度测试通过")
+
+
+def test_factor_analysis():
+    """测试因子检验: 逐日 IC 与 pandas 逐列计算一致，分层收益与逐日分组一致"""
+    rng = np.random.default_rng(7)
+    n, t = 40, 60
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (n, t)), axis=1))
+    close[:5, :20] = np.nan                       # 次新股
+    close[7, 30:33] = np.nan                      # 停牌
+    close[8, 40:] = close[8, 39]                  # 一字横盘，收益为 0 的同值
+    factor = np.round(forward_returns(close, 5) * 50 + rng.normal(0, 1, (n, t)), 1)   # 含大量同值
+    factor[np.isnan(close)] = np.nan
+    factor[:, 10] = 1.0                           # 因子全部相同的一天
+
+    report = evaluate_factor(factor, close, horizons=(1, 5), quantiles=4, min_count=10)
+    for horizon in (1, 5):
+        returns = forward_returns(close, horizon)
+        np.testing.assert_allclose(returns[:, :-horizon], close[:, horizon:] / close[:, :-horizon] - 1)
+        assert np.isnan(returns[:, -horizon:]).all()
+
+        spearman, pearson, layers = [], [], []
+        for day in range(t):
+            f, r = pd.Series(factor[:, day]), pd.Series(returns[:, day])
+            both = f.notna() & r.notna()
+            enough = both.sum() >= 10 and f[both].nunique() > 1 and r[both].nunique() > 1
+            spearman.append(f[both].rank().corr(r[both].rank()) if enough else np.nan)   # Spearman = 排名的 Pearson
+            pearson.append(f.corr(r) if enough else np.nan)
+            # 第 q 组: (平均排名 - 1) * 4 / 有效数 向下取整
+            bucket = np.floor((f[both].rank() - 1) * 4 / both.sum()).clip(upper=3)
+            means = r[both].groupby(bucket).mean().reindex(range(4))
+            layers.append(means.to_numpy() if both.sum() >= 10 else np.full(4, np.nan))
+
+        np.testing.assert_allclose(report['rank_ic'][horizon], spearman, atol=1e-12)
+        np.testing.assert_allclose(report['ic'][horizon], pearson, atol=1e-12)
+        np.testing.assert_allclose(information_coefficient(factor, returns), spearman, atol=1e-12)
+        np.testing.assert_allclose(information_coefficient(factor, returns, method='pearson'), pearson, atol=1e-12)
+        layers = np.array(layers).T
+        np.testing.assert_allclose(quantile_returns(factor, returns, quantiles=4), layers, atol=1e-12)
+        np.testing.assert_allclose(report['long_short'][horizon], layers[-1] - layers[0], atol=1e-12)
+
+        summary = report['summary'].loc[horizon]
+        observed = pd.Series(spearman).dropna()
+        assert summary['dates'] == len(observed)
+        assert abs(summary['rank_ic'] - observed.mean()) < 1e-12
+        assert abs(summary['rank_icir'] - observed.mean() / observed.std()) < 1e-9
+        assert abs(summary['positive'] - (observed > 0).mean()) < 1e-12
+        complete = ~np.isnan(layers).any(axis=0)
+        np.testing.assert_allclose(report['quantiles'].loc[horizon, ['Q1', 'Q2', 'Q3', 'Q4']].to_numpy(float),
+                                   layers[:, complete].mean(axis=1), atol=1e-12)
+
+    assert np.isnan(report['rank_ic'].loc[10]).all()        # 因子没有区分度的一天
+    assert report['summary'].loc[5, 'rank_ic'] > report['summary'].loc[1, 'rank_ic'] > 0
+    with pytest.raises(ValueError):
+        information_coefficient(factor, returns, method='kendall')
+    print("✅ 因子检验测试通过")
+
+
 if __name__ == "__main__":
     test_dual_ma()
     test_macd_strategy()
+    test_float32_precision()
+    test_factor_analysis()
     print("\n✅ 所有策略测试通过！")